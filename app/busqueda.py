@@ -0,0 +1,124 @@
+"""
+Búsqueda de texto completo sobre empleados y proyectos con SQLite FTS5.
+
+Cada tabla tiene un índice FTS5 de contenido externo (las filas viven en la
+tabla original, el índice guarda sólo los términos) que mantienen triggers
+de INSERT/DELETE y de UPDATE de las columnas indexadas, así que los UPDATE
+de num_proyectos/version no lo tocan. La migración 5 lo crea y lo llena.
+
+Las consultas del usuario se tokenizan aquí y cada término se cita (el
+último, por prefijo), así que ninguna entrada se interpreta como sintaxis de
+FTS5. La tolerancia a errores de tipeo expande los términos sin
+coincidencias con los términos del vocabulario (fts5vocab) a distancia de
+edición 1–2.
+"""
+import re
+import unicodedata
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.engine import Connection
+from .database import motores
+from . import cache
+
+# tabla -> (tabla FTS, columnas indexadas, pesos bm25 por columna)
+INDICES = {
+    "empleados": ("busqueda_empleados", ("nombre", "cargo", "cc"), (10.0, 2.0, 5.0)),
+    "proyectos": ("busqueda_proyectos", ("nombre", "descripcion"), (10.0, 1.0)),
+}
+MAX_TERMINOS = 8
+MAX_SUGERENCIAS = 5
+# fts5vocab recorre las listas de documentos de cada término que lee: el
+# vocabulario por primera letra se cachea y los términos nuevos aparecen en
+# las correcciones al vencer la entrada.
+TTL_VOCABULARIO = 300
+
+def tabla_fts(tabla: str):
+    nombre, columnas, _ = INDICES[tabla]
+    # La columna oculta con el nombre de la tabla es el operando de MATCH
+    return table(nombre, column("rowid"), column(nombre), *(column(c) for c in columnas))
+
+def relevancia(tabla: str):
+    """bm25 con los pesos por columna de INDICES (menor es más relevante)."""
+    nombre, _, pesos = INDICES[tabla]
+    return func.bm25(literal_column(nombre), *(literal_column(repr(p)) for p in pesos))
+
+def disponible(bind=None) -> bool:
+    """FTS5 sólo existe en SQLite; en otros motores crud busca con ILIKE."""
+    return (bind if bind is not None else motores().engine).dialect.name == "sqlite"
+
+# ---------- Esquema ----------
+def crear(conn: Connection, tabla: str) -> None:
+    """Crea (si faltan) el índice FTS5, su vocabulario y los triggers de `tabla`, y lo reconstruye."""
+    nombre, columnas, _ = INDICES[tabla]
+    cols = ", ".join(columnas)
+    nuevos = ", ".join(f"new.{c}" for c in columnas)
+    viejos = ", ".join(f"old.{c}" for c in columnas)
+    borrar = f"INSERT INTO {nombre}({nombre}, rowid, {cols}) VALUES ('delete', old.id, {viejos});"
+    insertar = f"INSERT INTO {nombre}(rowid, {cols}) VALUES (new.id, {nuevos});"
+    for ddl in (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {nombre} USING fts5({cols}, content='{tabla}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {nombre}_vocab USING fts5vocab({nombre}, 'row')",
+        f"CREATE TRIGGER IF NOT EXISTS {nombre}_ai AFTER INSERT ON {tabla} BEGIN {insertar} END",
+        f"CREATE TRIGGER IF NOT EXISTS {nombre}_ad AFTER DELETE ON {tabla} BEGIN {borrar} END",
+        f"CREATE TRIGGER IF NOT EXISTS {nombre}_au AFTER UPDATE OF {cols} ON {tabla} BEGIN {borrar} {insertar} END",
+        f"INSERT INTO {nombre}({nombre}) VALUES ('rebuild')",
+    ):
+        conn.exec_driver_sql(ddl)
+
+# ---------- Consultas ----------
+def terminos(q: str) -> list[str]:
+    """Términos como los ve el tokenizador unicode61: minúsculas, sin tildes, alfanuméricos."""
+    sin_tildes = "".join(c for c in unicodedata.normalize("NFKD", q.lower()) if not unicodedata.combining(c))
+    return re.findall(r"\w+", sin_tildes)[:MAX_TERMINOS]
+
+def _citar(termino: str) -> str:
+    return '"' + termino.replace('"', '""') + '"'
+
+def expresion(grupos: list[list[str]], columna: str | None = None) -> str:
+    """
+    Expresión MATCH: cada grupo es un término del usuario (más sus
+    correcciones) y deben coincidir todos. Como al escribir, sólo el último
+    término se busca por prefijo; los anteriores y las correcciones, exactos
+    (un prefijo obliga a FTS5 a unir las listas de todos los términos que lo
+    comparten).
+    """
+    partes = []
+    for i, (original, *correcciones) in enumerate(grupos):
+        opciones = [_citar(original) + ("*" if i == len(grupos) - 1 else ""), *map(_citar, correcciones)]
+        partes.append(opciones[0] if len(opciones) == 1 else "(" + " OR ".join(opciones) + ")")
+    cuerpo = " AND ".join(partes)
+    return f"{columna} : ({cuerpo})" if columna else cuerpo
+
+def _distancia(a: str, b: str, tope: int) -> int:
+    """Levenshtein con corte: devuelve tope + 1 en cuanto se sabe que lo supera."""
+    if abs(len(a) - len(b)) > tope:
+        return tope + 1
+    previa = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (ca != cb)))
+        if min(actual) > tope:
+            return tope + 1
+        previa = actual
+    return previa[-1]
+
+def correcciones(db, tabla: str, termino: str) -> list[str]:
+    """
+    Términos del vocabulario a distancia de edición ≤ 1 (≤ 2 desde 8
+    letras) de `termino`, los más frecuentes primero. Los candidatos comparten
+    la primera letra; los términos numéricos (cc) no se corrigen.
+    """
+    if len(termino) < 3 or not termino.isalpha():
+        return []
+    nombre = INDICES[tabla][0]
+
+    def cargar():
+        return [list(fila) for fila in db.execute(
+            text(f"SELECT term, doc FROM {nombre}_vocab WHERE term >= :desde AND term < :hasta"),
+            {"desde": termino[0], "hasta": termino[0] + "\U0010ffff"},
+        )]
+    vocabulario = cache.leer(cache.clave("vocabulario", tabla, termino[0]), cargar, TTL_VOCABULARIO)
+    tope = 1 if len(termino) < 8 else 2
+    cercanos = [(doc, term) for term, doc in vocabulario if _distancia(termino, term, tope) <= tope]
+    return [term for _, term in sorted(cercanos, reverse=True)[:MAX_SUGERENCIAS]]
@@ -0,0 +1,213 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .database import motores, obtener_settings
+
+log = logging.getLogger("app.cache")
+
+# ---------- Backends ----------
+class BackendCache(ABC):
+    """
+    Interfaz de almacenamiento de la caché. Los valores son estructuras JSON
+    (dict/list/str/int...) para que un backend compartido entre workers
+    (p. ej. Redis) pueda serializarlos sin conocer los modelos.
+
+    La "generación" es un contador que aumenta con cada invalidación: un
+    valor leído de la base sólo se guarda si la generación no cambió
+    mientras se leía, así una lectura lenta no repone datos ya invalidados.
+    """
+
+    @abstractmethod
+    def obtener(self, clave: str) -> Any | None: ...
+
+    @abstractmethod
+    def guardar(self, clave: str, valor: Any, ttl: float, generacion: int) -> bool: ...
+
+    @abstractmethod
+    def borrar(self, claves: set[str]) -> None: ...
+
+    @abstractmethod
+    def generacion(self) -> int: ...
+
+    @abstractmethod
+    def limpiar(self) -> None: ...
+
+    @abstractmethod
+    def estadisticas(self) -> dict: ...
+
+
+class MemoriaLRU(BackendCache):
+    """
+    LRU en memoria del proceso con TTL por entrada y tamaño máximo.
+    """
+
+    def __init__(self, max_entradas: int = 10_000):
+        self.max_entradas = max_entradas
+        self._datos: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._generacion = 0
+        self._lock = threading.Lock()
+        self._contadores = dict.fromkeys(("aciertos", "fallos", "desalojos", "expirados", "invalidaciones"), 0)
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self._contadores["fallos"] += 1
+                return None
+            vence, valor = entrada
+            if vence < time.monotonic():
+                del self._datos[clave]
+                self._contadores["expirados"] += 1
+                self._contadores["fallos"] += 1
+                return None
+            self._datos.move_to_end(clave)
+            self._contadores["aciertos"] += 1
+            return valor
+
+    def guardar(self, clave, valor, ttl, generacion):
+        with self._lock:
+            if generacion != self._generacion:
+                return False
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self._contadores["desalojos"] += 1
+            return True
+
+    def borrar(self, claves):
+        with self._lock:
+            self._generacion += 1
+            for clave in claves:
+                if self._datos.pop(clave, None) is not None:
+                    self._contadores["invalidaciones"] += 1
+
+    def generacion(self):
+        with self._lock:
+            return self._generacion
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._datos.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            return {**self._contadores, "entradas": len(self._datos), "max_entradas": self.max_entradas}
+
+
+_backend: BackendCache | None = None
+
+def configurar_backend(backend: BackendCache) -> None:
+    """Reemplaza el backend (p. ej. uno compartido entre workers)."""
+    global _backend
+    _backend = backend
+
+def backend() -> BackendCache:
+    """Backend configurado; por defecto una MemoriaLRU creada en el primer uso."""
+    global _backend
+    if _backend is None:
+        _backend = MemoriaLRU(obtener_settings().CACHE_MAX_ENTRADAS)
+    return _backend
+
+# ---------- Lectura e invalidación ----------
+def clave(*partes) -> str:
+    """Clave a partir de tipo + id(s) o tupla de filtros: clave("detalle", 5) -> "detalle:5"."""
+    return ":".join(str(p) for p in partes)
+
+def leer(k: str, cargar: Callable[[], Any], ttl: float | None = None, omitir: bool = False) -> Any:
+    """
+    Read-through: devuelve el valor en caché o lo carga con `cargar()` y lo
+    guarda. Las excepciones de `cargar` (p. ej. 404) no se guardan. Con
+    omitir=True (lectura con token de consistencia) carga sin tocar la caché.
+    """
+    settings = obtener_settings()
+    if omitir or not settings.CACHE_HABILITADA:
+        return cargar()
+    almacen = backend()
+    valor = almacen.obtener(k)
+    if valor is not None:
+        return valor
+    generacion = almacen.generacion()
+    valor = cargar()
+    almacen.guardar(k, valor, settings.CACHE_TTL_SEGUNDOS if ttl is None else ttl, generacion)
+    return valor
+
+_PENDIENTES = "cache_invalidar"
+
+class _BorradoDiferido:
+    """
+    Segundo borrado de las claves de cada escritura, pasado el retraso de las
+    réplicas. Un único hilo daemon vacía un montículo ordenado por
+    vencimiento: al despertar espera TICK más y borra juntas todas las claves
+    ya vencidas, así el número de hilos no crece con las escrituras por
+    segundo (un Timer por commit dejaba escrituras/s × retraso hilos vivos).
+    """
+    TICK = 0.05
+
+    def __init__(self):
+        self._pendientes: list[tuple[float, int, set[str]]] = []
+        self._orden = itertools.count()  # desempata vencimientos iguales sin comparar sets
+        self._cond = threading.Condition()
+        self._hilo: threading.Thread | None = None
+
+    def programar(self, claves: set[str], retraso: float) -> None:
+        with self._cond:
+            heapq.heappush(self._pendientes, (time.monotonic() + retraso, next(self._orden), claves))
+            # Tras un fork el hilo del padre no existe en el hijo: se vuelve a crear
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._vaciar, name="cache-borrado-diferido", daemon=True)
+                self._hilo.start()
+            elif self._pendientes[0][2] is claves:
+                self._cond.notify()
+
+    def _vencidas(self) -> set[str]:
+        with self._cond:
+            while not self._pendientes or self._pendientes[0][0] > time.monotonic():
+                self._cond.wait(self._pendientes[0][0] - time.monotonic() if self._pendientes else None)
+        # Fuera del lock: las escrituras de este TICK se suman a la misma tanda
+        time.sleep(self.TICK)
+        claves, ahora = set(), time.monotonic()
+        with self._cond:
+            while self._pendientes and self._pendientes[0][0] <= ahora:
+                claves |= heapq.heappop(self._pendientes)[2]
+        return claves
+
+    def _vaciar(self) -> None:
+        while True:
+            claves = self._vencidas()
+            try:
+                backend().borrar(claves)
+            except Exception:
+                log.exception("no se pudo repetir el borrado de %d claves de la caché", len(claves))
+
+_diferido = _BorradoDiferido()
+
+def invalidar(db: Session, *claves: str) -> None:
+    """
+    Marca claves a invalidar cuando la transacción de `db` confirme.
+    Invalidar después del commit evita que otra petición vuelva a cachear
+    el estado anterior mientras la escritura aún no es visible.
+    """
+    db.info.setdefault(_PENDIENTES, set()).update(claves)
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_tras_commit(db: Session):
+    claves = db.info.pop(_PENDIENTES, None)
+    if claves:
+        backend().borrar(claves)
+        if motores().replicas:
+            # Doble borrado: una lectura de una réplica atrasada pudo reponer
+            # el valor anterior entre la escritura y su replicación
+            _diferido.programar(claves, obtener_settings().REPLICAS_RETRASO_MAXIMO_SEGUNDOS)
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_tras_rollback(db: Session):
+    db.info.pop(_PENDIENTES, None)
@@ -0,0 +1,215 @@
+"""
+Registro de cambios de empleados, proyectos y asignaciones (GET /cambios).
+
+crud llama a registrar() en cada escritura. Las entradas se acumulan en la
+sesión y se insertan con un solo executemany en before_commit, dentro de la
+misma transacción que el cambio: si hay rollback se descartan. Tras el
+commit se despierta a los lectores en espera de este proceso; los de otros
+procesos lo notan al sondear (CAMBIOS_SONDEO_SEGUNDOS).
+
+El mayor seq que confirma una petición vuelve al cliente en la cabecera
+X-Consistencia (MiddlewareConsistencia): reenviado en sus lecturas, garantiza
+que no se sirvan de una réplica que aún no lo aplicó (database.abrir_sesion).
+
+crear/actualizar llevan en `datos` la representación pública completa
+(EmpleadoSalida, ProyectoSalida, AsignacionSalida), así que el consumidor
+los aplica como upsert. Eliminar un empleado o proyecto elimina también sus
+asignaciones (ON DELETE CASCADE), que no se registran aparte.
+
+Compactación: una entrada con otra posterior de la misma entidad se borra
+pasado CAMBIOS_COMPACTAR_SEGUNDOS (un consumidor atrasado recibe sólo el
+último estado). Retención: las eliminaciones se purgan pasado
+CAMBIOS_RETENCION_SEGUNDOS y cambios_horizonte guarda el mayor seq
+purgado; leer desde antes responde 410 y hay que resincronizar. Por debajo
+del horizonte se purgan también las entradas de asignaciones que ya no
+existen: las borradas en cascada no tienen una eliminación que las reemplace.
+
+Orden: un consumidor avanza `desde` hasta el mayor seq leído, así que un seq
+no puede hacerse visible después de otro mayor. En SQLite las escrituras ya
+están serializadas; en PostgreSQL las transacciones que registran cambios
+toman un advisory lock de transacción antes del INSERT, de modo que el orden
+de seq es el de commit. Otros motores no tienen esa garantía.
+"""
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, insert, select, text, update, event
+from sqlalchemy.orm import Session, aliased
+from . import models
+from .database import CABECERA_CONSISTENCIA, Settings, abrir_sesion, ejecutar
+
+_PENDIENTES = "cambios_pendientes"
+_ESCRITOS = "cambios_escritos"
+# Hasta el commit: el seq siguiente se toma cuando el anterior ya es visible
+_SERIALIZAR_PG = text("SELECT pg_advisory_xact_lock(hashtext('proyectos-api:cambios'))")
+log = logging.getLogger("app.cambios")
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+# ---------- Escritura ----------
+def registrar(db: Session, entidad: str, operacion: str, entidad_id: int, datos: dict | None = None) -> None:
+    """Agrega una entrada que se escribirá al confirmar la transacción de `db`."""
+    db.info.setdefault(_PENDIENTES, []).append(
+        {"entidad": entidad, "entidad_id": entidad_id, "operacion": operacion, "datos": datos}
+    )
+
+@event.listens_for(Session, "before_commit")
+def _escribir_antes_del_commit(db: Session):
+    filas = db.info.pop(_PENDIENTES, None)
+    if filas:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(_SERIALIZAR_PG)
+        momento = _ahora()
+        seqs = db.scalars(insert(models.Cambio).returning(models.Cambio.seq),
+                          [{**f, "momento": momento} for f in filas]).all()
+        db.info[_ESCRITOS] = max(seqs)
+
+@event.listens_for(Session, "after_commit")
+def _avisar_tras_commit(db: Session):
+    seq = db.info.pop(_ESCRITOS, None)
+    if seq is not None:
+        confirmado = _confirmado.get()
+        if confirmado is not None:
+            confirmado[0] = max(confirmado[0], seq)
+        aviso.notificar()
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_tras_rollback(db: Session):
+    db.info.pop(_PENDIENTES, None)
+    db.info.pop(_ESCRITOS, None)
+
+# ---------- Token de consistencia ----------
+# Lista de un elemento (el mayor seq confirmado) por petición: el commit puede
+# ocurrir en el threadpool, que hereda una copia del contexto, así que se muta
+# la lista en lugar de reasignar la ContextVar.
+_confirmado: ContextVar[list[int] | None] = ContextVar("cambios_confirmados", default=None)
+
+class MiddlewareConsistencia:
+    """
+    Middleware ASGI puro: si la petición confirmó cambios, agrega
+    X-Consistencia con el mayor seq escrito al inicio de la respuesta.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        confirmado = [0]
+        token = _confirmado.set(confirmado)
+        cabecera = CABECERA_CONSISTENCIA.lower().encode()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and confirmado[0]:
+                mensaje["headers"] = [*mensaje.get("headers", ()), (cabecera, str(confirmado[0]).encode())]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _confirmado.reset(token)
+
+# ---------- Aviso a los lectores en espera ----------
+class Aviso:
+    """
+    Despierta a los lectores de /cambios (long-poll y SSE) cuando este
+    proceso confirma cambios. Los commits pueden ocurrir en el threadpool, así
+    que cada suscriptor se despierta en su event loop con call_soon_threadsafe.
+    """
+    def __init__(self):
+        self._suscriptores: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+
+    def notificar(self) -> None:
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for loop, evento in suscriptores:
+            try:
+                loop.call_soon_threadsafe(evento.set)
+            except RuntimeError:  # loop cerrado
+                pass
+
+    @contextmanager
+    def suscripcion(self):
+        """
+        Suscribe antes de leer para no perder un commit entre la lectura y la
+        espera. Entrega esperar(timeout) -> True si llegó un aviso.
+        """
+        evento = asyncio.Event()
+        suscriptor = (asyncio.get_running_loop(), evento)
+        with self._lock:
+            self._suscriptores.add(suscriptor)
+
+        async def esperar(timeout: float) -> bool:
+            try:
+                await asyncio.wait_for(evento.wait(), timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+        try:
+            yield esperar
+        finally:
+            with self._lock:
+                self._suscriptores.discard(suscriptor)
+
+aviso = Aviso()
+
+# ---------- Compactación y retención ----------
+def compactar(db: Session, compactar_tras: float, retener: float) -> dict:
+    """
+    Borra las entradas reemplazadas más viejas que `compactar_tras` segundos
+    y las eliminaciones más viejas que `retener`, adelanta el horizonte y
+    borra por debajo de él las entradas de asignaciones que ya no existen.
+    """
+    ahora = _ahora()
+    posterior = aliased(models.Cambio)
+    reemplazada = select(posterior.seq).where(
+        posterior.entidad == models.Cambio.entidad,
+        posterior.entidad_id == models.Cambio.entidad_id,
+        posterior.seq > models.Cambio.seq,
+    ).exists()
+    compactadas = db.execute(
+        delete(models.Cambio)
+        .where(models.Cambio.momento < ahora - timedelta(seconds=compactar_tras), reemplazada)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    eliminaciones = (models.Cambio.operacion == "eliminar",
+                     models.Cambio.momento < ahora - timedelta(seconds=retener))
+    tope = db.scalar(select(func.max(models.Cambio.seq)).where(*eliminaciones))
+    purgadas = 0
+    if tope is not None:
+        purgadas = db.execute(
+            delete(models.Cambio).where(*eliminaciones, models.Cambio.seq <= tope)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.execute(update(models.HorizonteCambios)
+                   .where(models.HorizonteCambios.id == 1, models.HorizonteCambios.seq < tope).values(seq=tope))
+
+    # La eliminación del empleado o proyecto (posterior a la entrada) ya se
+    # purgó; nadie puede leer desde antes del horizonte. Los ids no se reutilizan.
+    horizonte = select(models.HorizonteCambios.seq).where(models.HorizonteCambios.id == 1).scalar_subquery()
+    existe = select(models.Asignacion.id).where(models.Asignacion.id == models.Cambio.entidad_id).exists()
+    huerfanas = db.execute(
+        delete(models.Cambio)
+        .where(models.Cambio.entidad == "asignacion", models.Cambio.seq <= horizonte, ~existe)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return {"compactadas": compactadas, "purgadas": purgadas + huerfanas}
+
+async def compactar_periodicamente(s: Settings) -> None:
+    """Tarea del lifespan: compacta cada CAMBIOS_COMPACTAR_CADA_SEGUNDOS."""
+    while True:
+        await asyncio.sleep(s.CAMBIOS_COMPACTAR_CADA_SEGUNDOS)
+        try:
+            async with abrir_sesion() as db:
+                resultado = await ejecutar(db, compactar, s.CAMBIOS_COMPACTAR_SEGUNDOS, s.CAMBIOS_RETENCION_SEGUNDOS)
+            log.info("registro de cambios compactado: %s", resultado)
+        except Exception:
+            log.exception("no se pudo compactar el registro de cambios")
@@ -1,9 +1,299 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+import base64
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session, aliased, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy import select, func, insert, update, delete, bindparam, and_, or_, true, tuple_, case, type_coerce, String, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from fastapi import HTTPException
-from . import models, schemas
+from pydantic_core import to_json
+from . import models, schemas, cache, etags, busqueda, cambios
+from .database import SIN_CACHE, obtener_settings
 
-MAX_PROYECTOS_POR_EMPLEADO = 5
+MAX_PROYECTOS_POR_EMPLEADO = models.MAX_PROYECTOS_POR_EMPLEADO
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+TAMANO_LOTE_STREAM = 500
+TAMANO_TROZO = 1000
+
+# ---------- Paginación (keyset sobre id) ----------
+def codificar_cursor(ultimo_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": ultimo_id}).encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str) -> int:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        ultimo_id = json.loads(base64.urlsafe_b64decode(cursor + relleno))["id"]
+        # También la posición de _paginar_por_posicion: ni negativa ni fuera
+        # de un entero de 64 bits (el driver falla con OverflowError)
+        if not isinstance(ultimo_id, int) or not 0 <= ultimo_id < 2**63:
+            raise ValueError
+        return ultimo_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(400, "Cursor inválido")
+
+def _paginar(db: Session, query, columna_id, limit: int, after: str | None):
+    """
+    Aplica paginación por keyset: filtra id > cursor, ordena por id y pide
+    limit + 1 filas para saber si existe página siguiente sin un COUNT.
+    Devuelve las filas (tuplas de columnas) tal cual las entrega el driver.
+    """
+    if after:
+        query = query.where(columna_id > decodificar_cursor(after))
+    filas = db.execute(query.order_by(columna_id).limit(limit + 1)).all()
+    siguiente = codificar_cursor(filas[limit - 1].id) if len(filas) > limit else None
+    return filas[:limit], siguiente
+
+def _consulta_stream(query, columna_id, after: str | None):
+    """
+    Prepara la consulta para recorrerse con un cursor del lado del servidor,
+    en lotes de TAMANO_LOTE_STREAM filas, sin materializar el resultado.
+    """
+    if after:
+        query = query.where(columna_id > decodificar_cursor(after))
+    return query.order_by(columna_id).execution_options(yield_per=TAMANO_LOTE_STREAM)
+
+# ---------- Caché: claves afectadas por cada escritura ----------
+# Cada reporte se invalida sólo cuando cambia algo que agrega
+REPORTES_EMPLEADO = {cache.clave("reporte", r) for r in ("capacidad", "gerentes")}
+REPORTES_PROYECTO = {cache.clave("reporte", r) for r in ("dotacion", "presupuesto", "gerentes")}
+REPORTES_ASIGNACION = {cache.clave("reporte", r) for r in ("dotacion", "capacidad", "gerentes")}
+
+def _claves_de_proyectos_ids(pr_ids) -> set[str]:
+    return {cache.clave(t, p) for p in pr_ids for t in ("detalle", "empleados_de_proyecto")}
+
+def _claves_empleados(db: Session, emp_ids, asignaciones: bool = False) -> set[str]:
+    """
+    Un empleado aparece en su propia ficha, en su lista de proyectos y en el
+    detalle / lista de empleados de cada proyecto donde está asignado o es gerente.
+    Con `asignaciones` (la escritura le quita sus asignaciones) también la
+    ficha de esos proyectos, cuya versión cambia, y los reportes de asignaciones.
+    """
+    claves = REPORTES_EMPLEADO | (REPORTES_ASIGNACION if asignaciones else set())
+    for trozo in _en_trozos(list(emp_ids)):
+        claves.update(cache.clave(t, e) for e in trozo for t in ("empleado", "proyectos_de_empleado"))
+        proys = db.scalars(
+            select(models.Asignacion.proyecto_id).where(models.Asignacion.empleado_id.in_(trozo))
+            .union(select(models.Proyecto.id).where(models.Proyecto.gerente_id.in_(trozo)))
+        ).all()
+        claves |= _claves_de_proyectos_ids(proys)
+        if asignaciones:
+            claves.update(cache.clave("proyecto", p) for p in proys)
+    return claves
+
+def _claves_proyectos(db: Session, pr_ids, asignaciones: bool = False) -> set[str]:
+    """
+    Un proyecto aparece en su ficha, su detalle, su lista de empleados y en
+    la lista de proyectos de cada empleado asignado. Con `asignaciones`
+    también la ficha de esos empleados y los reportes de asignaciones, como
+    en _claves_empleados.
+    """
+    claves = REPORTES_PROYECTO | (REPORTES_ASIGNACION if asignaciones else set())
+    for trozo in _en_trozos(list(pr_ids)):
+        claves.update(cache.clave("proyecto", p) for p in trozo)
+        claves |= _claves_de_proyectos_ids(trozo)
+        emps = db.scalars(select(models.Asignacion.empleado_id).where(models.Asignacion.proyecto_id.in_(trozo)))
+        tipos = ("proyectos_de_empleado", "empleado") if asignaciones else ("proyectos_de_empleado",)
+        claves.update(cache.clave(t, e) for e in emps for t in tipos)
+    return claves
+
+def _claves_asignacion(empleado_id: int, proyecto_id: int) -> set[str]:
+    # Cambiar una asignación versiona al empleado y al proyecto: también sus
+    # fichas, o seguirían sirviendo el ETag anterior (y el If-Match daría 412)
+    return (_claves_de_proyectos_ids([proyecto_id])
+            | {cache.clave("proyectos_de_empleado", empleado_id), cache.clave("empleado", empleado_id),
+               cache.clave("proyecto", proyecto_id)}
+            | REPORTES_ASIGNACION)
+
+# ---------- Versiones y ETags ----------
+# El ORM incrementa la columna version en cada UPDATE de un objeto y lo hace
+# condicional a la versión leída (version_id_col). Los UPDATE por conjuntos
+# la incrementan explícitamente, y los cambios de asignaciones tocan además
+# la versión del proyecto (cambia su detalle) y la del empleado (cambia su
+# lista de proyectos, vía _cambiar_cupo).
+#
+# crud no confirma: la unidad de trabajo de la petición (database.get_db)
+# hace commit al terminar. Lo que se devuelve ya está al día tras el flush;
+# los UPDATE por conjuntos traen con RETURNING las columnas que cambian y las
+# copian en los objetos ya cargados en la sesión, sin recargarlos.
+
+def etag_empleado(emp: models.Empleado) -> str:
+    return etags.etag("e", emp.id, emp.version)
+
+def etag_proyecto(pr: models.Proyecto) -> str:
+    return etags.etag("p", pr.id, pr.version)
+
+def _actualizar_cargados(db: Session, sentencia, modelo, *columnas):
+    """
+    Ejecuta un UPDATE por conjuntos de `modelo` y actualiza `columnas` en los
+    objetos de la sesión que afectó: con RETURNING en la misma sentencia; si
+    el motor no lo soporta, las expira (se recargan sólo si se leen).
+    """
+    sentencia = sentencia.execution_options(synchronize_session=False)
+    if not db.get_bind().dialect.update_returning:
+        db.execute(sentencia)
+        for obj in [o for o in db.identity_map.values() if isinstance(o, modelo)]:
+            db.expire(obj, [c.key for c in columnas])
+        return
+    for id_, *valores in db.execute(sentencia.returning(modelo.id, *columnas)):
+        obj = db.identity_map.get(identity_key(modelo, id_))
+        if obj is not None:
+            for c, v in zip(columnas, valores):
+                set_committed_value(obj, c.key, v)
+
+def _tocar_proyectos(db: Session, pr_ids, dotacion: int | dict[int, int] = 0):
+    """
+    Versiona los proyectos cuyas asignaciones cambiaron y suma `dotacion`
+    (igual para todos, o por proyecto) a su contador num_empleados.
+    """
+    p = models.Proyecto
+    valores = {"version": p.version + 1}
+    if isinstance(dotacion, dict):
+        pr_ids = set(pr_ids) | dotacion.keys()
+        if saldos := {k: v for k, v in dotacion.items() if v}:
+            valores["num_empleados"] = p.num_empleados + case(saldos, value=p.id, else_=0)
+    elif dotacion:
+        valores["num_empleados"] = p.num_empleados + dotacion
+    _actualizar_cargados(
+        db, update(p).where(p.id.in_(pr_ids)).values(**valores), p, p.version, p.num_empleados,
+    )
+
+def _guardar(db: Session, si_coincide: str | None = None):
+    """
+    Flush de cambios ORM con control de versión: si otra petición modificó la
+    fila desde que se leyó, 412 cuando el cliente envió If-Match y 409 si no.
+    """
+    try:
+        db.flush()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(412 if si_coincide is not None else 409, "El recurso fue modificado por otra petición")
+
+def _version_empleado(db: Session, empleado_id: int) -> str:
+    version = db.scalar(select(models.Empleado.version).where(models.Empleado.id == empleado_id))
+    if version is None:
+        raise HTTPException(404, "Empleado no encontrado")
+    return etags.etag("e", empleado_id, version)
+
+def _version_proyecto(db: Session, proyecto_id: int) -> str:
+    version = db.scalar(select(models.Proyecto.version).where(models.Proyecto.id == proyecto_id))
+    if version is None:
+        raise HTTPException(404, "Proyecto no encontrado")
+    return etags.etag("p", proyecto_id, version)
+
+def _version_empleados_de_proyecto(db: Session, proyecto_id: int, con_gerente: bool = False) -> str:
+    """
+    ETag de /proyectos/{id}/empleados (o /detalle con el gerente) en una sola
+    consulta: versión del proyecto + suma de versiones de sus empleados. Un
+    alta/baja de asignación incrementa la del proyecto y una edición de un
+    empleado la suma, así que cualquier cambio del cuerpo cambia el ETag.
+    """
+    suma = (
+        select(func.coalesce(func.sum(models.Empleado.version), 0))
+        .join_from(models.Asignacion, models.Empleado, models.Asignacion.empleado_id == models.Empleado.id)
+        .where(models.Asignacion.proyecto_id == models.Proyecto.id)
+        .scalar_subquery()
+    )
+    query = select(models.Proyecto.version, suma).where(models.Proyecto.id == proyecto_id)
+    if con_gerente:
+        gerente = aliased(models.Empleado)
+        query = query.add_columns(gerente.version).outerjoin(gerente, gerente.id == models.Proyecto.gerente_id)
+    fila = db.execute(query).first()
+    if fila is None:
+        raise HTTPException(404, "Proyecto no encontrado")
+    return etags.etag("d" if con_gerente else "pe", proyecto_id, *(v or 0 for v in fila))
+
+def _version_proyectos_de_empleado(db: Session, empleado_id: int) -> str:
+    suma = (
+        select(func.coalesce(func.sum(models.Proyecto.version), 0))
+        .join_from(models.Asignacion, models.Proyecto, models.Asignacion.proyecto_id == models.Proyecto.id)
+        .where(models.Asignacion.empleado_id == models.Empleado.id)
+        .scalar_subquery()
+    )
+    fila = db.execute(select(models.Empleado.version, suma).where(models.Empleado.id == empleado_id)).first()
+    if fila is None:
+        raise HTTPException(404, "Empleado no encontrado")
+    return etags.etag("ep", empleado_id, *fila)
+
+# ---------- Registro de cambios ----------
+# Cada escritura registra en la misma transacción (app/cambios.py) la
+# representación pública de lo que creó o actualizó.
+
+def _datos_empleado(fuente) -> dict:
+    """EmpleadoSalida de un objeto o de los valores de un lote (con "estado")."""
+    if isinstance(fuente, dict):
+        fuente = {**fuente, "estado_empleado": fuente["estado"]}
+    return schemas.EmpleadoSalida.model_validate(fuente).model_dump(mode="json")
+
+def _datos_proyecto(fuente) -> dict:
+    return schemas.ProyectoSalida.model_validate(fuente).model_dump(mode="json")
+
+def _registrar_asignaciones(db: Session, operacion: str, filas):
+    """filas: (id, empleado_id, proyecto_id). Abre o cierra también sus intervalos en el historial."""
+    filas = list(filas)
+    for id_, e, p in filas:
+        cambios.registrar(db, "asignacion", operacion, id_, {"id": id_, "empleado_id": e, "proyecto_id": p})
+    if not filas:
+        return
+    if operacion == "crear":
+        momento = _momento(db)
+        db.execute(insert(models.HistorialAsignacion), [
+            {"asignacion_id": id_, "empleado_id": e, "proyecto_id": p, "desde": momento} for id_, e, p in filas
+        ])
+    else:
+        for trozo in _en_trozos([id_ for id_, _, _ in filas]):
+            _cerrar_asignaciones(db, models.HistorialAsignacion.asignacion_id.in_(trozo))
+
+# ---------- Historial ----------
+# Cada alta o baja de asignación y cada cambio de gerente abre o cierra su
+# intervalo (models.HistorialAsignacion / HistorialGerente) en la misma
+# transacción. Todo lo de una transacción usa el mismo instante: un empleado
+# que se mueve de proyecto deja uno y entra al otro a la vez.
+_MOMENTO = "historial_momento"
+
+def _momento(db: Session) -> datetime:
+    return db.info.setdefault(_MOMENTO, datetime.now(timezone.utc).replace(tzinfo=None))
+
+@event.listens_for(Session, "after_transaction_end")
+def _olvidar_momento(db: Session, transaccion):
+    if transaccion.parent is None:
+        db.info.pop(_MOMENTO, None)
+
+def _cerrar_asignaciones(db: Session, condicion):
+    """Cierra los intervalos vigentes que cumplen `condicion` (por el índice parcial de vigentes)."""
+    h = models.HistorialAsignacion
+    db.execute(update(h).where(condicion, h.hasta.is_(None)).values(hasta=_momento(db))
+               .execution_options(synchronize_session=False))
+
+def _registrar_gerentes(db: Session, gerentes: dict[int, int | None], previos: dict[int, int | None] | None = None):
+    """
+    gerentes: proyecto -> gerente nuevo (None: sin gerente). previos: el
+    gerente anterior de cada proyecto (por omisión ninguno, p. ej. proyectos
+    nuevos). Sólo cierra y abre intervalos de los que cambiaron.
+    """
+    previos = previos or {}
+    cambiados = {p: e for p, e in gerentes.items() if previos.get(p) != e}
+    cerrar = [p for p in cambiados if previos.get(p) is not None]
+    abrir = [{"proyecto_id": p, "empleado_id": e, "desde": _momento(db)} for p, e in cambiados.items() if e is not None]
+    h = models.HistorialGerente
+    for trozo in _en_trozos(cerrar):
+        db.execute(update(h).where(h.proyecto_id.in_(trozo), h.hasta.is_(None)).values(hasta=_momento(db))
+                   .execution_options(synchronize_session=False))
+    if abrir:
+        db.execute(insert(h), abrir)
+
+# ---------- Columnas de los listados ----------
+# Los listados leen sólo las columnas de EmpleadoSalida / ProyectoSalida (más
+# version, para el ETag de la página) como tuplas, sin construir objetos ORM
+# (ver respuestas.lista_json).
+COLUMNAS_EMPLEADO = (models.Empleado.id, models.Empleado.cc, models.Empleado.nombre, models.Empleado.cargo,
+                     models.Empleado.estado.label("estado_empleado"), models.Empleado.version)
+COLUMNAS_PROYECTO = (models.Proyecto.id, models.Proyecto.nombre, models.Proyecto.descripcion,
+                     models.Proyecto.estado, models.Proyecto.presupuesto, models.Proyecto.gerente_id,
+                     models.Proyecto.version)
 
 # ---------- Empleados ----------
 def crear_empleado(db: Session, datos: schemas.EmpleadoCrear) -> models.Empleado:
@@ -11,19 +301,33 @@ def crear_empleado(db: Session, datos: schemas.EmpleadoCrear) -> models.Empleado
     if existe:
         raise HTTPException(status_code=400, detail="La cédula (cc) ya existe")
     emp = models.Empleado(cc=datos.cc, nombre=datos.nombre, cargo=datos.cargo)
-    db.add(emp); db.commit(); db.refresh(emp)
+    cache.invalidar(db, *REPORTES_EMPLEADO)
+    db.add(emp); db.flush()
+    cambios.registrar(db, "empleado", "crear", emp.id, _datos_empleado(emp))
     return emp
 
-def listar_empleados(db: Session, especialidad: str | None = None, estado_empleado: models.EstadoEmpleado | None = None):
-    """
-    Lista empleados con filtros opcionales. El filtro por "especialidad" se
-    ignora (no existe en el modelo). El filtro de estado usa la columna
-    real "estado" del modelo.
-    """
-    query = select(models.Empleado)
+def _consulta_empleados(estado_empleado: models.EstadoEmpleado | None = None, especialidad: str | None = None):
+    query = select(*COLUMNAS_EMPLEADO)
     if estado_empleado:
         query = query.where(models.Empleado.estado == estado_empleado)
-    return db.scalars(query.order_by(models.Empleado.id)).all()
+    if especialidad:
+        query = query.where(_filtro_cargo(especialidad))
+    return query
+
+def listar_empleados(db: Session, especialidad: str | None = None, estado_empleado: models.EstadoEmpleado | None = None,
+                     limit: int = LIMITE_POR_DEFECTO, after: str | None = None):
+    """
+    Lista empleados con filtros opcionales. El modelo no guarda
+    "especialidad": el filtro busca sus términos (por prefijo) en el cargo.
+    El filtro de estado usa la columna real "estado" del modelo.
+
+    Devuelve (filas de COLUMNAS_EMPLEADO, cursor_siguiente); el cursor es None en la última página.
+    """
+    return _paginar(db, _consulta_empleados(estado_empleado, especialidad), models.Empleado.id, limit, after)
+
+def consulta_stream_empleados(estado_empleado: models.EstadoEmpleado | None = None, especialidad: str | None = None,
+                              after: str | None = None):
+    return _consulta_stream(_consulta_empleados(estado_empleado, especialidad), models.Empleado.id, after)
 
 def obtener_empleado(db: Session, empleado_id: int):
     emp = db.get(models.Empleado, empleado_id)
@@ -31,8 +335,10 @@ def obtener_empleado(db: Session, empleado_id: int):
         raise HTTPException(404, "Empleado no encontrado")
     return emp
 
-def actualizar_empleado(db: Session, empleado_id: int, datos: schemas.EmpleadoActualizar):
+def actualizar_empleado(db: Session, empleado_id: int, datos: schemas.EmpleadoActualizar,
+                        si_coincide: str | None = None):
     emp = obtener_empleado(db, empleado_id)
+    etags.exigir(si_coincide, etag_empleado(emp))
     payload = datos.model_dump(exclude_unset=True)
     # Mapear estado_empleado -> estado y descartar campos no existentes
     estado_val = payload.get("estado_empleado", None)
@@ -42,15 +348,25 @@ def actualizar_empleado(db: Session, empleado_id: int, datos: schemas.EmpleadoAc
     for k in ("nombre", "cargo", "estado"):
         if k in payload and payload[k] is not None:
             setattr(emp, k, payload[k])
-    db.commit(); db.refresh(emp)
+    cache.invalidar(db, *_claves_empleados(db, [emp.id]))
+    _guardar(db, si_coincide)
+    cambios.registrar(db, "empleado", "actualizar", emp.id, _datos_empleado(emp))
     return emp
 
-def eliminar_empleado(db: Session, empleado_id: int):
+def eliminar_empleado(db: Session, empleado_id: int, si_coincide: str | None = None):
     emp = obtener_empleado(db, empleado_id)
+    etags.exigir(si_coincide, etag_empleado(emp))
     dirige = db.scalar(select(func.count(models.Proyecto.id)).where(models.Proyecto.gerente_id == emp.id))
     if dirige:
         raise HTTPException(409, "No se puede eliminar: es gerente de algún proyecto")
-    db.delete(emp); db.commit()
+    cache.invalidar(db, *_claves_empleados(db, [emp.id], asignaciones=True))
+    # El ON DELETE CASCADE quita sus asignaciones: cambia el detalle de esos proyectos
+    _tocar_proyectos(db, select(models.Asignacion.proyecto_id).where(models.Asignacion.empleado_id == emp.id), -1)
+    _cerrar_asignaciones(db, models.HistorialAsignacion.asignacion_id.in_(
+        select(models.Asignacion.id).where(models.Asignacion.empleado_id == emp.id)))
+    db.delete(emp)
+    _guardar(db, si_coincide)
+    cambios.registrar(db, "empleado", "eliminar", empleado_id)
 
 # ---------- Proyectos ----------
 def crear_proyecto(db: Session, datos: schemas.ProyectoCrear) -> models.Proyecto:
@@ -63,146 +379,929 @@ def crear_proyecto(db: Session, datos: schemas.ProyectoCrear) -> models.Proyecto
         gerente_id=datos.gerente_id,
         presupuesto=(int(datos.presupuesto) if getattr(datos, "presupuesto", None) is not None else None),
     )
-    db.add(pr); db.commit(); db.refresh(pr)
+    cache.invalidar(db, *REPORTES_PROYECTO)
+    db.add(pr); db.flush()
+    cambios.registrar(db, "proyecto", "crear", pr.id, _datos_proyecto(pr))
+    _registrar_gerentes(db, {pr.id: pr.gerente_id})
     return pr
 
-def actualizar_proyecto(db: Session, proyecto_id: int, datos: schemas.ProyectoActualizar):
+def obtener_proyecto(db: Session, proyecto_id: int):
     pr = db.get(models.Proyecto, proyecto_id)
     if not pr: raise HTTPException(404, "Proyecto no encontrado")
+    return pr
+
+def actualizar_proyecto(db: Session, proyecto_id: int, datos: schemas.ProyectoActualizar,
+                        si_coincide: str | None = None):
+    pr = db.get(models.Proyecto, proyecto_id)
+    if not pr: raise HTTPException(404, "Proyecto no encontrado")
+    etags.exigir(si_coincide, etag_proyecto(pr))
     payload = datos.model_dump(exclude_unset=True)
+    cache.invalidar(db, *_claves_proyectos(db, [proyecto_id]))
     if "estado" in payload and payload["estado"] is not None:
         payload["estado"] = models.EstadoProyecto(payload["estado"])
     if "gerente_id" in payload and payload["gerente_id"] is not None:
         if not db.get(models.Empleado, payload["gerente_id"]):
             raise HTTPException(404, "Gerente no existe")
-        # Si el nuevo gerente estaba asignado como empleado, quitar esa asignación
-        db.query(models.Asignacion).filter(
-            models.Asignacion.proyecto_id == proyecto_id,
-            models.Asignacion.empleado_id == payload["gerente_id"]
-        ).delete(synchronize_session=False)
     # Ajustar tipos y descartar campos no existentes
     if "presupuesto" in payload and payload["presupuesto"] is not None:
         payload["presupuesto"] = int(payload["presupuesto"])
+    gerente_anterior = pr.gerente_id
     for k in ("nombre", "descripcion", "estado", "gerente_id", "presupuesto"):
         if k in payload:
             setattr(pr, k, payload[k])
-    db.commit(); db.refresh(pr)
+    # El UPDATE versionado va antes que _quitar_asignacion, que vuelve a tocar la versión
+    _guardar(db, si_coincide)
+    cambios.registrar(db, "proyecto", "actualizar", pr.id, _datos_proyecto(pr))
+    _registrar_gerentes(db, {pr.id: pr.gerente_id}, {pr.id: gerente_anterior})
+    if payload.get("gerente_id") is not None:
+        # Si el nuevo gerente estaba asignado como empleado, quitar esa asignación
+        _quitar_asignacion(db, payload["gerente_id"], proyecto_id)
     return pr
 
-def eliminar_proyecto(db: Session, proyecto_id: int):
+def eliminar_proyecto(db: Session, proyecto_id: int, si_coincide: str | None = None):
     pr = db.get(models.Proyecto, proyecto_id)
     if not pr: raise HTTPException(404, "Proyecto no encontrado")
-    db.delete(pr); db.commit()
+    etags.exigir(si_coincide, etag_proyecto(pr))
+    cache.invalidar(db, *_claves_proyectos(db, [proyecto_id], asignaciones=True))
+    # El ON DELETE CASCADE borra las asignaciones; liberar antes el cupo de cada empleado
+    db.execute(
+        update(models.Empleado)
+        .where(models.Empleado.id.in_(
+            select(models.Asignacion.empleado_id).where(models.Asignacion.proyecto_id == proyecto_id)
+        ))
+        .values(num_proyectos=models.Empleado.num_proyectos - 1, version=models.Empleado.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    _cerrar_asignaciones(db, models.HistorialAsignacion.asignacion_id.in_(
+        select(models.Asignacion.id).where(models.Asignacion.proyecto_id == proyecto_id)))
+    _registrar_gerentes(db, {proyecto_id: None}, {proyecto_id: pr.gerente_id})
+    db.delete(pr)
+    _guardar(db, si_coincide)
+    cambios.registrar(db, "proyecto", "eliminar", proyecto_id)
 
-def listar_proyectos(db: Session, estado: models.EstadoProyecto | None = None,
-                     presupuesto_min: float | None = None, presupuesto_max: float | None = None):
-    """
-    Lista proyectos con filtros opcionales por estado y rango de presupuesto.
-    """
-    query = select(models.Proyecto)
+def _consulta_proyectos(estado: models.EstadoProyecto | None = None,
+                        presupuesto_min: float | None = None, presupuesto_max: float | None = None):
+    query = select(*COLUMNAS_PROYECTO)
     if estado:
         query = query.where(models.Proyecto.estado == estado)
     if presupuesto_min is not None:
         query = query.where(models.Proyecto.presupuesto >= presupuesto_min)
     if presupuesto_max is not None:
         query = query.where(models.Proyecto.presupuesto <= presupuesto_max)
-    return db.scalars(query.order_by(models.Proyecto.id)).all()
+    return query
 
-def detalle_proyecto(db: Session, proyecto_id: int):
+def listar_proyectos(db: Session, estado: models.EstadoProyecto | None = None,
+                     presupuesto_min: float | None = None, presupuesto_max: float | None = None,
+                     limit: int = LIMITE_POR_DEFECTO, after: str | None = None):
     """
-    Devuelve proyecto + gerente + empleados asignados (consulta relacional).
+    Lista proyectos con filtros opcionales por estado y rango de presupuesto.
+
+    Devuelve (filas de COLUMNAS_PROYECTO, cursor_siguiente); el cursor es None en la última página.
     """
-    pr = db.get(models.Proyecto, proyecto_id)
+    query = _consulta_proyectos(estado, presupuesto_min, presupuesto_max)
+    return _paginar(db, query, models.Proyecto.id, limit, after)
+
+def consulta_stream_proyectos(estado: models.EstadoProyecto | None = None,
+                              presupuesto_min: float | None = None, presupuesto_max: float | None = None,
+                              after: str | None = None):
+    query = _consulta_proyectos(estado, presupuesto_min, presupuesto_max)
+    return _consulta_stream(query, models.Proyecto.id, after)
+
+def _proyecto_con_empleados(db: Session, proyecto_id: int, con_gerente: bool = False) -> models.Proyecto:
+    """
+    Carga el proyecto con sus asignaciones y empleados (y opcionalmente el
+    gerente) en una sola consulta con LEFT OUTER JOINs.
+    """
+    opciones = [joinedload(models.Proyecto.asignaciones).joinedload(models.Asignacion.empleado)]
+    if con_gerente:
+        opciones.append(joinedload(models.Proyecto.gerente))
+    pr = db.scalars(
+        select(models.Proyecto).where(models.Proyecto.id == proyecto_id).options(*opciones)
+    ).unique().one_or_none()
     if not pr:
         raise HTTPException(404, "Proyecto no encontrado")
-    emps = db.scalars(
-        select(models.Empleado).join(models.Asignacion, models.Asignacion.empleado_id == models.Empleado.id
-        ).where(models.Asignacion.proyecto_id == proyecto_id)
-    ).all()
-    ger = db.get(models.Empleado, pr.gerente_id) if pr.gerente_id else None
-    return pr, ger, emps
+    return pr
+
+def detalle_proyecto(db: Session, proyecto_id: int):
+    """
+    Devuelve proyecto + gerente + empleados asignados (consulta relacional).
+    """
+    pr = _proyecto_con_empleados(db, proyecto_id, con_gerente=True)
+    emps = [a.empleado for a in sorted(pr.asignaciones, key=lambda a: a.empleado_id)]
+    return pr, pr.gerente, emps
 
 # ---------- Asignaciones (N:M) ----------
-def _cuenta_asignaciones(db: Session, empleado_id: int) -> int:
-    return db.scalar(select(func.count(models.Asignacion.id)).where(models.Asignacion.empleado_id == empleado_id)) or 0
+def _cambiar_cupo(db: Session, empleado_ids, delta: int):
+    _actualizar_cargados(
+        db,
+        update(models.Empleado).where(models.Empleado.id.in_(empleado_ids))
+        .values(num_proyectos=models.Empleado.num_proyectos + delta, version=models.Empleado.version + 1),
+        models.Empleado, models.Empleado.num_proyectos, models.Empleado.version,
+    )
 
-def asignar_empleado(db: Session, datos: schemas.AsignacionCrear) -> models.Asignacion:
-    emp = db.get(models.Empleado, datos.empleado_id)
-    pr = db.get(models.Proyecto, datos.proyecto_id)
-    if not emp or not pr:
-        raise HTTPException(404, "Empleado o proyecto inexistente")
+def _quitar_asignacion(db: Session, empleado_id: int, proyecto_id: int) -> int:
+    """Borra la asignación (si existe), devuelve el cupo al empleado, versiona ambos e invalida sus claves."""
+    ids = db.scalars(
+        delete(models.Asignacion).where(
+            models.Asignacion.empleado_id == empleado_id,
+            models.Asignacion.proyecto_id == proyecto_id,
+        ).returning(models.Asignacion.id).execution_options(synchronize_session=False)
+    ).all()
+    if ids:
+        _cambiar_cupo(db, [empleado_id], -len(ids))
+        _tocar_proyectos(db, [proyecto_id], -len(ids))
+        _registrar_asignaciones(db, "eliminar", [(id_, empleado_id, proyecto_id) for id_ in ids])
+        cache.invalidar(db, *_claves_asignacion(empleado_id, proyecto_id))
+    return len(ids)
 
-    # No duplicado N:M
-    ya = db.scalar(select(models.Asignacion).where(
-        models.Asignacion.empleado_id == emp.id,
-        models.Asignacion.proyecto_id == pr.id
+def _motivo_rechazo(db: Session, empleado_id: int, proyecto_id: int) -> HTTPException:
+    """
+    Sólo en el camino de error: averigua qué regla impidió reservar el cupo.
+    """
+    emp = db.get(models.Empleado, empleado_id)
+    pr = db.get(models.Proyecto, proyecto_id)
+    if not emp or not pr:
+        return HTTPException(404, "Empleado o proyecto inexistente")
+    ya = db.scalar(select(models.Asignacion.id).where(
+        models.Asignacion.empleado_id == empleado_id,
+        models.Asignacion.proyecto_id == proyecto_id
     ))
-    if ya: raise HTTPException(409, "Empleado ya está asignado a este proyecto")
-
-    # Máximo 5 proyectos por empleado
-    if _cuenta_asignaciones(db, emp.id) >= MAX_PROYECTOS_POR_EMPLEADO:
-        raise HTTPException(409, "Empleado ya tiene el máximo de 5 proyectos")
+    if ya:
+        return HTTPException(409, "Empleado ya está asignado a este proyecto")
+    if pr.gerente_id == empleado_id:
+        return HTTPException(409, "El gerente del proyecto no puede asignarse como empleado")
+    return HTTPException(409, "Empleado ya tiene el máximo de 5 proyectos")
 
-    # Gerente no puede estar asignado como empleado del mismo proyecto
-    if pr.gerente_id == emp.id:
-        raise HTTPException(409, "El gerente del proyecto no puede asignarse como empleado")
+def asignar_empleado(db: Session, datos: schemas.AsignacionCrear) -> schemas.AsignacionSalida:
+    """
+    Asigna sin carreras check-then-act: un único UPDATE reserva el cupo del
+    empleado sólo si existe, tiene menos de MAX_PROYECTOS_POR_EMPLEADO
+    proyectos y no es gerente del proyecto (que debe existir). El UPDATE
+    bloquea la fila (o la base en SQLite) hasta el commit, así que dos
+    peticiones concurrentes no pueden ver ambas 4 asignaciones. Los
+    duplicados los detecta la restricción uq_empleado_proyecto.
+    """
+    e, p = datos.empleado_id, datos.proyecto_id
+    proyecto_admite = select(models.Proyecto.id).where(
+        models.Proyecto.id == p,
+        or_(models.Proyecto.gerente_id.is_(None), models.Proyecto.gerente_id != e),
+    ).exists()
+    reservado = db.execute(
+        update(models.Empleado)
+        .where(models.Empleado.id == e,
+               models.Empleado.num_proyectos < MAX_PROYECTOS_POR_EMPLEADO,
+               proyecto_admite)
+        .values(num_proyectos=models.Empleado.num_proyectos + 1, version=models.Empleado.version + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not reservado:
+        db.rollback()
+        raise _motivo_rechazo(db, e, p)
 
-    asg = models.Asignacion(empleado_id=emp.id, proyecto_id=pr.id)
-    db.add(asg); db.commit(); db.refresh(asg)
-    return asg
+    asg = models.Asignacion(empleado_id=e, proyecto_id=p)
+    db.add(asg)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, "Empleado ya está asignado a este proyecto")
+    _tocar_proyectos(db, [p], 1)
+    cache.invalidar(db, *_claves_asignacion(e, p))
+    _registrar_asignaciones(db, "crear", [(asg.id, e, p)])
+    return schemas.AsignacionSalida.model_validate(asg)
 
 def desasignar_empleado(db: Session, datos: schemas.AsignacionCrear):
-    filas = db.query(models.Asignacion).filter(
-        models.Asignacion.empleado_id == datos.empleado_id,
-        models.Asignacion.proyecto_id == datos.proyecto_id
-    ).delete(synchronize_session=False)
-    if not filas: raise HTTPException(404, "Asignación no encontrada")
-    db.commit()
+    if not _quitar_asignacion(db, datos.empleado_id, datos.proyecto_id):
+        raise HTTPException(404, "Asignación no encontrada")
 
 def fijar_gerente(db: Session, proyecto_id: int, empleado_id: int):
     pr = db.get(models.Proyecto, proyecto_id)
     emp = db.get(models.Empleado, empleado_id)
     if not pr or not emp:
         raise HTTPException(404, "Proyecto o empleado no existe")
+    cache.invalidar(db, *_claves_proyectos(db, [proyecto_id]))
 
+    anterior, pr.gerente_id = pr.gerente_id, empleado_id
+    _guardar(db)
+    cambios.registrar(db, "proyecto", "actualizar", pr.id, _datos_proyecto(pr))
+    _registrar_gerentes(db, {pr.id: empleado_id}, {pr.id: anterior})
     # Si estaba asignado como empleado, quitarlo
-    db.query(models.Asignacion).filter(
-        models.Asignacion.proyecto_id == proyecto_id,
-        models.Asignacion.empleado_id == empleado_id
-    ).delete(synchronize_session=False)
-
-    pr.gerente_id = empleado_id
-    db.commit(); db.refresh(pr)
+    _quitar_asignacion(db, empleado_id, proyecto_id)
     return pr
 
 def quitar_gerente(db: Session, proyecto_id: int):
     pr = db.get(models.Proyecto, proyecto_id)
     if not pr: raise HTTPException(404, "Proyecto no existe")
-    pr.gerente_id = None
-    db.commit(); db.refresh(pr)
+    cache.invalidar(db, *_claves_proyectos(db, [proyecto_id]))
+    anterior, pr.gerente_id = pr.gerente_id, None
+    _guardar(db)
+    cambios.registrar(db, "proyecto", "actualizar", pr.id, _datos_proyecto(pr))
+    _registrar_gerentes(db, {pr.id: None}, {pr.id: anterior})
     return pr
 
-def empleados_sin_proyecto(db: Session):
-    sub = select(models.Asignacion.empleado_id).distinct()
-    return db.scalars(select(models.Empleado).where(models.Empleado.id.not_in(sub)).order_by(models.Empleado.id)).all()
+def _consulta_membresia(con_proyecto: bool, estado_empleado: models.EstadoEmpleado | None = None):
+    """
+    Semi-join (EXISTS) / anti-join (NOT EXISTS) correlacionado contra
+    asignaciones: por cada empleado basta una búsqueda en el índice de
+    uq_empleado_proyecto (empleado_id, proyecto_id), sin materializar la
+    lista de empleados asignados como hacía NOT IN (SELECT DISTINCT ...).
+    """
+    asignado = select(models.Asignacion.empleado_id).where(
+        models.Asignacion.empleado_id == models.Empleado.id
+    ).exists()
+    return _consulta_empleados(estado_empleado).where(asignado if con_proyecto else ~asignado)
+
+def empleados_sin_proyecto(db: Session, estado_empleado: models.EstadoEmpleado | None = None,
+                           limit: int = LIMITE_POR_DEFECTO, after: str | None = None):
+    return _paginar(db, _consulta_membresia(False, estado_empleado), models.Empleado.id, limit, after)
+
+def empleados_con_proyecto(db: Session, estado_empleado: models.EstadoEmpleado | None = None,
+                           limit: int = LIMITE_POR_DEFECTO, after: str | None = None):
+    return _paginar(db, _consulta_membresia(True, estado_empleado), models.Empleado.id, limit, after)
 
-def empleados_con_proyecto(db: Session):
-    sub = select(models.Asignacion.empleado_id).distinct()
-    return db.scalars(select(models.Empleado).where(models.Empleado.id.in_(sub)).order_by(models.Empleado.id)).all()
+# ---------- Búsqueda de texto ----------
+# Con SQLite, índices FTS5 (app/busqueda.py) ordenados por relevancia (bm25);
+# en otros motores, ILIKE de cada término sobre las mismas columnas, por id.
+
+def _contiene(termino: str) -> str:
+    # Patrón LIKE literal: los términos conservan "_" (\w), que sin escapar es comodín
+    return "%" + termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def _coincide_texto(tabla: str, modelo, grupos: list[list[str]], columna: str | None = None):
+    """Condición "el id de `modelo` coincide con los términos" para usar en un WHERE."""
+    if busqueda.disponible():
+        fts = busqueda.tabla_fts(tabla)
+        coincidentes = select(fts.c.rowid).where(fts.c[fts.name].op("MATCH")(busqueda.expresion(grupos, columna)))
+        return modelo.id.in_(coincidentes)
+    columnas = [getattr(modelo, c) for c in ((columna,) if columna else busqueda.INDICES[tabla][1])]
+    return and_(*(or_(*(c.ilike(_contiene(t), escape="\\") for c in columnas)) for t, *_ in grupos))
+
+def _filtro_cargo(especialidad: str):
+    grupos = [[t] for t in busqueda.terminos(especialidad)]
+    return _coincide_texto("empleados", models.Empleado, grupos, columna="cargo") if grupos else true()
+
+def _paginar_por_posicion(db: Session, consulta, limit: int, after: str | None):
+    """
+    Como _paginar, pero el cursor es la posición en un orden por relevancia
+    (no hay keyset posible). consulta(tope) arma la consulta ordenada; le
+    basta con que sus primeras `tope` filas sean las correctas.
+    """
+    desde = decodificar_cursor(after) if after else 0
+    filas = db.execute(consulta(desde + limit + 1).offset(desde).limit(limit + 1)).all()
+    siguiente = codificar_cursor(desde + limit) if len(filas) > limit else None
+    return filas[:limit], siguiente
+
+def _buscar(db: Session, tabla: str, modelo, columnas, q: str, filtros, tolerante: bool,
+            limit: int, after: str | None):
+    grupos = [[t] for t in busqueda.terminos(q)]
+    if not grupos:
+        raise HTTPException(422, "La búsqueda no contiene términos")
+
+    def consulta(grupos, tope: int):
+        if not busqueda.disponible():
+            return select(*columnas).where(_coincide_texto(tabla, modelo, grupos), *filtros).order_by(modelo.id)
+        fts = busqueda.tabla_fts(tabla)
+        relevancia = busqueda.relevancia(tabla).label("relevancia")
+        candidatos = select(fts.c.rowid.label("id"), relevancia).select_from(fts)
+        if filtros:
+            candidatos = candidatos.join(modelo, modelo.id == fts.c.rowid).where(*filtros)
+        candidatos = (
+            candidatos.where(fts.c[fts.name].op("MATCH")(busqueda.expresion(grupos)))
+            # Top-k: SQLite ordena con un montículo de `tope` filas, así que se
+            # rankean todas las coincidencias pero sólo se guardan las necesarias
+            .order_by(relevancia, fts.c.rowid)
+            .limit(tope)
+            .subquery()
+        )
+        return (
+            select(*columnas)
+            .join_from(candidatos, modelo, modelo.id == candidatos.c.id)
+            .order_by(candidatos.c.relevancia, modelo.id)
+        )
+
+    filas, siguiente = _paginar_por_posicion(db, lambda tope: consulta(grupos, tope), limit, after)
+    if filas or not tolerante or not busqueda.disponible():
+        return filas, siguiente
+    # Sin resultados: reintentar sumando a cada término sus correcciones del vocabulario
+    corregidos = [[t, *busqueda.correcciones(db, tabla, t)] for t, in grupos]
+    if corregidos == grupos:
+        return filas, siguiente
+    return _paginar_por_posicion(db, lambda tope: consulta(corregidos, tope), limit, after)
+
+def buscar_empleados(db: Session, q: str, estado_empleado: models.EstadoEmpleado | None = None,
+                     tolerante: bool = True, limit: int = LIMITE_POR_DEFECTO, after: str | None = None):
+    """
+    Busca por nombre, cargo y cc (todos los términos deben coincidir; el
+    último, por prefijo), ordenado por relevancia. Con `tolerante`, si no hay
+    resultados reintenta corrigiendo errores de tipeo.
+    """
+    filtros = [models.Empleado.estado == estado_empleado] if estado_empleado else []
+    return _buscar(db, "empleados", models.Empleado, COLUMNAS_EMPLEADO, q, filtros, tolerante, limit, after)
+
+def buscar_proyectos(db: Session, q: str, estado: models.EstadoProyecto | None = None,
+                     tolerante: bool = True, limit: int = LIMITE_POR_DEFECTO, after: str | None = None):
+    """Como buscar_empleados, sobre nombre y descripción de los proyectos."""
+    filtros = [models.Proyecto.estado == estado] if estado else []
+    return _buscar(db, "proyectos", models.Proyecto, COLUMNAS_PROYECTO, q, filtros, tolerante, limit, after)
 
 def proyectos_de_empleado(db: Session, empleado_id: int):
-    emp = obtener_empleado(db, empleado_id)
-    proys = db.scalars(
-        select(models.Proyecto).join(models.Asignacion, models.Asignacion.proyecto_id == models.Proyecto.id
-        ).where(models.Asignacion.empleado_id == empleado_id)
-    ).all()
-    return emp, proys
+    emp = db.scalars(
+        select(models.Empleado).where(models.Empleado.id == empleado_id).options(
+            joinedload(models.Empleado.asignaciones).joinedload(models.Asignacion.proyecto)
+        )
+    ).unique().one_or_none()
+    if not emp:
+        raise HTTPException(404, "Empleado no encontrado")
+    return emp, [a.proyecto for a in sorted(emp.asignaciones, key=lambda a: a.proyecto_id)]
 
 def empleados_de_proyecto(db: Session, proyecto_id: int):
-    pr = db.get(models.Proyecto, proyecto_id)
-    if not pr: raise HTTPException(404, "Proyecto no encontrado")
-    emps = db.scalars(
-        select(models.Empleado).join(models.Asignacion, models.Asignacion.empleado_id == models.Empleado.id
-        ).where(models.Asignacion.proyecto_id == proyecto_id)
+    pr = _proyecto_con_empleados(db, proyecto_id)
+    return pr, [a.empleado for a in sorted(pr.asignaciones, key=lambda a: a.empleado_id)]
+
+# ---------- Consultas en un instante (historial) ----------
+def _utc(en: datetime) -> datetime:
+    # El historial guarda UTC sin zona; un instante sin zona se toma como UTC
+    return en.astimezone(timezone.utc).replace(tzinfo=None) if en.tzinfo else en
+
+def _vigente_en(h, en: datetime):
+    return and_(h.desde <= en, or_(h.hasta.is_(None), h.hasta > en))
+
+def _exigir_conocido(db: Session, modelo, entidad_id: int, *historial, detalle: str) -> None:
+    """404 si `entidad_id` no existe ni aparece en `historial` (columnas indexadas): un eliminado conserva su pasado."""
+    consultas = [select(modelo.id).where(modelo.id == entidad_id), *(select(c).where(c == entidad_id) for c in historial)]
+    if not db.scalar(select(or_(*(q.exists() for q in consultas)))):
+        raise HTTPException(404, detalle)
+
+# Outer join desde el historial: quien fue eliminado después de `en` sigue en
+# la respuesta, pero sólo con su id (en `eliminados`), porque sus datos ya no están.
+def proyectos_de_empleado_en(db: Session, empleado_id: int, en: datetime) -> schemas.ProyectosDeEmpleadoEn:
+    """Proyectos a los que estaba asignado el empleado en el instante `en`."""
+    en, h = _utc(en), models.HistorialAsignacion
+    filas = db.execute(
+        select(h.proyecto_id, *COLUMNAS_PROYECTO).outerjoin(models.Proyecto, models.Proyecto.id == h.proyecto_id)
+        .where(h.empleado_id == empleado_id, _vigente_en(h, en)).order_by(h.proyecto_id)
+    ).all()
+    if not filas:
+        _exigir_conocido(db, models.Empleado, empleado_id, h.empleado_id, detalle="Empleado no encontrado")
+    return schemas.ProyectosDeEmpleadoEn(
+        empleado_id=empleado_id, en=en, proyectos=[f._asdict() for f in filas if f.id is not None],
+        eliminados=[f.proyecto_id for f in filas if f.id is None])
+
+def empleados_de_proyecto_en(db: Session, proyecto_id: int, en: datetime) -> schemas.EmpleadosDeProyectoEn:
+    """Empleados asignados al proyecto, y su gerente, en el instante `en`."""
+    en, h, g = _utc(en), models.HistorialAsignacion, models.HistorialGerente
+    filas = db.execute(
+        select(h.empleado_id, *COLUMNAS_EMPLEADO).outerjoin(models.Empleado, models.Empleado.id == h.empleado_id)
+        .where(h.proyecto_id == proyecto_id, _vigente_en(h, en)).order_by(h.empleado_id)
+    ).all()
+    gerente = db.scalar(select(g.empleado_id).where(g.proyecto_id == proyecto_id, _vigente_en(g, en)))
+    if not filas and gerente is None:
+        _exigir_conocido(db, models.Proyecto, proyecto_id, h.proyecto_id, g.proyecto_id,
+                         detalle="Proyecto no encontrado")
+    return schemas.EmpleadosDeProyectoEn(
+        proyecto_id=proyecto_id, en=en, gerente_id=gerente,
+        empleados=[f._asdict() for f in filas if f.id is not None],
+        eliminados=[f.empleado_id for f in filas if f.id is None])
+
+# ---------- Lecturas con caché ----------
+# Devuelven {"etag", "cuerpo"}: el cuerpo es la representación JSON de la
+# respuesta (no objetos ORM), que es lo que se guarda en la caché y puede
+# compartirse entre workers, junto con el ETag de la versión que representa.
+
+def _leer_condicional(db: Session, k: str, version, cargar, si_no_coincide: str | None) -> dict:
+    """
+    cargar() devuelve (etag, cuerpo), con el ETag calculado de las versiones
+    de los objetos que cargó, así que el ETag siempre describe ese cuerpo.
+    Si el cliente envía If-None-Match y no hay entrada en caché, antes se
+    consulta sólo la versión (version(db)) para responder 304 sin cargar el
+    grafo; con la entrada en caché el 304 no consulta la base.
+    """
+    def cargar_entrada():
+        if si_no_coincide is not None:
+            etag = version(db)
+            if etags.coincide(si_no_coincide, etag):
+                raise etags.no_modificado(etag)
+        etag, cuerpo = cargar()
+        return {"etag": etag, "cuerpo": cuerpo}
+    entrada = cache.leer(k, cargar_entrada, omitir=db.info.get(SIN_CACHE, False))
+    if etags.coincide(si_no_coincide, entrada["etag"]):
+        raise etags.no_modificado(entrada["etag"])
+    return entrada
+
+def _suma_versiones(objs) -> int:
+    return sum(o.version for o in objs)
+
+def leer_empleado(db: Session, empleado_id: int, si_no_coincide: str | None = None) -> dict:
+    def cargar():
+        emp = obtener_empleado(db, empleado_id)
+        return etag_empleado(emp), schemas.EmpleadoSalida.model_validate(emp).model_dump(mode="json")
+    return _leer_condicional(db, cache.clave("empleado", empleado_id),
+                             lambda db: _version_empleado(db, empleado_id), cargar, si_no_coincide)
+
+def leer_proyecto(db: Session, proyecto_id: int, si_no_coincide: str | None = None) -> dict:
+    def cargar():
+        pr = obtener_proyecto(db, proyecto_id)
+        return etag_proyecto(pr), schemas.ProyectoSalida.model_validate(pr).model_dump(mode="json")
+    return _leer_condicional(db, cache.clave("proyecto", proyecto_id),
+                             lambda db: _version_proyecto(db, proyecto_id), cargar, si_no_coincide)
+
+def leer_detalle_proyecto(db: Session, proyecto_id: int, si_no_coincide: str | None = None) -> dict:
+    def cargar():
+        pr, ger, emps = detalle_proyecto(db, proyecto_id)
+        etag = etags.etag("d", pr.id, pr.version, _suma_versiones(emps), ger.version if ger else 0)
+        return etag, schemas.ProyectoDetalle(proyecto=pr, gerente=ger, empleados=emps).model_dump(mode="json")
+    return _leer_condicional(db, cache.clave("detalle", proyecto_id),
+                             lambda db: _version_empleados_de_proyecto(db, proyecto_id, con_gerente=True),
+                             cargar, si_no_coincide)
+
+def leer_proyectos_de_empleado(db: Session, empleado_id: int, si_no_coincide: str | None = None) -> dict:
+    def cargar():
+        emp, proys = proyectos_de_empleado(db, empleado_id)
+        etag = etags.etag("ep", emp.id, emp.version, _suma_versiones(proys))
+        return etag, schemas.ProyectosDeEmpleado(empleado=emp, proyectos=proys).model_dump(mode="json")
+    return _leer_condicional(db, cache.clave("proyectos_de_empleado", empleado_id),
+                             lambda db: _version_proyectos_de_empleado(db, empleado_id), cargar, si_no_coincide)
+
+def leer_empleados_de_proyecto(db: Session, proyecto_id: int, si_no_coincide: str | None = None) -> dict:
+    def cargar():
+        pr, emps = empleados_de_proyecto(db, proyecto_id)
+        etag = etags.etag("pe", pr.id, pr.version, _suma_versiones(emps))
+        return etag, schemas.EmpleadosDeProyecto(proyecto=pr, empleados=emps).model_dump(mode="json")
+    return _leer_condicional(db, cache.clave("empleados_de_proyecto", proyecto_id),
+                             lambda db: _version_empleados_de_proyecto(db, proyecto_id), cargar, si_no_coincide)
+
+# ---------- Reportes (agregados en SQL) ----------
+# La dotación sale de proyectos.num_empleados, que cada escritura de
+# asignaciones actualiza en su misma transacción (_tocar_proyectos): ningún
+# reporte recorre asignaciones, así que el costo en frío crece con los
+# proyectos y empleados, no con las asignaciones. Las filas se arman como
+# dicts con los tipos de schemas.Reporte* (totales en float) y se serializan
+# una vez: la caché guarda el JSON y un acierto no valida ni vuelve a codificar.
+def _flotante(valor) -> float | None:
+    return None if valor is None else float(valor)
+
+def _filas_reporte(db: Session, consulta) -> list:
+    # Core sobre la conexión de la sesión: sin la capa de carga del ORM, que
+    # con decenas de miles de proyectos costaba más que la consulta
+    return db.connection().execute(consulta).all()
+
+def _estado(columna):
+    # El texto guardado: to_json serializa un str mucho más rápido que un Enum
+    return type_coerce(columna, String).label("estado")
+
+def _dotacion(db: Session) -> dict:
+    p = models.Proyecto
+    por_proyecto = _filas_reporte(db, select(p.id, p.nombre, _estado(p.estado), p.num_empleados).order_by(p.id))
+    # El agregado por estado sale del anterior sin otra consulta
+    por_estado: dict = {}
+    for _, _, estado, empleados in por_proyecto:
+        proyectos, total = por_estado.get(estado, (0, 0))
+        por_estado[estado] = (proyectos + 1, total + empleados)
+    return {
+        "por_proyecto": [{"proyecto_id": i, "nombre": n, "estado": e, "empleados": c} for i, n, e, c in por_proyecto],
+        "por_estado": [{"estado": e, "proyectos": p, "empleados": c} for e, (p, c) in por_estado.items()],
+    }
+
+def _capacidad(db: Session) -> dict:
+    conteo = dict(_filas_reporte(
+        db, select(models.Empleado.num_proyectos, func.count()).group_by(models.Empleado.num_proyectos)))
+    return {
+        "maximo": MAX_PROYECTOS_POR_EMPLEADO,
+        "histograma": [{"proyectos": n, "empleados": conteo.get(n, 0)} for n in range(MAX_PROYECTOS_POR_EMPLEADO + 1)],
+        "con_cupo": sum(c for n, c in conteo.items() if n < MAX_PROYECTOS_POR_EMPLEADO),
+    }
+
+def _presupuesto(db: Session) -> dict:
+    p = models.Proyecto
+    agregados = (func.count(), func.sum(p.presupuesto), func.avg(p.presupuesto))
+    por_estado = _filas_reporte(db, select(_estado(p.estado), *agregados).group_by(p.estado))
+    por_gerente = _filas_reporte(db, select(p.gerente_id, *agregados).group_by(p.gerente_id).order_by(p.gerente_id))
+    return {
+        "por_estado": [{"estado": e, "proyectos": c, "total": _flotante(t), "promedio": _flotante(a)}
+                       for e, c, t, a in por_estado],
+        "por_gerente": [{"gerente_id": g, "proyectos": c, "total": _flotante(t), "promedio": _flotante(a)}
+                        for g, c, t, a in por_gerente],
+    }
+
+def _gerentes(db: Session) -> dict:
+    p = models.Proyecto
+    filas = _filas_reporte(
+        db,
+        select(models.Empleado.id, models.Empleado.nombre, func.count(p.id), func.sum(p.num_empleados),
+               func.sum(p.presupuesto))
+        .join(p, p.gerente_id == models.Empleado.id)
+        .group_by(models.Empleado.id)
+        .order_by(models.Empleado.id)
+    )
+    return {"gerentes": [
+        {"gerente_id": i, "nombre": n, "proyectos": c, "empleados_a_cargo": e, "presupuesto_total": _flotante(t)}
+        for i, n, c, e, t in filas
+    ]}
+
+_REPORTES = {"dotacion": _dotacion, "capacidad": _capacidad, "presupuesto": _presupuesto, "gerentes": _gerentes}
+
+def reporte(db: Session, nombre: str) -> str:
+    """
+    Devuelve el JSON de un reporte agregado desde la caché; se recalcula
+    (una consulta por sección) sólo cuando una escritura lo invalidó.
+    """
+    return cache.leer(cache.clave("reporte", nombre), lambda: to_json(_REPORTES[nombre](db)).decode(),
+                      ttl=obtener_settings().CACHE_TTL_REPORTES_SEGUNDOS, omitir=db.info.get(SIN_CACHE, False))
+
+# ---------- Cargas masivas ----------
+# Las reglas de negocio se verifican sobre el lote completo con consultas por
+# conjuntos (IN por trozos) y los INSERT/UPDATE se envían con executemany en
+# transacciones de TAMANO_TROZO filas. Cada trozo se confirma por separado:
+# es lo único de crud que confirma por su cuenta, para que un trozo con
+# conflicto no deshaga los anteriores y la transacción no crezca con el lote.
+
+def _en_trozos(seq: list, n: int = TAMANO_TROZO):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def _error(nro: int, mensaje: str) -> schemas.ResultadoFila:
+    return schemas.ResultadoFila(fila=nro, ok=False, error=mensaje)
+
+def _insertar_trozos(db: Session, modelo, filas: list[tuple[int, dict]], antes_de_commit=None) -> list[schemas.ResultadoFila]:
+    resultados = []
+    for trozo in _en_trozos(filas):
+        try:
+            ids = db.scalars(
+                insert(modelo).returning(modelo.id, sort_by_parameter_order=True),
+                [valores for _, valores in trozo],
+            ).all()
+            if antes_de_commit:
+                antes_de_commit(trozo, ids)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            resultados.extend(_error(nro, "Conflicto de integridad al insertar el trozo") for nro, _ in trozo)
+            continue
+        resultados.extend(schemas.ResultadoFila(fila=nro, ok=True, id=id_, accion="creado")
+                          for (nro, _), id_ in zip(trozo, ids))
+    return resultados
+
+def _actualizar_trozos(db: Session, modelo, filas: list[tuple[int, dict]], antes_de_commit=None) -> list[schemas.ResultadoFila]:
+    # UPDATE por id en executemany (Core: el bulk por clave primaria del ORM
+    # exige la versión leída); las columnas salen de las claves de cada fila
+    tabla = modelo.__table__
+    sentencia = update(tabla).where(tabla.c.id == bindparam("b_id")).values(version=tabla.c.version + 1)
+    resultados = []
+    for trozo in _en_trozos(filas):
+        try:
+            db.connection().execute(sentencia, [{"b_id": v["id"], **{k: x for k, x in v.items() if k != "id"}}
+                                                for _, v in trozo])
+            if antes_de_commit:
+                antes_de_commit(trozo)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            resultados.extend(_error(nro, "Conflicto de integridad al actualizar el trozo") for nro, _ in trozo)
+            continue
+        resultados.extend(schemas.ResultadoFila(fila=nro, ok=True, id=valores["id"], accion="actualizado")
+                          for nro, valores in trozo)
+    return resultados
+
+def _sin_repetidos(filas: list, clave, mensaje: str):
+    vistos, unicas, errores = set(), [], []
+    for nro, datos in filas:
+        k = clave(datos)
+        if k in vistos:
+            errores.append(_error(nro, mensaje))
+        else:
+            vistos.add(k)
+            unicas.append((nro, datos))
+    return unicas, errores
+
+def crear_empleados_lote(db: Session, filas: list[tuple[int, schemas.EmpleadoCrear]],
+                         upsert: bool = False) -> list[schemas.ResultadoFila]:
+    """
+    Inserta (o actualiza por cc si upsert=True) un lote de empleados.
+    """
+    filas, resultados = _sin_repetidos(filas, lambda d: d.cc, "cc repetida dentro del lote")
+    existentes: dict[str, int] = {}
+    for trozo in _en_trozos([d.cc for _, d in filas]):
+        existentes.update(db.execute(
+            select(models.Empleado.cc, models.Empleado.id).where(models.Empleado.cc.in_(trozo))
+        ).all())
+
+    nuevos, actualizados = [], []
+    for nro, d in filas:
+        valores = {"cc": d.cc, "nombre": d.nombre, "cargo": d.cargo,
+                   "estado": models.EstadoEmpleado(d.estado_empleado)}
+        if d.cc not in existentes:
+            nuevos.append((nro, valores))
+        elif upsert:
+            actualizados.append((nro, {"id": existentes[d.cc], **valores}))
+        else:
+            resultados.append(_error(nro, "La cédula (cc) ya existe"))
+
+    def registrar_nuevos(trozo, ids):
+        cache.invalidar(db, *REPORTES_EMPLEADO)
+        for (_, v), id_ in zip(trozo, ids):
+            cambios.registrar(db, "empleado", "crear", id_, _datos_empleado({**v, "id": id_}))
+
+    def invalidar_cambios(trozo):
+        cache.invalidar(db, *_claves_empleados(db, [v["id"] for _, v in trozo]))
+        for _, v in trozo:
+            cambios.registrar(db, "empleado", "actualizar", v["id"], _datos_empleado(v))
+
+    resultados += _insertar_trozos(db, models.Empleado, nuevos, antes_de_commit=registrar_nuevos)
+    resultados += _actualizar_trozos(db, models.Empleado, actualizados, antes_de_commit=invalidar_cambios)
+    return resultados
+
+def crear_proyectos_lote(db: Session, filas: list[tuple[int, schemas.ProyectoCrear]],
+                         upsert: bool = False) -> list[schemas.ResultadoFila]:
+    """
+    Inserta (o actualiza por nombre si upsert=True) un lote de proyectos.
+    """
+    filas, resultados = _sin_repetidos(filas, lambda d: d.nombre, "Nombre de proyecto repetido dentro del lote")
+    existentes: dict[str, int] = {}
+    for trozo in _en_trozos([d.nombre for _, d in filas]):
+        existentes.update(db.execute(
+            select(models.Proyecto.nombre, models.Proyecto.id).where(models.Proyecto.nombre.in_(trozo))
+        ).all())
+    gerentes = {d.gerente_id for _, d in filas if d.gerente_id is not None}
+    gerentes_validos: set[int] = set()
+    for trozo in _en_trozos(list(gerentes)):
+        gerentes_validos.update(db.scalars(select(models.Empleado.id).where(models.Empleado.id.in_(trozo))))
+
+    nuevos, actualizados = [], []
+    for nro, d in filas:
+        if d.gerente_id is not None and d.gerente_id not in gerentes_validos:
+            resultados.append(_error(nro, "Gerente no existe"))
+            continue
+        valores = {"nombre": d.nombre, "descripcion": d.descripcion,
+                   "estado": models.EstadoProyecto(d.estado), "gerente_id": d.gerente_id,
+                   "presupuesto": int(d.presupuesto) if d.presupuesto is not None else None}
+        if d.nombre not in existentes:
+            nuevos.append((nro, valores))
+        elif upsert:
+            actualizados.append((nro, {"id": existentes[d.nombre], **valores}))
+        else:
+            resultados.append(_error(nro, "Ya existe un proyecto con ese nombre"))
+
+    def registrar_nuevos(trozo, ids):
+        cache.invalidar(db, *REPORTES_PROYECTO)
+        for (_, v), id_ in zip(trozo, ids):
+            cambios.registrar(db, "proyecto", "crear", id_, _datos_proyecto({**v, "id": id_}))
+        _registrar_gerentes(db, {id_: v["gerente_id"] for (_, v), id_ in zip(trozo, ids)})
+
+    def quitar_gerentes_asignados(trozo):
+        cache.invalidar(db, *_claves_proyectos(db, [v["id"] for _, v in trozo]))
+        for _, v in trozo:
+            cambios.registrar(db, "proyecto", "actualizar", v["id"], _datos_proyecto(v))
+        # El UPDATE ya pisó gerente_id: el anterior sale del intervalo vigente
+        h = models.HistorialGerente
+        previos = dict(db.execute(select(h.proyecto_id, h.empleado_id)
+                                  .where(h.proyecto_id.in_([v["id"] for _, v in trozo]), h.hasta.is_(None))).all())
+        _registrar_gerentes(db, {v["id"]: v["gerente_id"] for _, v in trozo}, previos)
+        # Igual que actualizar_proyecto: el nuevo gerente deja de estar asignado como empleado
+        pares = [(v["gerente_id"], v["id"]) for _, v in trozo if v["gerente_id"] is not None]
+        if not pares:
+            return
+        par = tuple_(models.Asignacion.empleado_id, models.Asignacion.proyecto_id)
+        quitadas = db.execute(
+            delete(models.Asignacion).where(par.in_(pares))
+            .returning(models.Asignacion.id, models.Asignacion.empleado_id, models.Asignacion.proyecto_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        for e, n in Counter(e for _, e, _ in quitadas).items():
+            _cambiar_cupo(db, [e], -n)
+        cache.invalidar(db, *set().union(*(_claves_asignacion(e, p) for _, e, p in quitadas)))
+        if quitadas:
+            _tocar_proyectos(db, [p for _, _, p in quitadas], -1)
+        _registrar_asignaciones(db, "eliminar", quitadas)
+
+    resultados += _insertar_trozos(db, models.Proyecto, nuevos, antes_de_commit=registrar_nuevos)
+    resultados += _actualizar_trozos(db, models.Proyecto, actualizados, antes_de_commit=quitar_gerentes_asignados)
+    return resultados
+
+def asignar_empleados_lote(db: Session, filas: list[tuple[int, schemas.AsignacionCrear]]) -> list[schemas.ResultadoFila]:
+    """
+    Crea un lote de asignaciones aplicando las mismas reglas que
+    asignar_empleado, evaluadas en memoria sobre conjuntos precargados.
+    """
+    emp_ids = list({d.empleado_id for _, d in filas})
+    pr_ids = list({d.proyecto_id for _, d in filas})
+    empleados: set[int] = set()
+    pares: set[tuple[int, int]] = set()
+    gerentes: dict[int, int | None] = {}
+    for trozo in _en_trozos(emp_ids):
+        empleados.update(db.scalars(select(models.Empleado.id).where(models.Empleado.id.in_(trozo))))
+        pares.update(db.execute(
+            select(models.Asignacion.empleado_id, models.Asignacion.proyecto_id)
+            .where(models.Asignacion.empleado_id.in_(trozo))
+        ).all())
+    for trozo in _en_trozos(pr_ids):
+        gerentes.update(db.execute(
+            select(models.Proyecto.id, models.Proyecto.gerente_id).where(models.Proyecto.id.in_(trozo))
+        ).all())
+    cuentas = Counter(e for e, _ in pares)
+
+    resultados, nuevos = [], []
+    for nro, d in filas:
+        e, p = d.empleado_id, d.proyecto_id
+        if e not in empleados or p not in gerentes:
+            resultados.append(_error(nro, "Empleado o proyecto inexistente"))
+        elif (e, p) in pares:
+            resultados.append(_error(nro, "Empleado ya está asignado a este proyecto"))
+        elif cuentas[e] >= MAX_PROYECTOS_POR_EMPLEADO:
+            resultados.append(_error(nro, "Empleado ya tiene el máximo de 5 proyectos"))
+        elif gerentes[p] == e:
+            resultados.append(_error(nro, "El gerente del proyecto no puede asignarse como empleado"))
+        else:
+            pares.add((e, p))
+            cuentas[e] += 1
+            nuevos.append((nro, {"empleado_id": e, "proyecto_id": p}))
+
+    def reservar_cupos(trozo, ids):
+        # El CHECK de num_proyectos rechaza el trozo si una escritura concurrente agotó el cupo
+        por_empleado = Counter(v["empleado_id"] for _, v in trozo)
+        db.connection().execute(
+            update(models.Empleado.__table__)
+            .where(models.Empleado.id == bindparam("e"))
+            .values(num_proyectos=models.Empleado.num_proyectos + bindparam("n"), version=models.Empleado.version + 1),
+            [{"e": e, "n": n} for e, n in por_empleado.items()],
+        )
+        _tocar_proyectos(db, (), Counter(v["proyecto_id"] for _, v in trozo))
+        cache.invalidar(db, *set().union(*(_claves_asignacion(v["empleado_id"], v["proyecto_id"]) for _, v in trozo)))
+        _registrar_asignaciones(db, "crear", [(id_, v["empleado_id"], v["proyecto_id"]) for (_, v), id_ in zip(trozo, ids)])
+
+    resultados += _insertar_trozos(db, models.Asignacion, nuevos, antes_de_commit=reservar_cupos)
+    return resultados
+
+# ---------- Cambios de dotación (todo o nada) ----------
+MAX_CAMBIOS_DOTACION = 10_000
+
+def aplicar_dotacion(db: Session, pedido: schemas.CambiosDotacion) -> schemas.ResultadoDotacion:
+    """
+    Aplica altas, bajas y cambios de gerente sobre varios proyectos en una
+    sola transacción. Las reglas de asignar_empleado, desasignar_empleado y
+    fijar_gerente se evalúan sobre el diff completo con el estado precargado
+    por conjuntos, en el orden bajas -> gerentes -> altas (así un empleado
+    que se mueve de proyecto libera su cupo antes de ocuparlo). Si algún
+    cambio se rechaza no se escribe nada: 409 con la lista de rechazos.
+    """
+    quitar = [(a.empleado_id, a.proyecto_id) for a in pedido.quitar]
+    agregar = [(a.empleado_id, a.proyecto_id) for a in pedido.agregar]
+    if len(quitar) + len(agregar) + len(pedido.gerentes) > MAX_CAMBIOS_DOTACION:
+        raise HTTPException(413, f"Máximo {MAX_CAMBIOS_DOTACION} cambios por petición")
+
+    emp_ids = {e for e, _ in quitar + agregar} | {g.empleado_id for g in pedido.gerentes if g.empleado_id is not None}
+    pr_ids = {p for _, p in quitar + agregar} | {g.proyecto_id for g in pedido.gerentes}
+    par = tuple_(models.Asignacion.empleado_id, models.Asignacion.proyecto_id)
+    cupos: dict[int, int] = {}
+    gerentes: dict[int, int | None] = {}
+    existentes: set[tuple[int, int]] = set()
+    for trozo in _en_trozos(list(emp_ids)):
+        cupos.update(db.execute(
+            select(models.Empleado.id, models.Empleado.num_proyectos).where(models.Empleado.id.in_(trozo))
+        ).all())
+    for trozo in _en_trozos(list(pr_ids)):
+        gerentes.update(db.execute(
+            select(models.Proyecto.id, models.Proyecto.gerente_id).where(models.Proyecto.id.in_(trozo))
+        ).all())
+    candidatos = set(quitar) | set(agregar) | {(g.empleado_id, g.proyecto_id) for g in pedido.gerentes}
+    for trozo in _en_trozos(list(candidatos)):
+        existentes.update(db.execute(
+            select(models.Asignacion.empleado_id, models.Asignacion.proyecto_id).where(par.in_(trozo))
+        ).all())
+
+    errores = []
+    def rechazar(seccion: str, i: int, mensaje: str):
+        errores.append({"cambio": f"{seccion}[{i}]", "error": mensaje})
+
+    bajas: set[tuple[int, int]] = set()
+    for i, (e, p) in enumerate(quitar):
+        if (e, p) in bajas:
+            rechazar("quitar", i, "Cambio repetido")
+        elif (e, p) not in existentes:
+            rechazar("quitar", i, "Asignación no encontrada")
+        else:
+            bajas.add((e, p))
+    pedidas = set(bajas)
+
+    nuevos_gerentes: dict[int, int | None] = {}
+    for i, g in enumerate(pedido.gerentes):
+        e, p = g.empleado_id, g.proyecto_id
+        if p in nuevos_gerentes:
+            rechazar("gerentes", i, "Proyecto repetido")
+        elif p not in gerentes or (e is not None and e not in cupos):
+            rechazar("gerentes", i, "Proyecto o empleado no existe")
+        else:
+            nuevos_gerentes[p] = e
+            # Como fijar_gerente: si estaba asignado como empleado, deja de estarlo
+            if (e, p) in existentes:
+                bajas.add((e, p))
+    gerente_final = {**gerentes, **nuevos_gerentes}
+
+    cuentas = Counter(cupos)
+    cuentas.subtract(e for e, _ in bajas)
+    altas: dict[tuple[int, int], int | None] = {}  # par -> id insertado, en el orden del pedido
+    for i, (e, p) in enumerate(agregar):
+        if e not in cupos or p not in gerentes:
+            rechazar("agregar", i, "Empleado o proyecto inexistente")
+        elif (e, p) in pedidas:
+            rechazar("agregar", i, "La asignación aparece en agregar y en quitar")
+        elif (e, p) in altas or ((e, p) in existentes and (e, p) not in bajas):
+            rechazar("agregar", i, "Empleado ya está asignado a este proyecto")
+        elif gerente_final[p] == e:
+            rechazar("agregar", i, "El gerente del proyecto no puede asignarse como empleado")
+        elif cuentas[e] >= MAX_PROYECTOS_POR_EMPLEADO:
+            rechazar("agregar", i, "Empleado ya tiene el máximo de 5 proyectos")
+        else:
+            cuentas[e] += 1
+            altas[(e, p)] = None
+    if errores:
+        raise HTTPException(409, {"mensaje": "Ningún cambio aplicado", "errores": errores})
+
+    afectados = {p for _, p in bajas} | {p for _, p in altas} | set(nuevos_gerentes)
+    if nuevos_gerentes:
+        cache.invalidar(db, *_claves_proyectos(db, nuevos_gerentes))
+    cache.invalidar(db, *set().union(*(_claves_asignacion(e, p) for e, p in bajas | altas.keys())))
+
+    def conflicto() -> HTTPException:
+        # Otra petición cambió asignaciones o cupos entre la verificación y la escritura
+        db.rollback()
+        return HTTPException(409, "La dotación fue modificada por otra petición; ningún cambio aplicado")
+
+    try:
+        borradas = []
+        for trozo in _en_trozos(list(bajas)):
+            borradas += db.execute(
+                delete(models.Asignacion).where(par.in_(trozo))
+                .returning(models.Asignacion.id, models.Asignacion.empleado_id, models.Asignacion.proyecto_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+        if len(borradas) != len(bajas):
+            raise conflicto()
+        _registrar_asignaciones(db, "eliminar", borradas)
+        if nuevos_gerentes:
+            tabla = models.Proyecto.__table__
+            db.connection().execute(
+                update(tabla).where(tabla.c.id == bindparam("p")).values(gerente_id=bindparam("g")),
+                [{"p": p, "g": e} for p, e in nuevos_gerentes.items()],
+            )
+            for fila in db.execute(select(*COLUMNAS_PROYECTO).where(models.Proyecto.id.in_(nuevos_gerentes))):
+                cambios.registrar(db, "proyecto", "actualizar", fila.id, _datos_proyecto(fila._asdict()))
+            _registrar_gerentes(db, nuevos_gerentes, gerentes)
+        # RETURNING de los pares (sin orden de parámetros): SQLite lo envía en lotes de varias filas
+        for trozo in _en_trozos(list(altas)):
+            for id_, e, p in db.execute(
+                insert(models.Asignacion).returning(models.Asignacion.id, models.Asignacion.empleado_id,
+                                                    models.Asignacion.proyecto_id),
+                [{"empleado_id": e, "proyecto_id": p} for e, p in trozo],
+            ):
+                altas[(e, p)] = id_
+        _registrar_asignaciones(db, "crear", [(id_, e, p) for (e, p), id_ in altas.items()])
+        # También los empleados con saldo 0 (se movieron): cambió su lista de proyectos
+        saldos = Counter({e: 0 for e, _ in bajas | altas.keys()})
+        saldos.update(e for e, _ in altas)
+        saldos.subtract(e for e, _ in bajas)
+        if saldos:
+            db.connection().execute(
+                update(models.Empleado.__table__)
+                .where(models.Empleado.id == bindparam("e"))
+                .values(num_proyectos=models.Empleado.num_proyectos + bindparam("n"),
+                        version=models.Empleado.version + 1),
+                [{"e": e, "n": n} for e, n in saldos.items()],
+            )
+        if afectados:
+            dotaciones = Counter(p for _, p in altas)
+            dotaciones.subtract(p for _, p in bajas)
+            _tocar_proyectos(db, afectados, dict(dotaciones))
+    except IntegrityError:
+        raise conflicto()
+    return schemas.ResultadoDotacion(
+        agregadas=[schemas.AsignacionSalida(id=i, empleado_id=e, proyecto_id=p) for (e, p), i in altas.items()],
+        quitadas=len(bajas), proyectos=sorted(afectados),
+    )
+
+# ---------- Registro de cambios (lectura) ----------
+COLUMNAS_CAMBIO = (models.Cambio.seq, models.Cambio.entidad, models.Cambio.entidad_id, models.Cambio.operacion,
+                   models.Cambio.datos, models.Cambio.momento)
+
+def _horizonte_cambios(db: Session) -> int:
+    return db.scalar(select(models.HorizonteCambios.seq).where(models.HorizonteCambios.id == 1)) or 0
+
+def listar_cambios(db: Session, desde: int = 0, limit: int = LIMITE_POR_DEFECTO) -> schemas.PaginaCambios:
+    """
+    Entradas con seq > desde en orden (keyset sobre seq). 410 si la retención
+    ya purgó eliminaciones posteriores a `desde`: el consumidor pudo perderlas
+    y debe resincronizar con los listados.
+    """
+    horizonte = _horizonte_cambios(db)
+    if desde < horizonte:
+        raise HTTPException(410, f"El registro sólo conserva cambios desde el seq {horizonte}; resincronizar")
+    filas = db.execute(
+        select(*COLUMNAS_CAMBIO).where(models.Cambio.seq > desde).order_by(models.Cambio.seq).limit(limit + 1)
     ).all()
-    return pr, emps
+    pagina = [schemas.CambioSalida.model_validate(f._asdict()) for f in filas[:limit]]
+    return schemas.PaginaCambios(cambios=pagina, siguiente=pagina[-1].seq if pagina else desde,
+                                 hay_mas=len(filas) > limit)
+
+def ultimo_cambio(db: Session) -> int:
+    """seq de la última entrada: punto de partida de un consumidor que acaba de copiar los listados."""
+    # La retención puede haber purgado la última (una eliminación): nunca devolver menos que el horizonte
+    return max(db.scalar(select(func.max(models.Cambio.seq))) or 0, _horizonte_cambios(db))
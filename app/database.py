@@ -1,53 +1,333 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+import itertools
+import time
+from typing import Any, NamedTuple
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
+    # Un driver asíncrono en la URL (sqlite+aiosqlite://, postgresql+asyncpg://)
+    # activa el modo async; cualquier otro driver usa el modo sync clásico.
     DATABASE_URL: str = "sqlite:///./proyectos.db"
+    # Réplicas de lectura, URLs separadas por comas y del mismo modo (sync/async)
+    # que DATABASE_URL. Las lecturas GET se reparten entre ellas por turnos.
+    # Localmente sirve el mismo archivo en sólo lectura:
+    # sqlite:///file:proyectos.db?mode=ro&uri=true
+    DATABASE_REPLICAS: str = ""
+    # Cota del retraso de las réplicas: la caché vuelve a invalidar las claves
+    # de una escritura pasado este tiempo, por si una lectura de una réplica
+    # atrasada repuso el valor anterior.
+    REPLICAS_RETRASO_MAXIMO_SEGUNDOS: float = 5
+
+    # Pool de conexiones (sólo motores que no son SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # PRAGMAs aplicados a cada conexión SQLite nueva
+    SQLITE_PRAGMAS: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456
+
+    # Caché de lecturas por entidad (app/cache.py)
+    CACHE_HABILITADA: bool = True
+    CACHE_TTL_SEGUNDOS: float = 30
+    CACHE_MAX_ENTRADAS: int = 10_000
+    CACHE_TTL_REPORTES_SEGUNDOS: float = 300
+
+    # El despliegue migra con `python -m app.migraciones`; en desarrollo y en
+    # los benchmarks MIGRAR_AL_INICIAR=true aplica las pendientes al arrancar.
+    MIGRAR_AL_INICIAR: bool = False
+
+    # Métricas por petición (app/metricas.py): /metrics, Server-Timing y log
+    # de consultas lentas (logger "app.consultas_lentas"; 0 lo desactiva).
+    # Los parámetros pueden contener datos personales (cc, nombres): sólo se
+    # registran con CONSULTA_LENTA_PARAMETROS=true.
+    METRICAS_HABILITADAS: bool = True
+    CONSULTA_LENTA_MS: float = 200
+    CONSULTA_LENTA_PARAMETROS: bool = False
+
+    # Registro de cambios (app/cambios.py). Las entradas reemplazadas por otra
+    # posterior de la misma entidad se compactan pasado COMPACTAR y las
+    # eliminaciones se purgan pasado RETENCION; la tarea corre cada
+    # COMPACTAR_CADA segundos en el lifespan (0 la desactiva). SONDEO: cada
+    # cuánto /cambios en espera revisa cambios escritos por otros procesos.
+    CAMBIOS_COMPACTAR_SEGUNDOS: float = 3600
+    CAMBIOS_RETENCION_SEGUNDOS: float = 7 * 86400
+    CAMBIOS_COMPACTAR_CADA_SEGUNDOS: float = 600
+    CAMBIOS_SONDEO_SEGUNDOS: float = 1.0
     class Config:
         env_file = ".env"
 
-settings = Settings()
+@lru_cache
+def obtener_settings() -> Settings:
+    """Lee la configuración (entorno y .env) la primera vez que se pide, no al importar."""
+    return Settings()
 
 class Base(DeclarativeBase):
     pass
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def opciones_motor(s: Settings) -> dict:
+    """
+    Argumentos para create_engine/create_async_engine según el backend.
+    SQLite elige su propio pool (y no acepta pool_size en memoria).
+    """
+    if s.DATABASE_URL.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": s.DB_POOL_SIZE,
+        "max_overflow": s.DB_MAX_OVERFLOW,
+        "pool_timeout": s.DB_POOL_TIMEOUT,
+        "pool_recycle": s.DB_POOL_RECYCLE,
+        "pool_pre_ping": s.DB_POOL_PRE_PING,
+    }
 
 
-def _sqlite_table_exists(conn, table: str) -> bool:
-    return bool(
-        conn.exec_driver_sql(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name=:t",
-            {"t": table},
-        ).first()
+def instalar_pragmas_sqlite(motor, s: Settings, solo_lectura: bool = False) -> None:
+    """
+    Registra un hook "connect" que configura cada conexión SQLite nueva:
+    WAL (lectores no bloquean al escritor), synchronous=NORMAL (fsync sólo en
+    checkpoints), busy_timeout, caché de páginas, mmap y foreign_keys=ON para
+    que los ON DELETE CASCADE / SET NULL de models.py se cumplan en la base.
+    Una réplica no cambia el journal_mode (lo fija el primario y puede estar
+    abierta en sólo lectura).
+    """
+    pragmas = (
+        *(() if solo_lectura else (f"PRAGMA journal_mode={s.SQLITE_JOURNAL_MODE}",)),
+        f"PRAGMA synchronous={s.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(s.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA cache_size={-int(s.SQLITE_CACHE_SIZE_KB)}",
+        f"PRAGMA mmap_size={int(s.SQLITE_MMAP_SIZE)}",
+        "PRAGMA foreign_keys=ON",
     )
 
+    @event.listens_for(motor, "connect")
+    def _pragmas(dbapi_conn, _registro):
+        cur = dbapi_conn.cursor()
+        for pragma in pragmas:
+            cur.execute(pragma)
+        cur.close()
+
+
+def instalar_perfilado(motor, s: Settings) -> None:
+    """
+    Mide cada sentencia con before/after_cursor_execute y la reporta a
+    app.metricas (consultas y tiempo de la petición en curso, log de lentas).
+    Los inicios se apilan en conn.info; handle_error desapila los que fallan.
+    """
+    from . import metricas
+    umbral = s.CONSULTA_LENTA_MS / 1000 if s.CONSULTA_LENTA_MS > 0 else None
+
+    @event.listens_for(motor, "before_cursor_execute")
+    def _inicio(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicios_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(motor, "after_cursor_execute")
+    def _fin(conn, cursor, statement, parameters, context, executemany):
+        duracion = time.perf_counter() - conn.info["inicios_consulta"].pop()
+        metricas.registrar_consulta(statement, parameters, duracion, umbral, s.CONSULTA_LENTA_PARAMETROS)
+
+    @event.listens_for(motor, "handle_error")
+    def _error(contexto):
+        inicios = contexto.connection.info.get("inicios_consulta") if contexto.connection is not None else None
+        if inicios:
+            inicios.pop()
+
+
+class Replica(NamedTuple):
+    engine: Engine  # sync (en modo async, el subyacente)
+    async_engine: Any | None
+    fabrica: Any  # sessionmaker o async_sessionmaker
+
 
-def _sqlite_has_column(conn, table: str, column: str) -> bool:
-    rows = conn.exec_driver_sql(f"PRAGMA table_info({table})").all()
-    return any(r[1] == column for r in rows)
+class Motores(NamedTuple):
+    modo_async: bool
+    # En modo async es el motor sync subyacente: sirve para registrar eventos, no para abrir conexiones
+    engine: Engine
+    async_engine: Any | None
+    SessionLocal: sessionmaker | None
+    AsyncSessionLocal: Any | None
+    replicas: tuple[Replica, ...] = ()
 
 
-def ensure_sqlite_schema():
+def _crear_motor(url: str, s: Settings, modo_async: bool, solo_lectura: bool = False) -> Replica:
+    if modo_async:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        async_engine = create_async_engine(url, **opciones_motor(s))
+        motor = Replica(async_engine.sync_engine, async_engine,
+                        async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False))
+    else:
+        engine = create_engine(url, **opciones_motor(s))
+        motor = Replica(engine, None, sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    if url.startswith("sqlite") and s.SQLITE_PRAGMAS:
+        instalar_pragmas_sqlite(motor.engine, s, solo_lectura)
+    if s.METRICAS_HABILITADAS:
+        instalar_perfilado(motor.engine, s)
+    return motor
+
+
+@lru_cache
+def motores() -> Motores:
     """
-    Pequeña migración en caliente para SQLite.
-    - Añade empleados.estado (Enum como VARCHAR) si falta.
-    - Añade proyectos.presupuesto (INTEGER) si falta.
+    Crea los motores en el primer uso (importar la app no lee configuración
+    ni toca la base). Un driver asíncrono en DATABASE_URL elige el modo async;
+    sqlalchemy.ext.asyncio sólo se importa en ese caso.
+    """
+    s = obtener_settings()
+    modo_async = make_url(s.DATABASE_URL).get_dialect().is_async
+    primario = _crear_motor(s.DATABASE_URL, s, modo_async)
+    replicas = tuple(_crear_motor(url.strip(), s, modo_async, solo_lectura=True)
+                     for url in s.DATABASE_REPLICAS.split(",") if url.strip())
+    if modo_async:
+        return Motores(True, primario.engine, primario.async_engine, None, primario.fabrica, replicas)
+    return Motores(False, primario.engine, None, primario.fabrica, None, replicas)
+
+
+async def cerrar_motores() -> None:
+    """Cierra los pools; el siguiente motores() crea motores nuevos."""
+    if motores.cache_info().currsize:
+        m = motores()
+        for motor in (m, *m.replicas):
+            if m.modo_async:
+                await motor.async_engine.dispose()
+            else:
+                motor.engine.dispose()
+        motores.cache_clear()
+
+
+# ---------- Réplicas de lectura ----------
+# Las escrituras devuelven en CABECERA_CONSISTENCIA el seq del registro de
+# cambios (app/cambios.py) que confirmaron. Una lectura que la reenvía se
+# sirve de una réplica sólo si ésta ya aplicó ese seq (una consulta); si no,
+# del primario. Así el cliente lee sus propias escrituras.
+CABECERA_CONSISTENCIA = "X-Consistencia"
+# Marcas de sesión: la lectura exige un seq mínimo y no debe servirse de la
+# caché; fábrica que la abrió (para abrir otra igual, p. ej. al hacer streaming)
+SIN_CACHE = "sin_cache"
+FABRICA = "fabrica"
+_turno = itertools.count()
+# El horizonte cuenta por si la compactación purgó las últimas entradas
+_SEQ_APLICADO = text("SELECT max(seq) FROM cambios UNION ALL SELECT seq FROM cambios_horizonte WHERE id = 1")
 
-    Nota: Sólo aplica cuando DATABASE_URL es SQLite.
+
+def _seq_aplicado_sync(replica: Replica) -> int:
+    with replica.engine.connect() as conn:
+        return max(s or 0 for s in conn.scalars(_SEQ_APLICADO))
+
+
+async def _seq_aplicado(m: Motores, replica: Replica) -> int:
+    if m.modo_async:
+        async with replica.async_engine.connect() as conn:
+            return max(s or 0 for s in await conn.scalars(_SEQ_APLICADO))
+    return await run_in_threadpool(_seq_aplicado_sync, replica)
+
+
+async def _fabrica(m: Motores, lectura: bool, minimo: int):
+    """Primario, o la réplica que toca por turnos si es una lectura y está al día con `minimo`."""
+    primario = m.AsyncSessionLocal if m.modo_async else m.SessionLocal
+    if not lectura or not m.replicas:
+        return primario
+    replica = m.replicas[next(_turno) % len(m.replicas)]
+    if minimo and await _seq_aplicado(m, replica) < minimo:
+        return primario
+    return replica.fabrica
+
+
+def leer_seq(valor: str | None) -> int | None:
+    """Un seq escrito en una cabecera: dígitos ASCII hasta 2**63 - 1, o None."""
+    # isdigit() sola acepta "²" o "٣", que int() rechaza o convierte; 19 dígitos
+    # bastan para 63 bits y evitan convertir cadenas arbitrariamente largas
+    if not valor or len(valor) > 19 or not (valor.isascii() and valor.isdigit()):
+        return None
+    seq = int(valor)
+    return seq if seq < 2**63 else None
+
+
+def seq_minimo(request) -> int:
+    """seq de CABECERA_CONSISTENCIA (0 si falta o no es un seq válido)."""
+    return leer_seq(request.headers.get(CABECERA_CONSISTENCIA)) or 0
+
+
+@asynccontextmanager
+async def abrir_sesion(lectura: bool = False, minimo: int = 0):
     """
-    if not settings.DATABASE_URL.startswith("sqlite"):
+    Abre una sesión del modo configurado: AsyncSession en modo async o
+    Session clásica en modo sync (cerrada en el threadpool para no bloquear
+    el event loop). Las escrituras usan siempre el primario; con
+    lectura=True puede ser una réplica (ver _fabrica).
+    """
+    m = motores()
+    fabrica = await _fabrica(m, lectura, minimo)
+    if m.modo_async:
+        async with fabrica() as db:
+            db.info.update({SIN_CACHE: bool(minimo), FABRICA: fabrica})
+            yield db
         return
-    # Usar transacción que hace commit automáticamente
-    with engine.begin() as conn:
-        # empleados.estado
-        if _sqlite_table_exists(conn, "empleados") and not _sqlite_has_column(conn, "empleados", "estado"):
-            conn.exec_driver_sql("ALTER TABLE empleados ADD COLUMN estado VARCHAR(8) NOT NULL DEFAULT 'activo'")
-        # proyectos.presupuesto
-        if _sqlite_table_exists(conn, "proyectos") and not _sqlite_has_column(conn, "proyectos", "presupuesto"):
-            conn.exec_driver_sql("ALTER TABLE proyectos ADD COLUMN presupuesto INTEGER")
+    db = fabrica()
+    db.info.update({SIN_CACHE: bool(minimo), FABRICA: fabrica})
+    try:
+        yield db
+    finally:
+        # La sesión es perezosa: si nunca consultó no tiene conexión que devolver
+        if db.in_transaction():
+            await run_in_threadpool(db.close)
+
+
+async def get_db(request: Request):
+    """
+    Unidad de trabajo de la petición, dependencia común de los routers.
+    GET/HEAD pueden leer de una réplica y no confirman; el resto usa el
+    primario y hace un único commit al terminar el handler, antes de enviar
+    la respuesta. Si el handler lanza (p. ej. HTTPException), no se confirma
+    y cerrar la sesión deshace lo escrito. La conexión se toma recién en la
+    primera consulta.
+    """
+    lectura = request.method in ("GET", "HEAD")
+    async with abrir_sesion(lectura=lectura, minimo=seq_minimo(request)) as db:
+        yield db
+        if not lectura and db.in_transaction():
+            await ejecutar(db, Session.commit)
+
+
+async def ejecutar(db, fn, *args, **kwargs):
+    """
+    Ejecuta una función de crud (escrita contra Session) desde un handler async.
+
+    En modo async se usa AsyncSession.run_sync: la función corre en el event
+    loop mediante greenlets y la E/S es realmente asíncrona. En modo sync se
+    delega al threadpool sólo durante la llamada, no toda la petición.
+    """
+    if motores().modo_async:
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+@contextmanager
+def contar_consultas(motor=None):
+    """
+    Cuenta las sentencias SQL enviadas al motor dentro del bloque.
+    Uso: with contar_consultas() as sentencias: ...; len(sentencias)
+    """
+    motor = motor if motor is not None else motores().engine
+    sentencias: list[str] = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(motor, "before_cursor_execute", _registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(motor, "before_cursor_execute", _registrar)
+
@@ -0,0 +1,48 @@
+"""
+ETags fuertes a partir de las columnas version de empleados y proyectos.
+
+Cada escritura de crud incrementa la versión de las filas cuya
+representación cambia (el ORM lo hace solo vía version_id_col; los UPDATE
+por conjuntos lo hacen explícitamente). Un ETag de entidad es tipo + id +
+versión; el de una vista compuesta (detalle, listas anidadas) agrega las
+versiones de las filas que muestra, y el de un listado es un hash de los
+pares (id, versión) de la página.
+"""
+import hashlib
+from fastapi import HTTPException
+
+def etag(*partes) -> str:
+    return '"' + "-".join(str(p) for p in partes) + '"'
+
+def etag_filas(filas) -> str:
+    """ETag de colección: hash de (id, versión) de cada fila, en orden."""
+    h = hashlib.blake2b(digest_size=12)
+    for fila in filas:
+        h.update(b"%d:%d;" % (fila.id, fila.version))
+    return etag("l", h.hexdigest())
+
+def coincide(cabecera: str | None, valor: str, debil: bool = True) -> bool:
+    """
+    Compara If-None-Match (comparación débil) o If-Match (fuerte: un ETag
+    W/ nunca coincide) con el ETag actual. "*" coincide con cualquiera.
+    """
+    if not cabecera:
+        return False
+    for candidato in (c.strip() for c in cabecera.split(",")):
+        if candidato == "*":
+            return True
+        if candidato.startswith("W/"):
+            if not debil:
+                continue
+            candidato = candidato[2:]
+        if candidato == valor:
+            return True
+    return False
+
+def no_modificado(valor: str, headers: dict | None = None) -> HTTPException:
+    return HTTPException(304, headers={"ETag": valor, **(headers or {})})
+
+def exigir(si_coincide: str | None, valor: str) -> None:
+    """Precondición If-Match de una escritura: 412 si el cliente tiene otra versión."""
+    if si_coincide is not None and not coincide(si_coincide, valor, debil=False):
+        raise HTTPException(412, "El recurso cambió (If-Match no coincide)", headers={"ETag": valor})
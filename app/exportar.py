@@ -0,0 +1,282 @@
+"""
+Exportación completa de empleados, proyectos, asignaciones y la dotación
+(empleado × proyecto, desnormalizada) en CSV comprimido con gzip, Parquet o
+Arrow IPC (stream).
+
+Cada tabla sale de una sola consulta recorrida con un cursor del lado del
+servidor en lotes de TAMANO_LOTE filas: las tuplas del driver, sin ORM, Row
+ni pydantic. Cada lote se codifica y se envía (o se escribe) antes de leer el
+siguiente, así la memoria queda acotada por el lote y no por la tabla. El CSV
+se escribe con el módulo csv y se comprime con zlib, ambos en C; Parquet y
+Arrow se arman columna a columna con pyarrow, que es opcional: sin él esos
+formatos responden 501.
+
+Ruta: GET /exportar/{tabla}?formato=csv|parquet|arrow
+CLI:  python -m app.exportar [tablas ...] [--formato csv] [--directorio .]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import os
+import sys
+import time
+import zlib
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Iterator
+from sqlalchemy import Integer, String, select, type_coerce
+from sqlalchemy.engine import Connection, CursorResult
+from starlette.concurrency import run_in_threadpool
+from . import models
+from .database import FABRICA, cerrar_motores, motores
+
+TAMANO_LOTE = 20_000
+# Nivel 1: comprime ~5x y no limita el throughput; los niveles altos ganan
+# poco en estas columnas y cuestan varias veces más CPU
+NIVEL_GZIP = 1
+FORMATOS = {
+    # formato -> (media type, extensión)
+    "csv": ("application/gzip", "csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# ---------- Consultas ----------
+def _texto(columna):
+    # Los Enum salen como el texto guardado, no como miembros de la clase
+    return type_coerce(columna, String).label(columna.key)
+
+def _consultas() -> dict:
+    e, p, a = models.Empleado, models.Proyecto, models.Asignacion
+    return {
+        "empleados": select(e.id, e.cc, e.nombre, e.cargo, _texto(e.estado), e.num_proyectos, e.version)
+                     .order_by(e.id),
+        "proyectos": select(p.id, p.nombre, p.descripcion, p.presupuesto, _texto(p.estado), p.gerente_id, p.version)
+                     .order_by(p.id),
+        "asignaciones": select(a.id, a.empleado_id, a.proyecto_id).order_by(a.id),
+        # Por empleado y proyecto: recorre el índice único de asignaciones (cubre
+        # el id) y lee los empleados en orden de clave primaria
+        "dotacion": select(
+            a.id.label("asignacion_id"), a.empleado_id, e.cc.label("empleado_cc"),
+            e.nombre.label("empleado_nombre"), e.cargo.label("empleado_cargo"),
+            type_coerce(e.estado, String).label("empleado_estado"),
+            a.proyecto_id, p.nombre.label("proyecto_nombre"),
+            type_coerce(p.estado, String).label("proyecto_estado"), p.presupuesto, p.gerente_id,
+        ).join(e, e.id == a.empleado_id).join(p, p.id == a.proyecto_id).order_by(a.empleado_id, a.proyecto_id),
+    }
+
+TABLAS = tuple(_consultas())
+
+# ---------- Lectura por lotes ----------
+# Con stream_results SQLAlchemy abre el cursor del lado del servidor (en
+# PostgreSQL, un cursor con nombre; pysqlite ya recorre el resultado paso a
+# paso), pero los lotes se piden directamente al cursor DBAPI: las columnas no
+# tienen conversión de tipos (los Enum se leen como texto), así que las tuplas
+# del driver ya son las filas finales y no se construye un Row por fila, que
+# costaba más que la lectura misma.
+def _ejecutar(conn: Connection, tabla: str) -> CursorResult:
+    return conn.execution_options(stream_results=True).execute(_consultas()[tabla])
+
+def _siguiente(resultado: CursorResult, primero: bool) -> list:
+    # El primer lote pasa por Result, que vacía la fila que stream_results lee
+    # por adelantado; con el cursor ya liberado (resultado vacío) no hay más
+    if primero:
+        return resultado.fetchmany(TAMANO_LOTE)
+    return resultado.cursor.fetchmany(TAMANO_LOTE) if resultado.cursor is not None else []
+
+def lotes(conn: Connection, tabla: str) -> Iterator[list[tuple]]:
+    resultado = _ejecutar(conn, tabla)
+    try:
+        filas = _siguiente(resultado, primero=True)
+        while filas:
+            yield filas
+            filas = _siguiente(resultado, primero=False)
+    finally:
+        resultado.close()
+
+async def lotes_async(conn, tabla: str) -> AsyncIterator[list[tuple]]:
+    """Igual que lotes() sobre una AsyncConnection: cada lote se lee en run_sync (el greenlet del driver)."""
+    resultado = await conn.run_sync(_ejecutar, tabla)
+    try:
+        filas = await conn.run_sync(lambda _: _siguiente(resultado, primero=True))
+        while filas:
+            yield filas
+            filas = await conn.run_sync(lambda _: _siguiente(resultado, primero=False))
+    finally:
+        await conn.run_sync(lambda _: resultado.close())
+
+# ---------- Codificación por lotes ----------
+class _CSV:
+    """CSV con encabezado, comprimido como un único miembro gzip."""
+    def __init__(self, columnas: list[str]):
+        self._texto = io.StringIO()
+        self._escritor = csv.writer(self._texto, lineterminator="\n")
+        self._gzip = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)  # wbits 31: cabecera y cola gzip
+        self._escritor.writerow(columnas)
+
+    def lote(self, filas) -> bytes:
+        self._escritor.writerows(filas)
+        datos = self._texto.getvalue().encode()
+        self._texto.seek(0)
+        self._texto.truncate()
+        return self._gzip.compress(datos)
+
+    def cerrar(self) -> bytes:
+        return self.lote(()) + self._gzip.flush()
+
+class _Sumidero(io.RawIOBase):
+    """Archivo de sólo escritura para pyarrow que entrega lo escrito en cada drenar()."""
+    def __init__(self):
+        self._partes: list[bytes] = []
+        self._posicion = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def drenar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+class _Arrow:
+    """Un record batch por lote; en Parquet cada lote es un row group (zstd)."""
+    def __init__(self, columnas: list[str], tipos: list, parquet: bool):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise HTTPException(501, "Parquet y Arrow requieren pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._esquema = pa.schema([(c, pa.int64() if isinstance(t, Integer) else pa.string())
+                                   for c, t in zip(columnas, tipos)])
+        self._salida = _Sumidero()
+        self._escritor = (pq.ParquetWriter(self._salida, self._esquema, compression="zstd") if parquet
+                          else pa.ipc.new_stream(self._salida, self._esquema))
+
+    def lote(self, filas) -> bytes:
+        pa = self._pa
+        columnas = zip(*filas) if filas else ([] for _ in self._esquema)
+        self._escritor.write_batch(pa.record_batch(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, self._esquema)],
+            schema=self._esquema))
+        return self._salida.drenar()
+
+    def cerrar(self) -> bytes:
+        self._escritor.close()
+        return self._salida.drenar()
+
+def codificador(tabla: str, formato: str):
+    """Codificador de `tabla` en `formato`: lote(filas) -> bytes y cerrar() -> bytes."""
+    columnas = _consultas()[tabla].selected_columns
+    nombres = [c.key for c in columnas]
+    if formato == "csv":
+        return _CSV(nombres)
+    return _Arrow(nombres, [c.type for c in columnas], parquet=formato == "parquet")
+
+# ---------- Respuesta HTTP ----------
+def respuesta(db, tabla: str, formato: str) -> StreamingResponse:
+    """
+    Como respuestas.ndjson: la sesión se abre dentro del generador, de la
+    misma fábrica que `db`. El codificador se crea antes de responder (sin
+    pyarrow, 501 en lugar de un cuerpo cortado). En modo async cada lote se
+    codifica en el threadpool para no bloquear el event loop.
+    """
+    cod = codificador(tabla, formato)
+    m = motores()
+    fabrica = db.info[FABRICA]
+
+    async def fragmentos_async():
+        async with fabrica() as db:
+            async for lote in lotes_async(await db.connection(), tabla):
+                yield await run_in_threadpool(cod.lote, lote)
+        yield cod.cerrar()
+
+    def fragmentos_sync():
+        db = fabrica()
+        try:
+            for lote in lotes(db.connection(), tabla):
+                yield cod.lote(lote)
+        finally:
+            db.close()
+        yield cod.cerrar()
+
+    media_type, extension = FORMATOS[formato]
+    return StreamingResponse(
+        fragmentos_async() if m.modo_async else fragmentos_sync(), media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{tabla}.{extension}"'},
+    )
+
+# ---------- CLI ----------
+def _ruta(directorio: str, tabla: str, formato: str) -> str:
+    return os.path.join(directorio, f"{tabla}.{FORMATOS[formato][1]}")
+
+def _abrir(ruta: str):
+    # Se escribe en .parcial y se renombra al terminar: nunca queda un archivo cortado con el nombre final
+    return open(ruta + ".parcial", "wb")
+
+def _exportar_sync(tablas: list[str], formato: str, directorio: str) -> dict:
+    filas = {}
+    with motores().engine.connect() as conn:
+        for tabla in tablas:
+            cod, ruta, filas[tabla] = codificador(tabla, formato), _ruta(directorio, tabla, formato), 0
+            with _abrir(ruta) as f:
+                for lote in lotes(conn, tabla):
+                    f.write(cod.lote(lote))
+                    filas[tabla] += len(lote)
+                f.write(cod.cerrar())
+            os.replace(ruta + ".parcial", ruta)
+    return filas
+
+async def _exportar_async(tablas: list[str], formato: str, directorio: str) -> dict:
+    filas = {}
+    try:
+        async with motores().async_engine.connect() as conn:
+            for tabla in tablas:
+                cod, ruta, filas[tabla] = codificador(tabla, formato), _ruta(directorio, tabla, formato), 0
+                with _abrir(ruta) as f:
+                    async for lote in lotes_async(conn, tabla):
+                        f.write(cod.lote(lote))
+                        filas[tabla] += len(lote)
+                    f.write(cod.cerrar())
+                os.replace(ruta + ".parcial", ruta)
+    finally:
+        await cerrar_motores()
+    return filas
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Exporta las tablas de proyectos-api (DATABASE_URL)")
+    p.add_argument("tablas", nargs="*", default=list(TABLAS), help=f"por defecto todas: {', '.join(TABLAS)}")
+    p.add_argument("--formato", choices=list(FORMATOS), default="csv")
+    p.add_argument("--directorio", default=".")
+    args = p.parse_args(argv)
+    if desconocidas := set(args.tablas) - set(TABLAS):
+        p.error(f"tablas desconocidas: {', '.join(sorted(desconocidas))}")
+
+    os.makedirs(args.directorio, exist_ok=True)
+    t0 = time.perf_counter()
+    try:
+        if motores().modo_async:
+            filas = asyncio.run(_exportar_async(args.tablas, args.formato, args.directorio))
+        else:
+            filas = _exportar_sync(args.tablas, args.formato, args.directorio)
+    except HTTPException as e:
+        print(e.detail, file=sys.stderr)
+        return 1
+    for tabla, n in filas.items():
+        ruta = _ruta(args.directorio, tabla, args.formato)
+        print(f"{ruta}: {n} filas, {os.path.getsize(ruta) / 1e6:.1f} MB")
+    print(f"en {time.perf_counter() - t0:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
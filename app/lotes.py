@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from typing import Iterator
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from .schemas import ResultadoFila, ReporteLote
+
+MAX_FILAS_POR_LOTE = 100_000
+# Se comprueba al leer, antes de parsear: un cuerpo enorme recibe 413 sin
+# quedar entero en memoria. Deja ~670 bytes por fila al máximo de filas.
+MAX_BYTES_POR_LOTE = 64 * 1024 * 1024
+
+def _filas_csv(texto: str) -> Iterator[dict]:
+    for fila in csv.DictReader(io.StringIO(texto)):
+        # En CSV una celda vacía significa "sin valor"
+        yield {k.strip(): (v if v != "" else None) for k, v in fila.items() if k}
+
+def _filas_ndjson(texto: str) -> Iterator[dict]:
+    for linea in texto.splitlines():
+        if linea.strip():
+            yield json.loads(linea)
+
+def _demasiado_grande() -> HTTPException:
+    return HTTPException(413, f"Máximo {MAX_BYTES_POR_LOTE // (1024 * 1024)} MB por lote")
+
+async def _leer_cuerpo(request: Request) -> bytes:
+    # Content-Length corta antes de leer nada; el tope al leer cubre los
+    # cuerpos chunked y los que declaran menos de lo que envían
+    largo = request.headers.get("content-length", "")
+    if largo.isascii() and largo.isdigit() and int(largo) > MAX_BYTES_POR_LOTE:
+        raise _demasiado_grande()
+    partes, leidos = [], 0
+    async for parte in request.stream():
+        leidos += len(parte)
+        if leidos > MAX_BYTES_POR_LOTE:
+            raise _demasiado_grande()
+        partes.append(parte)
+    return b"".join(partes)
+
+def _decodificar(cuerpo: bytes, content_type: str) -> list:
+    try:
+        texto = cuerpo.decode("utf-8-sig")  # UnicodeDecodeError es un ValueError: 400
+        if content_type.startswith("text/csv"):
+            return list(_filas_csv(texto))
+        if content_type.startswith(("application/x-ndjson", "application/jsonl")):
+            return list(_filas_ndjson(texto))
+        datos = json.loads(texto)
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(400, f"Cuerpo del lote ilegible: {e}")
+    if not isinstance(datos, list):
+        raise HTTPException(400, "Se esperaba un arreglo JSON de filas")
+    return datos
+
+def cuerpo_lote(esquema: type[BaseModel]):
+    """
+    Dependencia que lee el cuerpo de una carga masiva (JSON array, CSV con
+    cabecera o NDJSON, según Content-Type) y valida todas las filas con
+    `esquema` antes de tocar la base de datos.
+
+    Devuelve (validas, errores): validas es una lista de (nro_fila, modelo) y
+    errores los ResultadoFila de las filas que no pasaron la validación.
+    """
+    async def dependencia(request: Request):
+        filas = _decodificar(await _leer_cuerpo(request), request.headers.get("content-type", "application/json"))
+        if len(filas) > MAX_FILAS_POR_LOTE:
+            raise HTTPException(413, f"Máximo {MAX_FILAS_POR_LOTE} filas por lote")
+        validas, errores = [], []
+        for nro, fila in enumerate(filas, start=1):
+            try:
+                validas.append((nro, esquema.model_validate(fila)))
+            except ValidationError as e:
+                errores.append(ResultadoFila(fila=nro, ok=False, error=_resumir(e)))
+        return validas, errores
+    return dependencia
+
+def _resumir(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'fila'}: {err['msg']}" for err in e.errors())
+
+def reporte(resultados: list[ResultadoFila]) -> ReporteLote:
+    resultados = sorted(resultados, key=lambda r: r.fila)
+    exitosos = sum(1 for r in resultados if r.ok)
+    return ReporteLote(total=len(resultados), exitosos=exitosos,
+                       fallidos=len(resultados) - exitosos, resultados=resultados)
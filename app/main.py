@@ -1,19 +1,73 @@
-from fastapi import FastAPI
-from .database import engine, Base, ensure_sqlite_schema
-from .routers import empleados, proyectos, asignaciones
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Response
+from starlette.concurrency import run_in_threadpool
+from .database import cerrar_motores, motores, obtener_settings
+from . import cache, cambios, metricas, migraciones
+from .routers import empleados, proyectos, asignaciones, reportes, exportar
+from .routers import cambios as rutas_cambios
 
-# Ajuste de esquema para SQLite antes de crear tablas
-ensure_sqlite_schema()
+async def preparar_base() -> None:
+    """
+    Aplica las migraciones pendientes si MIGRAR_AL_INICIAR (ver app/migraciones.py).
+    Con el esquema al día es una sola consulta; si hay pendientes, el lock de
+    migrar() evita que varios workers las apliquen a la vez.
+    """
+    if not obtener_settings().MIGRAR_AL_INICIAR:
+        return
+    m = motores()
+    if m.modo_async:
+        async with m.async_engine.begin() as conn:
+            await conn.run_sync(migraciones.migrar)
+        return
 
-# Crea tablas (solo para demo práctica)
-Base.metadata.create_all(bind=engine)
+    def _sync():
+        with m.engine.begin() as conn:
+            migraciones.migrar(conn)
+    await run_in_threadpool(_sync)
 
-app = FastAPI(title="Sistema de Gestión de Proyectos", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await preparar_base()
+    s = obtener_settings()
+    compactacion = (asyncio.create_task(cambios.compactar_periodicamente(s))
+                    if s.CAMBIOS_COMPACTAR_CADA_SEGUNDOS > 0 else None)
+    yield
+    if compactacion:
+        compactacion.cancel()
+        with suppress(asyncio.CancelledError):
+            await compactacion
+    await cerrar_motores()
 
-app.include_router(empleados.router)
-app.include_router(proyectos.router)
-app.include_router(asignaciones.router)
+def crear_app() -> FastAPI:
+    """
+    Construye la aplicación sin tocar la base: la configuración y el motor se
+    crean en el primer uso y el esquema se prepara en el lifespan.
+    Con uvicorn: `uvicorn app.main:app` o `uvicorn --factory app.main:crear_app`.
+    """
+    app = FastAPI(title="Sistema de Gestión de Proyectos", version="1.0.0", lifespan=lifespan)
+    app.add_middleware(metricas.MiddlewareMetricas)
+    app.add_middleware(cambios.MiddlewareConsistencia)
 
-@app.get("/", tags=["salud"])
-def raiz():
-    return {"ok": True, "servicio": "proyectos-api"}
+    app.include_router(empleados.router)
+    app.include_router(proyectos.router)
+    app.include_router(asignaciones.router)
+    app.include_router(reportes.router)
+    app.include_router(exportar.router)
+    app.include_router(rutas_cambios.router)
+
+    @app.get("/", tags=["salud"])
+    def raiz():
+        return {"ok": True, "servicio": "proyectos-api"}
+
+    @app.get("/_cache", tags=["salud"])
+    def estadisticas_cache():
+        return cache.backend().estadisticas()
+
+    @app.get("/metrics", tags=["salud"])
+    def exponer_metricas():
+        return Response(metricas.exponer(), media_type=metricas.TIPO_CONTENIDO)
+
+    return app
+
+app = crear_app()
@@ -0,0 +1,173 @@
+"""
+Instrumentación de peticiones: latencia por ruta, número de consultas y
+tiempo en la base por petición, expuestos en formato Prometheus (GET /metrics)
+y en la cabecera Server-Timing de cada respuesta, más un log de consultas
+lentas con la ruta que las emitió.
+
+Los hooks del motor (database.instalar_perfilado) suman cada consulta a la
+Medicion de la petición en curso, que viaja en una ContextVar: el threadpool
+(modo sync) y los greenlets de run_sync (modo async) heredan el contexto, así
+que las consultas de crud llegan a la petición correcta sin pasar nada.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from .database import obtener_settings
+
+log_consultas_lentas = logging.getLogger("app.consultas_lentas")
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+# ---------- Registro ----------
+def _etiquetas(pares) -> str:
+    if not pares:
+        return ""
+    valor = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")  # noqa: E731
+    return "{" + ",".join(f'{k}="{valor(v)}"' for k, v in pares) + "}"
+
+
+class Histograma:
+    """Histograma con cubetas fijas por combinación de etiquetas."""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple[str, ...], limites: tuple):
+        self.nombre, self.ayuda, self.etiquetas, self.limites = nombre, ayuda, etiquetas, limites
+        # valores de etiquetas -> [conteo por cubeta (la última es +Inf)..., suma]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valores: tuple, x: float) -> None:
+        i = bisect.bisect_left(self.limites, x)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [0] * (len(self.limites) + 1) + [0.0]
+            serie[i] += 1
+            serie[-1] += x
+
+    def exponer(self) -> list[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for valores, serie in sorted(series.items()):
+            pares = list(zip(self.etiquetas, valores))
+            acumulado = 0
+            for limite, n in zip((*self.limites, "+Inf"), serie[:-1]):
+                acumulado += n
+                lineas.append(f"{self.nombre}_bucket{_etiquetas([*pares, ('le', limite)])} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(pares)} {serie[-1]}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(pares)} {acumulado}")
+        return lineas
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple[str, ...]):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, etiquetas
+        self._series: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, valores: tuple, n: float = 1) -> None:
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + n
+
+    def exponer(self) -> list[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for valores, n in sorted(series.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(list(zip(self.etiquetas, valores)))} {n}")
+        return lineas
+
+
+DURACION = Histograma("proyectos_http_duracion_segundos", "Latencia de las peticiones HTTP.",
+                      ("metodo", "ruta", "estado"), LIMITES_SEGUNDOS)
+CONSULTAS = Histograma("proyectos_http_consultas", "Sentencias SQL por petición.",
+                       ("metodo", "ruta"), LIMITES_CONSULTAS)
+TIEMPO_DB = Histograma("proyectos_http_db_segundos", "Tiempo en la base por petición.",
+                       ("metodo", "ruta"), LIMITES_SEGUNDOS)
+CONSULTAS_LENTAS = Contador("proyectos_consultas_lentas_total",
+                            "Consultas que superaron CONSULTA_LENTA_MS.", ("ruta",))
+REGISTRO = (DURACION, CONSULTAS, TIEMPO_DB, CONSULTAS_LENTAS)
+
+
+def exponer() -> str:
+    """Texto de GET /metrics (formato de exposición de Prometheus)."""
+    return "\n".join(linea for metrica in REGISTRO for linea in metrica.exponer()) + "\n"
+
+
+def reiniciar() -> None:
+    for metrica in REGISTRO:
+        with metrica._lock:
+            metrica._series.clear()
+
+# ---------- Medición por petición ----------
+class Medicion:
+    __slots__ = ("scope", "consultas", "db")
+
+    def __init__(self, scope):
+        self.scope, self.consultas, self.db = scope, 0, 0.0
+
+    def ruta(self) -> str:
+        # La plantilla (/empleados/{empleado_id}), no la URL: acota la cardinalidad
+        route = self.scope.get("route")
+        return route.path if route is not None else "sin_ruta"
+
+
+_actual: ContextVar[Medicion | None] = ContextVar("medicion", default=None)
+
+
+def registrar_consulta(sentencia: str, parametros, duracion: float, umbral: float | None,
+                       con_parametros: bool) -> None:
+    """Llamado por el hook after_cursor_execute del motor con la duración de la consulta."""
+    m = _actual.get()
+    if m is not None:
+        m.consultas += 1
+        m.db += duracion
+    if umbral is not None and duracion >= umbral:
+        ruta = m.ruta() if m is not None else "-"
+        CONSULTAS_LENTAS.incrementar((ruta,))
+        log_consultas_lentas.warning(
+            "consulta lenta %.1f ms en %s: %s%s", duracion * 1000, ruta, " ".join(sentencia.split()),
+            f" parámetros={parametros!r:.500}" if con_parametros else "",
+        )
+
+# ---------- Middleware ----------
+class MiddlewareMetricas:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware, que agrega una tarea por
+    petición). Añade Server-Timing al inicio de la respuesta y registra la
+    latencia cuando termina de enviarse el cuerpo (incluido el streaming).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not obtener_settings().METRICAS_HABILITADAS:
+            await self.app(scope, receive, send)
+            return
+        m = Medicion(scope)
+        token = _actual.set(m)
+        t0 = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                total = (time.perf_counter() - t0) * 1000
+                valor = f'db;dur={m.db * 1000:.2f}, sql;desc="{m.consultas}", app;dur={total:.2f}'
+                mensaje["headers"] = [*mensaje.get("headers", ()), (b"server-timing", valor.encode())]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _actual.reset(token)
+            metodo, ruta = scope["method"], m.ruta()
+            DURACION.observar((metodo, ruta, str(estado)), time.perf_counter() - t0)
+            CONSULTAS.observar((metodo, ruta), m.consultas)
+            TIEMPO_DB.observar((metodo, ruta), m.db)
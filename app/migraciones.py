@@ -0,0 +1,267 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada migración es una función numerada que recibe una conexión sync; la
+tabla esquema_version registra las aplicadas. Las operaciones comprueban
+el estado real (columna/índice existente) antes de actuar, de modo que una
+base creada por la migración 1 con los modelos actuales y una base antigua
+sin versionar llegan al mismo esquema.
+
+Uso:
+    python -m app.migraciones            # aplica las pendientes
+    python -m app.migraciones --estado   # muestra versión actual y pendientes
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from typing import Callable
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, inspect, literal, select
+from sqlalchemy.engine import Connection
+from .database import Base, cerrar_motores, motores
+from . import busqueda
+
+_meta = MetaData()
+esquema_version = Table(
+    "esquema_version", _meta,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("descripcion", String(200), nullable=False),
+    Column("aplicada_en", DateTime, nullable=False),
+)
+
+MIGRACIONES: list[tuple[int, str, Callable[[Connection], None]]] = []
+
+def migracion(version: int, descripcion: str):
+    def registrar(fn):
+        MIGRACIONES.append((version, descripcion, fn))
+        MIGRACIONES.sort(key=lambda m: m[0])
+        return fn
+    return registrar
+
+# ---------- Operaciones idempotentes ----------
+def _tiene_tabla(conn: Connection, tabla: str) -> bool:
+    return inspect(conn).has_table(tabla)
+
+def _tiene_columna(conn: Connection, tabla: str, columna: str) -> bool:
+    return any(c["name"] == columna for c in inspect(conn).get_columns(tabla))
+
+def _tiene_indice(conn: Connection, tabla: str, nombre: str) -> bool:
+    return any(i["name"] == nombre for i in inspect(conn).get_indexes(tabla))
+
+def agregar_columna(conn: Connection, tabla: str, columna: str, ddl: str) -> bool:
+    """ALTER TABLE ... ADD COLUMN si falta. Devuelve True si la añadió."""
+    if _tiene_columna(conn, tabla, columna):
+        return False
+    conn.exec_driver_sql(f"ALTER TABLE {tabla} ADD COLUMN {columna} {ddl}")
+    return True
+
+def crear_indice(conn: Connection, nombre: str, tabla: str, *columnas: str, unico: bool = False) -> None:
+    if not _tiene_indice(conn, tabla, nombre):
+        conn.exec_driver_sql(
+            f"CREATE {'UNIQUE ' if unico else ''}INDEX {nombre} ON {tabla} ({', '.join(columnas)})"
+        )
+
+def borrar_indice(conn: Connection, nombre: str, tabla: str) -> None:
+    if _tiene_indice(conn, tabla, nombre):
+        conn.exec_driver_sql(f"DROP INDEX {nombre}")
+
+# ---------- Migraciones ----------
+@migracion(1, "tablas iniciales")
+def _tablas(conn):
+    # Una base nueva se crea directamente con los modelos actuales; las
+    # migraciones siguientes sólo actúan sobre lo que falte.
+    from . import models  # noqa: F401  (registra las tablas en Base.metadata)
+    Base.metadata.create_all(bind=conn)
+
+@migracion(2, "empleados.estado, proyectos.presupuesto y empleados.num_proyectos")
+def _columnas(conn):
+    agregar_columna(conn, "empleados", "estado", "VARCHAR(8) NOT NULL DEFAULT 'activo'")
+    agregar_columna(conn, "proyectos", "presupuesto", "INTEGER")
+    if agregar_columna(conn, "empleados", "num_proyectos",
+                       "INTEGER NOT NULL DEFAULT 0 "
+                       "CONSTRAINT ck_empleado_num_proyectos CHECK (num_proyectos BETWEEN 0 AND 5)"):
+        conn.exec_driver_sql(
+            "UPDATE empleados SET num_proyectos = "
+            "(SELECT COUNT(*) FROM asignaciones WHERE asignaciones.empleado_id = empleados.id)"
+        )
+
+@migracion(3, "índices compuestos según las consultas de crud; quita los redundantes")
+def _indices(conn):
+    # empleado_id ya es prefijo de uq_empleado_proyecto; proyecto_id necesita
+    # su propio compuesto, que además cubre las búsquedas de empleados por proyecto.
+    crear_indice(conn, "ix_asignaciones_proyecto_empleado", "asignaciones", "proyecto_id", "empleado_id")
+    borrar_indice(conn, "ix_asignaciones_empleado_id", "asignaciones")
+    borrar_indice(conn, "ix_asignaciones_proyecto_id", "asignaciones")
+    # Filtro por estado + paginación keyset por id; rango de presupuesto
+    crear_indice(conn, "ix_empleados_estado_id", "empleados", "estado", "id")
+    crear_indice(conn, "ix_proyectos_estado_id", "proyectos", "estado", "id")
+    crear_indice(conn, "ix_proyectos_presupuesto", "proyectos", "presupuesto")
+    # Duplican el índice de la clave primaria
+    borrar_indice(conn, "ix_empleados_id", "empleados")
+    borrar_indice(conn, "ix_proyectos_id", "proyectos")
+
+@migracion(4, "empleados.version y proyectos.version (ETags)")
+def _versiones(conn):
+    agregar_columna(conn, "empleados", "version", "INTEGER NOT NULL DEFAULT 1")
+    agregar_columna(conn, "proyectos", "version", "INTEGER NOT NULL DEFAULT 1")
+
+@migracion(5, "búsqueda de texto completo (FTS5) de empleados y proyectos")
+def _busqueda(conn):
+    # Índices FTS5 sincronizados por triggers (ver app/busqueda.py); en otros
+    # motores la búsqueda usa ILIKE y no hay nada que crear.
+    if busqueda.disponible(conn):
+        for tabla in busqueda.INDICES:
+            busqueda.crear(conn, tabla)
+
+@migracion(6, "registro de cambios (cambios, cambios_horizonte)")
+def _cambios(conn):
+    from . import models
+    for tabla in (models.Cambio.__table__, models.HorizonteCambios.__table__):
+        tabla.create(bind=conn, checkfirst=True)
+    if not conn.scalar(select(models.HorizonteCambios.id)):
+        conn.execute(models.HorizonteCambios.__table__.insert().values(id=1, seq=0))
+
+def abrir_historial(conn, desde: datetime) -> None:
+    """Abre en `desde` un intervalo por cada asignación y gerente actuales."""
+    from . import models
+    momento = literal(desde, DateTime)
+    a, p = models.Asignacion, models.Proyecto
+    conn.execute(insert(models.HistorialAsignacion).from_select(
+        ["asignacion_id", "empleado_id", "proyecto_id", "desde"], select(a.id, a.empleado_id, a.proyecto_id, momento)))
+    conn.execute(insert(models.HistorialGerente).from_select(
+        ["proyecto_id", "empleado_id", "desde"], select(p.id, p.gerente_id, momento).where(p.gerente_id.is_not(None))))
+
+@migracion(7, "historial de asignaciones y gerentes (intervalos desde/hasta)")
+def _historial(conn):
+    # Lo vigente al migrar abre su intervalo ahora: no hay historial anterior
+    from . import models
+    for tabla in (models.HistorialAsignacion.__table__, models.HistorialGerente.__table__):
+        tabla.create(bind=conn, checkfirst=True)
+    abrir_historial(conn, datetime.now(timezone.utc).replace(tzinfo=None))
+
+def _con_autoincrement(conn: Connection, tabla: str) -> bool:
+    sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)).scalar()
+    return "AUTOINCREMENT" in (sql or "").upper()
+
+@migracion(8, "AUTOINCREMENT en empleados, proyectos y asignaciones (los ids no se reutilizan)")
+def _autoincrement(conn):
+    # Sin AUTOINCREMENT SQLite reutiliza el id más alto tras borrarlo, y el
+    # nuevo registro repetiría el ETag tipo-id-version del anterior. En otros
+    # motores la clave es una secuencia y no hay nada que hacer.
+    from . import models
+    tablas = [m.__table__ for m in (models.Empleado, models.Proyecto, models.Asignacion)]
+    if conn.dialect.name != "sqlite" or all(_con_autoincrement(conn, t.name) for t in tablas):
+        return
+    # Reconstrucción: con foreign_keys=ON (no se puede apagar dentro de la
+    # transacción) borrar una tabla padre dispara sus ON DELETE, así que se
+    # copian aparte y se borran de hijas a padres, cuando ya nadie las referencia.
+    for t in tablas:
+        conn.exec_driver_sql(f"CREATE TABLE {t.name}_previa AS SELECT * FROM {t.name}")
+    for t in reversed(tablas):
+        conn.exec_driver_sql(f"DROP TABLE {t.name}")
+    for t in tablas:
+        t.create(bind=conn)
+        # Las columnas de migraciones posteriores toman su valor por defecto
+        columnas = ", ".join(c.name for c in t.columns if _tiene_columna(conn, f"{t.name}_previa", c.name))
+        conn.exec_driver_sql(f"INSERT INTO {t.name} ({columnas}) SELECT {columnas} FROM {t.name}_previa")
+        conn.exec_driver_sql(f"DROP TABLE {t.name}_previa")
+    # Los ids borrados antes de migrar que aún recuerdan el registro de cambios
+    # y el historial tampoco se reutilizan
+    vistos = {
+        "empleados": ("empleado", "empleado_id"),
+        "proyectos": ("proyecto", "proyecto_id"),
+        "asignaciones": ("asignacion", "asignacion_id"),
+    }
+    for tabla, (entidad, columna) in vistos.items():
+        seq = max(conn.exec_driver_sql(q, p).scalar() or 0 for q, p in (
+            (f"SELECT MAX(id) FROM {tabla}", ()),
+            ("SELECT MAX(entidad_id) FROM cambios WHERE entidad = ?", (entidad,)),
+            (f"SELECT MAX({columna}) FROM historial_asignaciones", ()),
+        ))
+        conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = ?", (tabla,))
+        conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (tabla, seq))
+    # Los triggers de búsqueda se fueron con las tablas
+    if busqueda.disponible(conn):
+        for tabla in busqueda.INDICES:
+            busqueda.crear(conn, tabla)
+
+@migracion(9, "proyectos.num_empleados e índice de empleados.num_proyectos (reportes)")
+def _contadores_reportes(conn):
+    agregar_columna(conn, "proyectos", "num_empleados", "INTEGER NOT NULL DEFAULT 0")
+    # También si la columna ya existía: la reconstrucción de la migración 8 la crea en 0
+    conn.exec_driver_sql(
+        "UPDATE proyectos SET num_empleados = "
+        "(SELECT COUNT(*) FROM asignaciones WHERE asignaciones.proyecto_id = proyectos.id)"
+    )
+    crear_indice(conn, "ix_empleados_num_proyectos", "empleados", "num_proyectos")
+
+# ---------- Aplicación ----------
+def version_actual(conn: Connection) -> int:
+    if not _tiene_tabla(conn, esquema_version.name):
+        return 0
+    return conn.scalar(select(esquema_version.c.version).order_by(esquema_version.c.version.desc()).limit(1)) or 0
+
+def pendientes(conn: Connection) -> list[tuple[int, str, Callable[[Connection], None]]]:
+    actual = version_actual(conn)
+    return [m for m in MIGRACIONES if m[0] > actual]
+
+def _bloquear(conn: Connection) -> None:
+    """
+    Serializa migraciones concurrentes (varios workers arrancando a la vez):
+    SQLite toma el lock de escritura con BEGIN IMMEDIATE y PostgreSQL un
+    advisory lock de transacción. En otros backends, usar el comando aparte.
+    """
+    if conn.dialect.name == "sqlite":
+        if not conn.connection.driver_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SELECT pg_advisory_xact_lock(hashtext('proyectos-api:migraciones'))")
+
+def migrar(conn: Connection) -> list[int]:
+    """
+    Aplica las migraciones pendientes en la transacción de `conn` y devuelve
+    las versiones aplicadas. Con el esquema al día cuesta una consulta y no
+    toma ningún lock; si hay pendientes se vuelven a leer ya con el lock.
+    """
+    if not pendientes(conn):
+        return []
+    _bloquear(conn)
+    aplicadas = []
+    for version, descripcion, fn in pendientes(conn):
+        fn(conn)
+        _meta.create_all(bind=conn)
+        conn.execute(esquema_version.insert().values(
+            version=version, descripcion=descripcion, aplicada_en=datetime.now(timezone.utc).replace(tzinfo=None),
+        ))
+        aplicadas.append(version)
+    return aplicadas
+
+
+def _en_conexion(fn):
+    m = motores()
+    if not m.modo_async:
+        with m.engine.begin() as conn:
+            return fn(conn)
+
+    async def _async():
+        async with m.async_engine.begin() as conn:
+            resultado = await conn.run_sync(fn)
+        await cerrar_motores()
+        return resultado
+    return asyncio.run(_async())
+
+def main(argv: list[str] | None = None) -> None:
+    p = argparse.ArgumentParser(description="Migraciones del esquema de proyectos-api")
+    p.add_argument("--estado", action="store_true", help="sólo muestra la versión actual y las pendientes")
+    args = p.parse_args(argv)
+    if args.estado:
+        actual, faltan = _en_conexion(lambda conn: (version_actual(conn), pendientes(conn)))
+        print(f"versión actual: {actual}")
+        for version, descripcion, _ in faltan:
+            print(f"  pendiente {version:>3}: {descripcion}")
+        return
+    aplicadas = _en_conexion(migrar)
+    print(f"aplicadas: {', '.join(map(str, aplicadas))}" if aplicadas else "esquema al día")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 import enum
-from sqlalchemy import Integer, String, Text, Enum, ForeignKey, UniqueConstraint, Float
+from datetime import datetime
+from sqlalchemy import Integer, String, Text, Enum, ForeignKey, UniqueConstraint, CheckConstraint, Index, Float, JSON, DateTime, text
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from .database import Base
 
+MAX_PROYECTOS_POR_EMPLEADO = 5
 
 class EstadoEmpleado(str, enum.Enum):
     activo = "activo"
@@ -18,13 +20,19 @@ class EstadoProyecto(str, enum.Enum):
 class Empleado(Base):
     __tablename__ = "empleados"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     cc: Mapped[str] = mapped_column(String(20), unique=True, index=True, nullable=False)
     nombre: Mapped[str] = mapped_column(String(100), nullable=False)
     cargo: Mapped[str | None] = mapped_column(String(50), nullable=True)
     estado: Mapped[EstadoEmpleado] = mapped_column(Enum(EstadoEmpleado), default=EstadoEmpleado.activo, nullable=False)
-
-    asignaciones = relationship("Asignacion", back_populates="empleado", cascade="all, delete-orphan")
+    # Contador desnormalizado de asignaciones; el CHECK hace cumplir el máximo en la base
+    num_proyectos: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Versión de la fila (ETags / If-Match); el ORM la incrementa y verifica en cada UPDATE
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+    # passive_deletes: el ON DELETE CASCADE de la FK borra las asignaciones en la base
+    asignaciones = relationship("Asignacion", back_populates="empleado", cascade="all, delete-orphan",
+                                passive_deletes=True)
     proyectos_dirigidos = relationship("Proyecto", back_populates="gerente", cascade="all")
 
     # Compatibilidad con esquemas: exponer estado_empleado como alias de 'estado'
@@ -38,10 +46,22 @@ class Empleado(Base):
             return
         self.estado = EstadoEmpleado(value) if isinstance(value, str) else value
 
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        CheckConstraint(f"num_proyectos BETWEEN 0 AND {MAX_PROYECTOS_POR_EMPLEADO}", name="ck_empleado_num_proyectos"),
+        # Filtro por estado + paginación keyset por id (listados y _sin/_con_proyecto)
+        Index("ix_empleados_estado_id", "estado", "id"),
+        # Histograma de capacidad (reportes): GROUP BY sobre el índice, sin leer las filas
+        Index("ix_empleados_num_proyectos", "num_proyectos"),
+        # AUTOINCREMENT: un id borrado no se reutiliza (los ETags son tipo-id-version)
+        {"sqlite_autoincrement": True},
+    )
+
 class Proyecto(Base):
     __tablename__ = "proyectos"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     nombre: Mapped[str] = mapped_column(String(120), unique=True, nullable=False)
     descripcion: Mapped[str | None] = mapped_column(Text, nullable=True)
     presupuesto: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -52,20 +72,102 @@ class Proyecto(Base):
     )
 
     gerente_id: Mapped[int | None] = mapped_column(ForeignKey("empleados.id", ondelete="SET NULL"), nullable=True, index=True)
+    # Contador desnormalizado de asignaciones (reportes de dotación sin recorrer asignaciones)
+    num_empleados: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
     gerente = relationship("Empleado", back_populates="proyectos_dirigidos")
 
-    asignaciones = relationship("Asignacion", back_populates="proyecto", cascade="all, delete-orphan")
+    asignaciones = relationship("Asignacion", back_populates="proyecto", cascade="all, delete-orphan",
+                                passive_deletes=True)
+
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        # Filtros de listar_proyectos: estado + keyset por id, rango de presupuesto
+        Index("ix_proyectos_estado_id", "estado", "id"),
+        Index("ix_proyectos_presupuesto", "presupuesto"),
+        {"sqlite_autoincrement": True},
+    )
 
 class Asignacion(Base):
     __tablename__ = "asignaciones"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    empleado_id: Mapped[int] = mapped_column(ForeignKey("empleados.id", ondelete="CASCADE"), index=True)
-    proyecto_id: Mapped[int] = mapped_column(ForeignKey("proyectos.id", ondelete="CASCADE"), index=True)
+    empleado_id: Mapped[int] = mapped_column(ForeignKey("empleados.id", ondelete="CASCADE"))
+    proyecto_id: Mapped[int] = mapped_column(ForeignKey("proyectos.id", ondelete="CASCADE"))
 
     empleado = relationship("Empleado", back_populates="asignaciones")
     proyecto = relationship("Proyecto", back_populates="asignaciones")
 
     __table_args__ = (
+        # Sirve también de índice para empleado_id; proyecto_id tiene su compuesto
         UniqueConstraint("empleado_id", "proyecto_id", name="uq_empleado_proyecto"),
+        Index("ix_asignaciones_proyecto_empleado", "proyecto_id", "empleado_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+# ---------- Historial (intervalos de validez [desde, hasta)) ----------
+# asignaciones y proyectos.gerente_id guardan sólo el estado actual; aquí
+# queda cada asignación y cada gerencia con su intervalo (hasta NULL: vigente).
+# Sin FKs: el historial sobrevive a la baja del empleado o del proyecto.
+# Los intervalos vigentes (los que se cierran al escribir) se buscan por
+# índices parciales WHERE hasta IS NULL, que no crecen con el historial.
+VIGENTE = text("hasta IS NULL")
+
+class HistorialAsignacion(Base):
+    __tablename__ = "historial_asignaciones"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    asignacion_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    empleado_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    proyecto_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    desde: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    hasta: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_historial_asignaciones_vigentes", "asignacion_id", unique=True,
+              sqlite_where=VIGENTE, postgresql_where=VIGENTE),
+        # Consultas en un instante: cubren el filtro y la columna buscada
+        Index("ix_historial_asignaciones_proyecto", "proyecto_id", "desde", "hasta", "empleado_id"),
+        Index("ix_historial_asignaciones_empleado", "empleado_id", "desde", "hasta", "proyecto_id"),
+    )
+
+class HistorialGerente(Base):
+    __tablename__ = "historial_gerentes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    proyecto_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    empleado_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    desde: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    hasta: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_historial_gerentes_vigentes", "proyecto_id", unique=True,
+              sqlite_where=VIGENTE, postgresql_where=VIGENTE),
+        Index("ix_historial_gerentes_proyecto", "proyecto_id", "desde", "hasta", "empleado_id"),
     )
+
+class Cambio(Base):
+    """Registro append-only de cambios (app/cambios.py)."""
+    __tablename__ = "cambios"
+
+    # AUTOINCREMENT: un seq no se reutiliza aunque la compactación borre los últimos
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    entidad: Mapped[str] = mapped_column(String(20), nullable=False)  # empleado | proyecto | asignacion
+    entidad_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    operacion: Mapped[str] = mapped_column(String(10), nullable=False)  # crear | actualizar | eliminar
+    datos: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    momento: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Compactación: última entrada de cada entidad
+        Index("ix_cambios_entidad", "entidad", "entidad_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+class HorizonteCambios(Base):
+    """Una fila: mayor seq que borró la retención; leer desde antes exige resincronizar."""
+    __tablename__ = "cambios_horizonte"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
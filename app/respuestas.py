@@ -0,0 +1,72 @@
+from functools import lru_cache
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import Select
+from .database import FABRICA, motores
+from . import etags
+
+MEDIA_TYPE_NDJSON = "application/x-ndjson"
+
+class JSONBytes(Response):
+    """Respuesta JSON cuyo cuerpo ya son bytes (p. ej. de TypeAdapter.dump_json)."""
+    media_type = "application/json"
+
+@lru_cache
+def _adaptador(esquema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[esquema])
+
+def _validar(filas, esquema: type[BaseModel]) -> list[BaseModel]:
+    # Validar dicts es varias veces más rápido que from_attributes sobre Row
+    columnas = filas[0]._fields if filas else ()
+    return _adaptador(esquema).validate_python([dict(zip(columnas, f)) for f in filas])
+
+def lista_json(filas, esquema: type[BaseModel], siguiente: str | None = None,
+               si_no_coincide: str | None = None) -> Response:
+    """
+    Camino rápido de los listados: filas de columnas (crud.COLUMNAS_*) ->
+    validación con un TypeAdapter -> bytes JSON serializados por pydantic-core,
+    sin jsonable_encoder ni json.dumps. El cursor va en X-Siguiente-Cursor.
+    El ETag de la página sale de (id, version) de las filas: con If-None-Match
+    coincidente responde 304 sin validar ni serializar.
+    """
+    headers = {"ETag": etags.etag_filas(filas)}
+    if siguiente:
+        headers["X-Siguiente-Cursor"] = siguiente
+    if etags.coincide(si_no_coincide, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return JSONBytes(_adaptador(esquema).dump_json(_validar(filas, esquema)), headers=headers)
+
+def con_etag(entrada: dict) -> JSONBytes:
+    """Respuesta de una lectura de crud.leer_* ({"etag", "cuerpo"}) con su cabecera ETag."""
+    return JSONBytes(to_json(entrada["cuerpo"]), headers={"ETag": entrada["etag"]})
+
+def ndjson(db, consulta: Select, esquema: type[BaseModel]) -> StreamingResponse:
+    """
+    Respuesta NDJSON (un objeto JSON por línea) alimentada por una consulta de
+    crud.consulta_stream_*. La sesión se abre dentro del generador porque la
+    dependencia get_db ya se cerró cuando se empieza a enviar el cuerpo; sale
+    de la misma fábrica que `db` (la réplica o el primario que eligió get_db).
+    Se envía un fragmento por lote del cursor (yield_per).
+    """
+    def fragmento(filas) -> bytes:
+        return b"".join(obj.model_dump_json().encode() + b"\n" for obj in _validar(filas, esquema))
+
+    m = motores()
+    fabrica = db.info[FABRICA]
+
+    async def filas_async():
+        async with fabrica() as db:
+            async for lote in (await db.stream(consulta)).partitions():
+                yield fragmento(lote)
+
+    def filas_sync():
+        # Starlette itera los generadores sync en el threadpool
+        db = fabrica()
+        try:
+            for lote in db.execute(consulta).partitions():
+                yield fragmento(lote)
+        finally:
+            db.close()
+
+    return StreamingResponse(filas_async() if m.modo_async else filas_sync(), media_type=MEDIA_TYPE_NDJSON)
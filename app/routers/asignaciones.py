@@ -1,20 +1,23 @@
 from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
-from ..database import SessionLocal
-from .. import schemas, crud
+from ..database import ejecutar, get_db
+from .. import schemas, crud, lotes
 
 router = APIRouter(prefix="/asignaciones", tags=["asignaciones"])
 
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
-
 @router.post("", response_model=schemas.AsignacionSalida, status_code=status.HTTP_201_CREATED)
-def asignar(payload: schemas.AsignacionCrear, db: Session = Depends(get_db)):
-    return crud.asignar_empleado(db, payload)
+async def asignar(payload: schemas.AsignacionCrear, db=Depends(get_db)):
+    return await ejecutar(db, crud.asignar_empleado, payload)
+
+@router.post("/_lote", response_model=schemas.ReporteLote)
+async def asignar_lote(lote=Depends(lotes.cuerpo_lote(schemas.AsignacionCrear)), db=Depends(get_db)):
+    validas, errores = lote
+    return lotes.reporte(errores + await ejecutar(db, crud.asignar_empleados_lote, validas))
+
+@router.post("/_dotacion", response_model=schemas.ResultadoDotacion)
+async def aplicar_dotacion(payload: schemas.CambiosDotacion, db=Depends(get_db)):
+    return await ejecutar(db, crud.aplicar_dotacion, payload)
 
 @router.delete("", status_code=status.HTTP_204_NO_CONTENT)
-def desasignar(payload: schemas.AsignacionCrear, db: Session = Depends(get_db)):
-    crud.desasignar_empleado(db, payload)
+async def desasignar(payload: schemas.AsignacionCrear, db=Depends(get_db)):
+    await ejecutar(db, crud.desasignar_empleado, payload)
     return
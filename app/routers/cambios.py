@@ -0,0 +1,82 @@
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from ..database import abrir_sesion, ejecutar, get_db, leer_seq, obtener_settings
+from .. import schemas, crud, cambios
+
+router = APIRouter(prefix="/cambios", tags=["cambios"])
+
+ESPERA_MAXIMA = 30
+LATIDO_SEGUNDOS = 15
+
+async def _leer(desde: int, limit: int) -> schemas.PaginaCambios:
+    # Una sesión corta por lectura: no se retiene una conexión mientras se espera
+    async with abrir_sesion() as db:
+        return await ejecutar(db, crud.listar_cambios, desde, limit)
+
+@router.get("", response_model=schemas.PaginaCambios)
+async def listar(
+    desde: int = Query(default=0, ge=0, le=2**63 - 1, description="Último seq recibido; se devuelven los posteriores"),
+    limit: int = Query(default=crud.LIMITE_POR_DEFECTO, ge=1, le=crud.LIMITE_MAXIMO),
+    espera: float = Query(default=0, ge=0, le=ESPERA_MAXIMA,
+                          description="Long-poll: segundos a esperar si no hay cambios nuevos"),
+):
+    """Cambios con seq > desde, en orden. Con `espera`, responde en cuanto llega alguno."""
+    sondeo = obtener_settings().CAMBIOS_SONDEO_SEGUNDOS
+    limite = time.monotonic() + espera
+    while True:
+        with cambios.aviso.suscripcion() as esperar:
+            pagina = await _leer(desde, limit)
+            restante = limite - time.monotonic()
+            if pagina.cambios or restante <= 0:
+                return pagina
+            await esperar(min(restante, sondeo))
+
+@router.get("/_ultimo", response_model=schemas.UltimoCambio)
+async def ultimo(db=Depends(get_db)):
+    """
+    seq actual: leerlo antes de copiar los listados y seguir con /cambios?desde=seq.
+    Puede venir de una réplica: un seq atrasado sólo hace repetir cambios ya copiados.
+    """
+    return {"seq": await ejecutar(db, crud.ultimo_cambio)}
+
+def _evento(c: schemas.CambioSalida) -> str:
+    return f"id: {c.seq}\nevent: cambio\ndata: {c.model_dump_json()}\n\n"
+
+@router.get("/_stream")
+async def stream(
+    request: Request,
+    desde: int = Query(default=0, ge=0, le=2**63 - 1),
+    last_event_id: str | None = Header(default=None),
+):
+    """
+    Server-Sent Events: un evento `cambio` por entrada (id = seq). Al
+    reconectar, EventSource envía Last-Event-ID y el stream sigue desde ahí.
+    """
+    if (ultimo := leer_seq(last_event_id)) is not None:
+        desde = ultimo
+    # La primera lectura va antes de la respuesta: un 410 llega como tal
+    primera = await _leer(desde, crud.TAMANO_LOTE_STREAM)
+    sondeo = obtener_settings().CAMBIOS_SONDEO_SEGUNDOS
+
+    async def eventos():
+        pagina, enviado = primera, time.monotonic()
+        yield f"retry: {int(sondeo * 1000)}\n\n"
+        while not await request.is_disconnected():
+            if pagina.cambios:
+                yield "".join(map(_evento, pagina.cambios))
+                enviado = time.monotonic()
+            elif time.monotonic() - enviado >= LATIDO_SEGUNDOS:
+                yield ": latido\n\n"
+                enviado = time.monotonic()
+            with cambios.aviso.suscripcion() as esperar:
+                try:
+                    pagina = await _leer(pagina.siguiente, crud.TAMANO_LOTE_STREAM)
+                except HTTPException as e:
+                    yield f"event: error\ndata: {e.detail}\n\n"
+                    return
+                if not pagina.cambios:
+                    await esperar(sondeo)
+
+    return StreamingResponse(eventos(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
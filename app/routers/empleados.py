@@ -1,49 +1,106 @@
-from fastapi import APIRouter, Depends, status, Query
-from sqlalchemy.orm import Session
-from ..database import SessionLocal
-from .. import schemas, crud, models 
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, Header, status, Query, Response
+from ..database import ejecutar, get_db
+from .. import schemas, crud, models, respuestas, lotes
 
 router = APIRouter(prefix="/empleados", tags=["empleados"])
 
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
-
 @router.post("", response_model=schemas.EmpleadoSalida, status_code=status.HTTP_201_CREATED)
-def crear(payload: schemas.EmpleadoCrear, db: Session = Depends(get_db)):
-    return crud.crear_empleado(db, payload)
+async def crear(payload: schemas.EmpleadoCrear, response: Response, db=Depends(get_db)):
+    emp = await ejecutar(db, crud.crear_empleado, payload)
+    response.headers["ETag"] = crud.etag_empleado(emp)
+    return emp
+
+@router.post("/_lote", response_model=schemas.ReporteLote)
+async def crear_lote(
+    upsert: bool = Query(default=False),
+    lote=Depends(lotes.cuerpo_lote(schemas.EmpleadoCrear)),
+    db=Depends(get_db)
+):
+    validas, errores = lote
+    return lotes.reporte(errores + await ejecutar(db, crud.crear_empleados_lote, validas, upsert=upsert))
 
 @router.get("", response_model=list[schemas.EmpleadoSalida])
-def listar(
+async def listar(
     especialidad: str | None = Query(default=None),
     estado: models.EstadoEmpleado | None = Query(default=None, alias="estado_empleado"),
-    db: Session = Depends(get_db)
+    limit: int = Query(default=crud.LIMITE_POR_DEFECTO, ge=1, le=crud.LIMITE_MAXIMO),
+    after: str | None = Query(default=None, description="Cursor opaco devuelto en X-Siguiente-Cursor"),
+    formato: Literal["json", "ndjson"] = Query(default="json"),
+    if_none_match: str | None = Header(default=None),
+    db=Depends(get_db)
+):
+    if formato == "ndjson":
+        return respuestas.ndjson(db, crud.consulta_stream_empleados(estado_empleado=estado, especialidad=especialidad,
+                                                                    after=after),
+                                 schemas.EmpleadoSalida)
+    emps, siguiente = await ejecutar(db, crud.listar_empleados, especialidad=especialidad,
+                                     estado_empleado=estado, limit=limit, after=after)
+    return respuestas.lista_json(emps, schemas.EmpleadoSalida, siguiente, if_none_match)
+
+# Deben declararse antes de /{empleado_id}: si no, "_sin_proyecto" se
+# intenta convertir a entero y la ruta responde 422.
+@router.get("/_sin_proyecto", response_model=list[schemas.EmpleadoSalida])
+async def sin_proyecto(
+    estado: models.EstadoEmpleado | None = Query(default=None, alias="estado_empleado"),
+    limit: int = Query(default=crud.LIMITE_POR_DEFECTO, ge=1, le=crud.LIMITE_MAXIMO),
+    after: str | None = Query(default=None, description="Cursor opaco devuelto en X-Siguiente-Cursor"),
+    if_none_match: str | None = Header(default=None),
+    db=Depends(get_db)
 ):
-    return crud.listar_empleados(db, especialidad=especialidad, estado_empleado=estado)
+    emps, siguiente = await ejecutar(db, crud.empleados_sin_proyecto, estado_empleado=estado, limit=limit, after=after)
+    return respuestas.lista_json(emps, schemas.EmpleadoSalida, siguiente, if_none_match)
+
+@router.get("/_con_proyecto", response_model=list[schemas.EmpleadoSalida])
+async def con_proyecto(
+    estado: models.EstadoEmpleado | None = Query(default=None, alias="estado_empleado"),
+    limit: int = Query(default=crud.LIMITE_POR_DEFECTO, ge=1, le=crud.LIMITE_MAXIMO),
+    after: str | None = Query(default=None, description="Cursor opaco devuelto en X-Siguiente-Cursor"),
+    if_none_match: str | None = Header(default=None),
+    db=Depends(get_db)
+):
+    emps, siguiente = await ejecutar(db, crud.empleados_con_proyecto, estado_empleado=estado, limit=limit, after=after)
+    return respuestas.lista_json(emps, schemas.EmpleadoSalida, siguiente, if_none_match)
+
+@router.get("/_buscar", response_model=list[schemas.EmpleadoSalida])
+async def buscar(
+    q: str = Query(..., min_length=1, max_length=200, description="Términos a buscar en nombre, cargo y cc"),
+    estado: models.EstadoEmpleado | None = Query(default=None, alias="estado_empleado"),
+    tolerante: bool = Query(default=True, description="Corregir errores de tipeo si no hay resultados"),
+    limit: int = Query(default=crud.LIMITE_POR_DEFECTO, ge=1, le=crud.LIMITE_MAXIMO),
+    after: str | None = Query(default=None, description="Cursor opaco devuelto en X-Siguiente-Cursor"),
+    if_none_match: str | None = Header(default=None),
+    db=Depends(get_db)
+):
+    emps, siguiente = await ejecutar(db, crud.buscar_empleados, q, estado_empleado=estado, tolerante=tolerante,
+                                     limit=limit, after=after)
+    return respuestas.lista_json(emps, schemas.EmpleadoSalida, siguiente, if_none_match)
 
 @router.get("/{empleado_id}", response_model=schemas.EmpleadoSalida)
-def obtener(empleado_id: int, db: Session = Depends(get_db)):
-    return crud.obtener_empleado(db, empleado_id)
+async def obtener(empleado_id: int, if_none_match: str | None = Header(default=None), db=Depends(get_db)):
+    return respuestas.con_etag(await ejecutar(db, crud.leer_empleado, empleado_id, if_none_match))
 
 @router.patch("/{empleado_id}", response_model=schemas.EmpleadoSalida)
-def actualizar(empleado_id: int, payload: schemas.EmpleadoActualizar, db: Session = Depends(get_db)):
-    return crud.actualizar_empleado(db, empleado_id, payload)
+async def actualizar(empleado_id: int, payload: schemas.EmpleadoActualizar, response: Response,
+                     if_match: str | None = Header(default=None), db=Depends(get_db)):
+    emp = await ejecutar(db, crud.actualizar_empleado, empleado_id, payload, if_match)
+    response.headers["ETag"] = crud.etag_empleado(emp)
+    return emp
 
 @router.delete("/{empleado_id}", status_code=status.HTTP_204_NO_CONTENT)
-def eliminar(empleado_id: int, db: Session = Depends(get_db)):
-    crud.eliminar_empleado(db, empleado_id)
+async def eliminar(empleado_id: int, if_match: str | None = Header(default=None), db=Depends(get_db)):
+    await ejecutar(db, crud.eliminar_empleado, empleado_id, if_match)
     return
 
-@router.get("/_sin_proyecto", response_model=list[schemas.EmpleadoSalida])
-def sin_proyecto(db: Session = Depends(get_db)):
-    return crud.empleados_sin_proyecto(db)
-
-@router.get("/_con_proyecto", response_model=list[schemas.EmpleadoSalida])
-def con_proyecto(db: Session = Depends(get_db)):
-    return crud.empleados_con_proyecto(db)
-
-@router.get("/{empleado_id}/proyectos", response_model=schemas.ProyectosDeEmpleado)
-def listar_proyectos_de_empleado(empleado_id: int, db: Session = Depends(get_db)):
-    emp, proys = crud.proyectos_de_empleado(db, empleado_id)
-    return {"empleado": emp, "proyectos": proys}
+@router.get("/{empleado_id}/proyectos",
+            response_model=schemas.ProyectosDeEmpleado | schemas.ProyectosDeEmpleadoEn)
+async def listar_proyectos_de_empleado(
+    empleado_id: int,
+    en: datetime | None = Query(default=None, description="Instante (ISO 8601) a consultar en el historial"),
+    if_none_match: str | None = Header(default=None),
+    db=Depends(get_db)
+):
+    if en is not None:
+        return await ejecutar(db, crud.proyectos_de_empleado_en, empleado_id, en)
+    return respuestas.con_etag(await ejecutar(db, crud.leer_proyectos_de_empleado, empleado_id, if_none_match))
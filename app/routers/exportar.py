@@ -0,0 +1,19 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from ..database import get_db
+from .. import exportar
+
+router = APIRouter(prefix="/exportar", tags=["exportar"])
+
+@router.get("/{tabla}", response_class=StreamingResponse)
+async def exportar_tabla(
+    tabla: Literal["empleados", "proyectos", "asignaciones", "dotacion"],
+    formato: Literal["csv", "parquet", "arrow"] = Query(default="csv"),
+    db=Depends(get_db)
+):
+    """
+    Tabla completa en streaming: CSV con gzip (por defecto), Parquet o Arrow
+    IPC. `dotacion` es el cruce empleado × proyecto de cada asignación.
+    """
+    return exportar.respuesta(db, tabla, formato)
@@ -1,59 +1,100 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Query
-from sqlalchemy.orm import Session
-from ..database import SessionLocal
-from .. import schemas, crud, models
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, Header, status, Query, Response
+from ..database import ejecutar, get_db
+from .. import schemas, crud, models, respuestas, lotes
 
 router = APIRouter(prefix="/proyectos", tags=["proyectos"])
 
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
-
 @router.post("", response_model=schemas.ProyectoSalida, status_code=status.HTTP_201_CREATED)
-def crear(payload: schemas.ProyectoCrear, db: Session = Depends(get_db)):
-    return crud.crear_proyecto(db, payload)
+async def crear(payload: schemas.ProyectoCrear, response: Response, db=Depends(get_db)):
+    pr = await ejecutar(db, crud.crear_proyecto, payload)
+    response.headers["ETag"] = crud.etag_proyecto(pr)
+    return pr
+
+@router.post("/_lote", response_model=schemas.ReporteLote)
+async def crear_lote(
+    upsert: bool = Query(default=False),
+    lote=Depends(lotes.cuerpo_lote(schemas.ProyectoCrear)),
+    db=Depends(get_db)
+):
+    validas, errores = lote
+    return lotes.reporte(errores + await ejecutar(db, crud.crear_proyectos_lote, validas, upsert=upsert))
 
 @router.get("", response_model=list[schemas.ProyectoSalida])
-def listar(
+async def listar(
     estado: models.EstadoProyecto | None = Query(default=None),
     presupuesto_min: float | None = Query(default=None),
     presupuesto_max: float | None = Query(default=None),
-    db: Session = Depends(get_db)
+    limit: int = Query(default=crud.LIMITE_POR_DEFECTO, ge=1, le=crud.LIMITE_MAXIMO),
+    after: str | None = Query(default=None, description="Cursor opaco devuelto en X-Siguiente-Cursor"),
+    formato: Literal["json", "ndjson"] = Query(default="json"),
+    if_none_match: str | None = Header(default=None),
+    db=Depends(get_db)
+):
+    if formato == "ndjson":
+        return respuestas.ndjson(
+            db, crud.consulta_stream_proyectos(estado=estado, presupuesto_min=presupuesto_min,
+                                               presupuesto_max=presupuesto_max, after=after),
+            schemas.ProyectoSalida,
+        )
+    proys, siguiente = await ejecutar(db, crud.listar_proyectos, estado=estado,
+                                      presupuesto_min=presupuesto_min,
+                                      presupuesto_max=presupuesto_max,
+                                      limit=limit, after=after)
+    return respuestas.lista_json(proys, schemas.ProyectoSalida, siguiente, if_none_match)
+
+# Antes de /{proyecto_id} para que "_buscar" no se lea como id
+@router.get("/_buscar", response_model=list[schemas.ProyectoSalida])
+async def buscar(
+    q: str = Query(..., min_length=1, max_length=200, description="Términos a buscar en nombre y descripción"),
+    estado: models.EstadoProyecto | None = Query(default=None),
+    tolerante: bool = Query(default=True, description="Corregir errores de tipeo si no hay resultados"),
+    limit: int = Query(default=crud.LIMITE_POR_DEFECTO, ge=1, le=crud.LIMITE_MAXIMO),
+    after: str | None = Query(default=None, description="Cursor opaco devuelto en X-Siguiente-Cursor"),
+    if_none_match: str | None = Header(default=None),
+    db=Depends(get_db)
 ):
-    return crud.listar_proyectos(db, estado=estado,
-                                 presupuesto_min=presupuesto_min,
-                                 presupuesto_max=presupuesto_max)
+    proys, siguiente = await ejecutar(db, crud.buscar_proyectos, q, estado=estado, tolerante=tolerante,
+                                      limit=limit, after=after)
+    return respuestas.lista_json(proys, schemas.ProyectoSalida, siguiente, if_none_match)
 
 @router.get("/{proyecto_id}", response_model=schemas.ProyectoSalida)
-def obtener(proyecto_id: int, db: Session = Depends(get_db)):
-    pr = db.get(models.Proyecto, proyecto_id)
-    if not pr: raise HTTPException(404, "Proyecto no encontrado")
-    return pr
+async def obtener(proyecto_id: int, if_none_match: str | None = Header(default=None), db=Depends(get_db)):
+    return respuestas.con_etag(await ejecutar(db, crud.leer_proyecto, proyecto_id, if_none_match))
 
 @router.patch("/{proyecto_id}", response_model=schemas.ProyectoSalida)
-def actualizar(proyecto_id: int, payload: schemas.ProyectoActualizar, db: Session = Depends(get_db)):
-    return crud.actualizar_proyecto(db, proyecto_id, payload)
+async def actualizar(proyecto_id: int, payload: schemas.ProyectoActualizar, response: Response,
+                     if_match: str | None = Header(default=None), db=Depends(get_db)):
+    pr = await ejecutar(db, crud.actualizar_proyecto, proyecto_id, payload, if_match)
+    response.headers["ETag"] = crud.etag_proyecto(pr)
+    return pr
 
 @router.delete("/{proyecto_id}", status_code=status.HTTP_204_NO_CONTENT)
-def eliminar(proyecto_id: int, db: Session = Depends(get_db)):
-    crud.eliminar_proyecto(db, proyecto_id)
+async def eliminar(proyecto_id: int, if_match: str | None = Header(default=None), db=Depends(get_db)):
+    await ejecutar(db, crud.eliminar_proyecto, proyecto_id, if_match)
     return
 
 @router.post("/{proyecto_id}/gerente/{empleado_id}", response_model=schemas.ProyectoSalida)
-def fijar_gerente(proyecto_id: int, empleado_id: int, db: Session = Depends(get_db)):
-    return crud.fijar_gerente(db, proyecto_id, empleado_id)
+async def fijar_gerente(proyecto_id: int, empleado_id: int, db=Depends(get_db)):
+    return await ejecutar(db, crud.fijar_gerente, proyecto_id, empleado_id)
 
 @router.delete("/{proyecto_id}/gerente", response_model=schemas.ProyectoSalida)
-def quitar_gerente(proyecto_id: int, db: Session = Depends(get_db)):
-    return crud.quitar_gerente(db, proyecto_id)
+async def quitar_gerente(proyecto_id: int, db=Depends(get_db)):
+    return await ejecutar(db, crud.quitar_gerente, proyecto_id)
 
-@router.get("/{proyecto_id}/empleados", response_model=schemas.EmpleadosDeProyecto)
-def listar_empleados_de_proyecto(proyecto_id: int, db: Session = Depends(get_db)):
-    pr, emps = crud.empleados_de_proyecto(db, proyecto_id)
-    return {"proyecto": pr, "empleados": emps}
+@router.get("/{proyecto_id}/empleados",
+            response_model=schemas.EmpleadosDeProyecto | schemas.EmpleadosDeProyectoEn)
+async def listar_empleados_de_proyecto(
+    proyecto_id: int,
+    en: datetime | None = Query(default=None, description="Instante (ISO 8601) a consultar en el historial"),
+    if_none_match: str | None = Header(default=None),
+    db=Depends(get_db)
+):
+    if en is not None:
+        return await ejecutar(db, crud.empleados_de_proyecto_en, proyecto_id, en)
+    return respuestas.con_etag(await ejecutar(db, crud.leer_empleados_de_proyecto, proyecto_id, if_none_match))
 
 @router.get("/{proyecto_id}/detalle", response_model=schemas.ProyectoDetalle)
-def obtener_detalle(proyecto_id: int, db: Session = Depends(get_db)):
-    pr, ger, emps = crud.detalle_proyecto(db, proyecto_id)
-    return {"proyecto": pr, "gerente": ger, "empleados": emps}
\ No newline at end of file
+async def obtener_detalle(proyecto_id: int, if_none_match: str | None = Header(default=None), db=Depends(get_db)):
+    return respuestas.con_etag(await ejecutar(db, crud.leer_detalle_proyecto, proyecto_id, if_none_match))
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from ..database import ejecutar, get_db
+from .. import schemas, crud, respuestas
+
+router = APIRouter(prefix="/reportes", tags=["reportes"])
+
+@router.get("/dotacion", response_model=schemas.ReporteDotacion)
+async def dotacion(db=Depends(get_db)):
+    """Empleados asignados por proyecto y por estado de proyecto."""
+    return respuestas.JSONBytes(await ejecutar(db, crud.reporte, "dotacion"))
+
+@router.get("/capacidad", response_model=schemas.ReporteCapacidad)
+async def capacidad(db=Depends(get_db)):
+    """Histograma de proyectos por empleado (0 a 5): quién tiene cupo."""
+    return respuestas.JSONBytes(await ejecutar(db, crud.reporte, "capacidad"))
+
+@router.get("/presupuesto", response_model=schemas.ReportePresupuesto)
+async def presupuesto(db=Depends(get_db)):
+    """Presupuesto total y promedio por estado y por gerente."""
+    return respuestas.JSONBytes(await ejecutar(db, crud.reporte, "presupuesto"))
+
+@router.get("/gerentes", response_model=schemas.ReporteGerentes)
+async def gerentes(db=Depends(get_db)):
+    """Carga de cada gerente: proyectos dirigidos, empleados a cargo y presupuesto."""
+    return respuestas.JSONBytes(await ejecutar(db, crud.reporte, "gerentes"))
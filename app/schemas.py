@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from datetime import datetime
+from typing import Optional, List, Literal
 from enum import Enum
 
 class EstadoProyecto(str, Enum):
@@ -32,8 +33,14 @@ class EmpleadoActualizar(BaseModel):
     salario: Optional[float] = Field(None, ge=0)
     estado_empleado: Optional[EstadoEmpleado] = None
 
-class EmpleadoSalida(EmpleadoBase):
+# Las salidas sólo declaran columnas del modelo: especialidad/salario y
+# fecha_inicio/fecha_fin se aceptan en la entrada pero no se guardan.
+class EmpleadoSalida(BaseModel):
     id: int
+    cc: str
+    nombre: str
+    cargo: Optional[str] = None
+    estado_empleado: EstadoEmpleado = EstadoEmpleado.activo
     model_config = ConfigDict(from_attributes=True)
 
 # ---- Proyecto
@@ -57,8 +64,12 @@ class ProyectoActualizar(BaseModel):
     presupuesto: Optional[float] = Field(None, ge=0)  # NUEVO
     gerente_id: Optional[int] = None
 
-class ProyectoSalida(ProyectoBase):
+class ProyectoSalida(BaseModel):
     id: int
+    nombre: str
+    descripcion: Optional[str] = None
+    estado: EstadoProyecto = EstadoProyecto.planeado
+    presupuesto: Optional[float] = None
     gerente_id: Optional[int] = None
     model_config = ConfigDict(from_attributes=True)
 
@@ -79,6 +90,20 @@ class AsignacionSalida(BaseModel):
     proyecto_id: int
     model_config = ConfigDict(from_attributes=True)
 
+class CambioGerente(BaseModel):
+    proyecto_id: int
+    empleado_id: Optional[int] = None  # None quita el gerente
+
+class CambiosDotacion(BaseModel):
+    agregar: List[AsignacionCrear] = []
+    quitar: List[AsignacionCrear] = []
+    gerentes: List[CambioGerente] = []
+
+class ResultadoDotacion(BaseModel):
+    agregadas: List[AsignacionSalida]
+    quitadas: int
+    proyectos: List[int]  # proyectos cuya dotación o gerente cambió
+
 class ProyectosDeEmpleado(BaseModel):
     empleado: EmpleadoSalida
     proyectos: List[ProyectoSalida]
@@ -86,3 +111,102 @@ class ProyectosDeEmpleado(BaseModel):
 class EmpleadosDeProyecto(BaseModel):
     proyecto: ProyectoSalida
     empleados: List[EmpleadoSalida]
+
+# ---- Historial (?en=): quién estaba asignado en un instante; los datos de
+# cada empleado / proyecto son los actuales (los eliminados no aparecen)
+class ProyectosDeEmpleadoEn(BaseModel):
+    empleado_id: int
+    en: datetime
+    proyectos: List[ProyectoSalida]
+    eliminados: List[int] = []  # ids de proyectos de entonces que ya no existen
+
+class EmpleadosDeProyectoEn(BaseModel):
+    proyecto_id: int
+    en: datetime
+    gerente_id: Optional[int]
+    empleados: List[EmpleadoSalida]
+    eliminados: List[int] = []  # ids de empleados de entonces que ya no existen
+
+# ---- Cargas masivas (lotes)
+class ResultadoFila(BaseModel):
+    fila: int
+    ok: bool
+    id: Optional[int] = None
+    accion: Optional[str] = None  # "creado" | "actualizado"
+    error: Optional[str] = None
+
+class ReporteLote(BaseModel):
+    total: int
+    exitosos: int
+    fallidos: int
+    resultados: List[ResultadoFila]
+
+# ---- Registro de cambios
+EntidadCambio = Literal["empleado", "proyecto", "asignacion"]
+
+class CambioSalida(BaseModel):
+    seq: int
+    entidad: EntidadCambio
+    entidad_id: int
+    operacion: Literal["crear", "actualizar", "eliminar"]
+    datos: Optional[dict] = None  # representación pública tras el cambio; None al eliminar
+    momento: datetime
+
+class PaginaCambios(BaseModel):
+    cambios: List[CambioSalida]
+    siguiente: int  # valor de `desde` para la próxima lectura
+    hay_mas: bool
+
+class UltimoCambio(BaseModel):
+    seq: int
+
+# ---- Reportes
+class DotacionProyecto(BaseModel):
+    proyecto_id: int
+    nombre: str
+    estado: EstadoProyecto
+    empleados: int
+
+class DotacionEstado(BaseModel):
+    estado: EstadoProyecto
+    proyectos: int
+    empleados: int
+
+class ReporteDotacion(BaseModel):
+    por_proyecto: List[DotacionProyecto]
+    por_estado: List[DotacionEstado]
+
+class CubetaCapacidad(BaseModel):
+    proyectos: int
+    empleados: int
+
+class ReporteCapacidad(BaseModel):
+    maximo: int
+    histograma: List[CubetaCapacidad]
+    con_cupo: int
+
+class PresupuestoEstado(BaseModel):
+    estado: EstadoProyecto
+    proyectos: int
+    total: Optional[float] = None
+    promedio: Optional[float] = None
+
+class PresupuestoGerente(BaseModel):
+    gerente_id: Optional[int] = None
+    proyectos: int
+    total: Optional[float] = None
+    promedio: Optional[float] = None
+
+class ReportePresupuesto(BaseModel):
+    por_estado: List[PresupuestoEstado]
+    por_gerente: List[PresupuestoGerente]
+
+class CargaGerente(BaseModel):
+    gerente_id: int
+    nombre: str
+    proyectos: int
+    empleados_a_cargo: int
+    presupuesto_total: Optional[float] = None
+
+class ReporteGerentes(BaseModel):
+    gerentes: List[CargaGerente]
@@ -0,0 +1,5 @@
+# Los benchmarks crean bases temporales: la app las migra al arrancar (también
+# en los procesos que lanzan, que heredan el entorno)
+import os
+
+os.environ.setdefault("MIGRAR_AL_INICIAR", "true")
@@ -0,0 +1,83 @@
+"""
+Mide el arranque en procesos nuevos (import en frío, sin caché de módulos
+compartida): el piso de las dependencias (fastapi, sqlalchemy.orm,
+pydantic_settings), `import app.main` y el tiempo hasta que el lifespan
+terminó y responde GET /. Cuenta las sentencias SQL emitidas al importar
+(deben ser 0) y al arrancar con el esquema al día.
+
+Uso: python -m bench.arranque [--repeticiones 5] [--url sqlite+aiosqlite:///...]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_PISO = """
+import time; t0 = time.perf_counter()
+import fastapi, fastapi.routing, sqlalchemy.orm, pydantic_settings
+print('{"piso_ms": %f}' % ((time.perf_counter() - t0) * 1000))
+"""
+
+_APP = """
+import time; t0 = time.perf_counter()
+import json, asyncio
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+sentencias = []
+event.listen(Engine, "before_cursor_execute", lambda *a: sentencias.append(a[2]))
+import app.main
+from app.database import motores, obtener_settings
+t_import = time.perf_counter()
+al_importar = {"sql": len(sentencias), "motor_creado": bool(motores.cache_info().currsize),
+               "settings_leidos": bool(obtener_settings.cache_info().currsize)}
+
+async def arrancar():
+    import httpx
+    transporte = httpx.ASGITransport(app=app.main.app)
+    async with app.main.app.router.lifespan_context(app.main.app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://t") as c:
+            assert (await c.get("/")).status_code == 200
+            return time.perf_counter()
+
+t_listo = asyncio.run(arrancar())
+print(json.dumps({"import_ms": (t_import - t0) * 1000, "listo_ms": (t_listo - t0) * 1000,
+                  "al_importar": al_importar, "sql_al_arrancar": len(sentencias) - al_importar["sql"]}))
+"""
+
+
+def _correr(codigo: str, entorno: dict) -> dict:
+    salida = subprocess.run([sys.executable, "-c", codigo], env=entorno, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--repeticiones", type=int, default=5)
+    p.add_argument("--url", default=None, help="DATABASE_URL (por defecto un SQLite temporal)")
+    args = p.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'arranque.db')}"
+    entorno = {**os.environ, "DATABASE_URL": url,
+               "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))}
+
+    # Primer arranque: aplica las migraciones (base vacía)
+    primero = _correr(_APP, entorno)
+    print(f"primer arranque (migra): listo {primero['listo_ms']:.0f} ms, {primero['sql_al_arrancar']} sentencias")
+
+    piso = [_correr(_PISO, entorno)["piso_ms"] for _ in range(args.repeticiones)]
+    corridas = [_correr(_APP, entorno) for _ in range(args.repeticiones)]
+    mediana = lambda xs: statistics.median(xs)  # noqa: E731
+    print(f"piso dependencias:      {mediana(piso):7.0f} ms")
+    print(f"import app.main:        {mediana([r['import_ms'] for r in corridas]):7.0f} ms")
+    print(f"listo (lifespan + GET): {mediana([r['listo_ms'] for r in corridas]):7.0f} ms")
+    print(f"al importar:            {corridas[-1]['al_importar']}")
+    print(f"SQL al arrancar:        {corridas[-1]['sql_al_arrancar']} sentencias (esquema al día)")
+    return 1 if any(r["al_importar"]["sql"] or r["al_importar"]["motor_creado"] for r in corridas) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Latencia de la búsqueda de texto (crud.buscar_empleados, FTS5) frente al
+único recurso previo: filtrar con LIKE '%término%' sobre nombre, cargo y cc,
+que recorre la tabla completa. Mide la primera página (limit 20) de cada
+consulta con la mediana de varias repeticiones (con la caché activa, como en
+producción: el vocabulario de las correcciones se lee una vez). El ranking
+es exacto, así que el costo de la FTS crece con el número de coincidencias:
+los términos sintéticos muy comunes (prefijo, cargo) pasan de 10 ms.
+
+Uso: python -m bench.busqueda_texto [--empleados 1000000] [--url sqlite:///carga.db]
+     (--url reutiliza una base de bench.datos; si no, la genera)
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+CONSULTAS = [
+    ("prefijo", "gonz"),
+    ("nombre + apellido", "maría lópez"),
+    ("dos apellidos", "gutiérrez navarro"),
+    ("nombre completo", "camila serrano ortega"),
+    ("cc", "10004217"),
+    ("cargo", "arquitecto"),
+    ("tipeo", "gonzales"),
+    ("tipeo 2", "fernandes castilo"),
+    ("sin resultados", "zzzyyx"),
+]
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--empleados", type=int, default=1_000_000)
+    p.add_argument("--url", default=None, help="base ya generada con bench.datos")
+    p.add_argument("--repeticiones", type=int, default=20)
+    p.add_argument("--repeticiones-like", type=int, default=3)
+    args = p.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'busqueda.db')}"
+    os.environ["DATABASE_URL"] = url
+    os.environ["METRICAS_HABILITADAS"] = "false"
+    from sqlalchemy import or_, select
+    from app import crud, models
+    from app.database import motores
+    from app.migraciones import migrar
+
+    if args.url is None:
+        from bench.datos import preparar
+        t0 = time.perf_counter()
+        print(f"datos: {preparar(url, empleados=args.empleados)} en {time.perf_counter() - t0:.0f} s")
+    with motores().engine.begin() as conn:
+        migrar(conn)
+
+    def medir(fn, repeticiones):
+        fn()
+        tiempos = []
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            filas = fn()
+            tiempos.append(time.perf_counter() - t0)
+        return statistics.median(tiempos) * 1000, filas
+
+    with motores().SessionLocal() as db:
+        total = db.scalar(select(crud.func.count()).select_from(models.Empleado))
+        print(f"{total:,} empleados\n")
+        print(f"{'consulta':<20} {'q':<24} {'FTS ms':>8} {'filas':>6} {'LIKE ms':>9} {'filas':>6}")
+        lentas = 0
+        for nombre, q in CONSULTAS:
+            ms_fts, filas = medir(lambda: crud.buscar_empleados(db, q, limit=20)[0], args.repeticiones)
+            terminos = q.split()
+            like = (select(*crud.COLUMNAS_EMPLEADO)
+                    .where(*(or_(models.Empleado.nombre.like(f"%{t}%"), models.Empleado.cargo.like(f"%{t}%"),
+                                 models.Empleado.cc.like(f"%{t}%")) for t in terminos))
+                    .order_by(models.Empleado.id).limit(20))
+            ms_like, filas_like = medir(lambda: db.execute(like).all(), args.repeticiones_like)
+            lentas += ms_fts >= 10
+            print(f"{nombre:<20} {q:<24} {ms_fts:8.2f} {len(filas):6} {ms_like:9.1f} {len(filas_like):6}")
+    print(f"\n{'todas < 10 ms' if not lentas else f'{lentas} consultas >= 10 ms'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Sincronizar una copia de empleados, proyectos y asignaciones: sondear los
+listados completos (NDJSON, lo que hacen hoy los servicios cada minuto)
+frente a leer sólo los cambios con GET /cambios?desde=seq. Genera la base
+con bench.datos, aplica unas cuantas escrituras por la API y compara bytes
+y tiempo de cada forma. Mide además la latencia de entrega por SSE
+(/cambios/_stream) desde el commit de una escritura.
+
+Uso: python -m bench.cambios [--empleados 100000] [--escrituras 100]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--empleados", type=int, default=100_000)
+    p.add_argument("--escrituras", type=int, default=100)
+    p.add_argument("--puerto", type=int, default=8766)
+    args = p.parse_args()
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cambios.db')}"
+    os.environ["DATABASE_URL"] = url
+    from bench.datos import preparar
+    print(f"datos: {preparar(url, empleados=args.empleados)}")
+
+    import httpx
+    from bench.carga_async import _levantar
+    proc = _levantar(url, args.puerto, {"METRICAS_HABILITADAS": "false"})
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.puerto}", timeout=120) as c:
+            inicio = c.get("/cambios/_ultimo").json()["seq"]
+            for i in range(args.escrituras):
+                e = 1 + i * 7919 % args.empleados
+                c.patch(f"/empleados/{e}", json={"cargo": f"cargo {i}"}).raise_for_status()
+
+            t0 = time.perf_counter()
+            completo = sum(len(c.get(ruta, params={"formato": "ndjson"}).content)
+                           for ruta in ("/empleados", "/proyectos"))
+            completo += len(c.get("/reportes/dotacion").content)  # asignaciones: no hay listado completo
+            ms_completo = (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            delta, desde, hay_mas = 0, inicio, True
+            while hay_mas:
+                r = c.get("/cambios", params={"desde": desde, "limit": 1000})
+                delta += len(r.content)
+                desde, hay_mas = r.json()["siguiente"], r.json()["hay_mas"]
+            ms_delta = (time.perf_counter() - t0) * 1000
+            print(f"\n{'forma':<26} {'bytes':>12} {'ms':>9}")
+            print(f"{'listados completos':<26} {completo:12,} {ms_completo:9.1f}")
+            print(f"{'/cambios?desde':<26} {delta:12,} {ms_delta:9.1f}")
+
+            latencias, recibido = [], threading.Event()
+
+            def escuchar():
+                with httpx.stream("GET", f"http://127.0.0.1:{args.puerto}/cambios/_stream",
+                                  params={"desde": desde}, timeout=30) as r:
+                    for linea in r.iter_lines():
+                        if linea.startswith("data:"):
+                            latencias.append(time.perf_counter())
+                            recibido.set()
+                            if len(latencias) == 20:
+                                return
+            hilo = threading.Thread(target=escuchar)
+            hilo.start()
+            time.sleep(0.5)
+            envios = []
+            for i in range(20):
+                recibido.clear()
+                t0 = time.perf_counter()
+                c.patch(f"/empleados/{i + 1}", json={"cargo": f"sse {i}"}).raise_for_status()
+                envios.append(t0)
+                recibido.wait(5)
+            hilo.join()
+            demora = [(r - e) * 1000 for e, r in zip(envios, latencias)]
+            print(f"\nSSE: PATCH -> evento, mediana {statistics.median(demora):.1f} ms, máx {max(demora):.1f} ms "
+                  "(incluye la petición de escritura)")
+    finally:
+        proc.terminate()
+        proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
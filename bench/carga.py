@@ -0,0 +1,345 @@
+"""
+Benchmark de carga de todas las rutas de app/routers con mezclas realistas de
+lectura/escritura sobre datos sintéticos (bench.datos), en dos modos:
+
+- asgi: la app en el mismo proceso vía httpx.ASGITransport (sin red; mide la
+  app más el cliente, útil para comparar cambios de código);
+- uvicorn: la app en un proceso uvicorn y el cliente por HTTP.
+
+Reporta p50/p95/p99 y peticiones/s (global y por ruta) y guarda los
+resultados en JSON. Con --comparar marca regresiones contra una corrida
+anterior y termina con código 1 si las hay.
+
+Uso: python -m bench.carga [--modo asgi|uvicorn|ambos] [--mezcla lectura|mixta|escritura]
+     [--empleados 10000] [--peticiones 5000] [--concurrencia 32]
+     [--salida res.json] [--comparar base.json] [--tolerancia 0.15]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+# Fracción de escrituras de cada mezcla
+MEZCLAS = {"lectura": 0.05, "mixta": 0.2, "escritura": 0.5}
+# Rutas con al menos estas muestras entran en la comparación por ruta
+MUESTRAS_MINIMAS = 50
+
+
+class Estado:
+    """Ids conocidos por el generador de peticiones (los sembrados más los creados en la corrida)."""
+
+    def __init__(self, empleados: int, proyectos: int, rnd: random.Random):
+        self.empleados, self.proyectos, self.rnd = empleados, proyectos, rnd
+        self.nuevos_empleados: list[int] = []
+        self.nuevos_proyectos: list[int] = []
+        self.asignadas: list[tuple[int, int]] = []
+        self.serie = 0
+        self.prefijo = f"{rnd.randrange(10**6):06d}"
+
+    def emp(self) -> int:
+        return self.rnd.randint(1, self.empleados)
+
+    def pr(self) -> int:
+        return self.rnd.randint(1, self.proyectos)
+
+    def siguiente(self) -> str:
+        self.serie += 1
+        return f"{self.prefijo}{self.serie:07d}"
+
+
+# ---------- Operaciones ----------
+# Cada operación devuelve (método, ruta plantilla, url, cuerpo json, callback(respuesta) o None)
+
+def _creado(lista):
+    def registrar(r):
+        if r.status_code == 201:
+            lista.append(r.json()["id"])
+    return registrar
+
+
+def _lista_empleados(s):
+    filtro = s.rnd.choice(["", "&estado_empleado=activo", "&estado_empleado=inactivo"])
+    return "GET", "/empleados", f"/empleados?limit=50{filtro}", None, None
+
+
+def _lista_proyectos(s):
+    filtro = s.rnd.choice(["&estado=en_curso", "&estado=planeado", "&presupuesto_min=1000000&presupuesto_max=1500000"])
+    return "GET", "/proyectos", f"/proyectos?limit=50{filtro}", None, None
+
+
+LECTURAS = [
+    (20, lambda s: ("GET", "/empleados/{id}", f"/empleados/{s.emp()}", None, None)),
+    (15, lambda s: ("GET", "/proyectos/{id}", f"/proyectos/{s.pr()}", None, None)),
+    (12, lambda s: ("GET", "/proyectos/{id}/detalle", f"/proyectos/{s.pr()}/detalle", None, None)),
+    (10, lambda s: ("GET", "/proyectos/{id}/empleados", f"/proyectos/{s.pr()}/empleados", None, None)),
+    (10, lambda s: ("GET", "/empleados/{id}/proyectos", f"/empleados/{s.emp()}/proyectos", None, None)),
+    (8, _lista_empleados),
+    (8, _lista_proyectos),
+    (4, lambda s: ("GET", "/empleados/_sin_proyecto", "/empleados/_sin_proyecto?limit=50", None, None)),
+    (4, lambda s: ("GET", "/empleados/_con_proyecto", "/empleados/_con_proyecto?limit=50", None, None)),
+    *((2, lambda s, r=r: ("GET", f"/reportes/{r}", f"/reportes/{r}", None, None))
+      for r in ("dotacion", "capacidad", "presupuesto", "gerentes")),
+]
+
+
+def _crear_empleado(s):
+    cuerpo = {"cc": s.siguiente(), "nombre": "Empleado de carga", "cargo": "dev"}
+    return "POST", "/empleados", "/empleados", cuerpo, _creado(s.nuevos_empleados)
+
+
+def _crear_proyecto(s):
+    cuerpo = {"nombre": f"Carga {s.siguiente()}", "presupuesto": s.rnd.randrange(0, 5_000_000, 1000)}
+    return "POST", "/proyectos", "/proyectos", cuerpo, _creado(s.nuevos_proyectos)
+
+
+def _eliminar_empleado(s):
+    # Sólo los creados en la corrida: los sembrados pueden ser gerentes (409)
+    if not s.nuevos_empleados:
+        return _crear_empleado(s)
+    e = s.nuevos_empleados.pop(s.rnd.randrange(len(s.nuevos_empleados)))
+    return "DELETE", "/empleados/{id}", f"/empleados/{e}", None, None
+
+
+def _eliminar_proyecto(s):
+    if not s.nuevos_proyectos:
+        return _crear_proyecto(s)
+    p = s.nuevos_proyectos.pop(s.rnd.randrange(len(s.nuevos_proyectos)))
+    return "DELETE", "/proyectos/{id}", f"/proyectos/{p}", None, None
+
+
+def _asignar(s):
+    par = (s.emp(), s.pr())
+
+    def registrar(r):
+        if r.status_code == 201:
+            s.asignadas.append(par)
+    return "POST", "/asignaciones", "/asignaciones", {"empleado_id": par[0], "proyecto_id": par[1]}, registrar
+
+
+def _desasignar(s):
+    if not s.asignadas:
+        return _asignar(s)
+    e, p = s.asignadas.pop(s.rnd.randrange(len(s.asignadas)))
+    return "DELETE", "/asignaciones", "/asignaciones", {"empleado_id": e, "proyecto_id": p}, None
+
+
+ESCRITURAS = [
+    (15, _asignar),
+    (12, _desasignar),
+    (15, lambda s: ("PATCH", "/empleados/{id}", f"/empleados/{s.emp()}",
+                    {"cargo": s.rnd.choice(["dev", "qa", "analista"])}, None)),
+    (10, lambda s: ("PATCH", "/proyectos/{id}", f"/proyectos/{s.pr()}",
+                    {"presupuesto": s.rnd.randrange(0, 5_000_000, 1000)}, None)),
+    (8, _crear_empleado),
+    (5, _eliminar_empleado),
+    (5, _crear_proyecto),
+    (3, _eliminar_proyecto),
+    (5, lambda s: ("POST", "/proyectos/{id}/gerente/{empleado_id}", f"/proyectos/{s.pr()}/gerente/{s.emp()}",
+                   None, None)),
+    (3, lambda s: ("DELETE", "/proyectos/{id}/gerente", f"/proyectos/{s.pr()}/gerente", None, None)),
+    (2, lambda s: ("POST", "/empleados/_lote", "/empleados/_lote",
+                   [{"cc": s.siguiente(), "nombre": "Lote de carga"} for _ in range(10)], None)),
+    (2, lambda s: ("POST", "/proyectos/_lote", "/proyectos/_lote",
+                   [{"nombre": f"Carga {s.siguiente()}"} for _ in range(5)], None)),
+    (2, lambda s: ("POST", "/asignaciones/_lote", "/asignaciones/_lote",
+                   [{"empleado_id": s.emp(), "proyecto_id": s.pr()} for _ in range(5)], None)),
+]
+
+
+def _percentil(ordenadas: list[float], q: float) -> float:
+    return ordenadas[max(0, math.ceil(q * len(ordenadas)) - 1)] * 1000 if ordenadas else 0.0
+
+
+def _resumen(latencias: list[float], duracion: float | None = None) -> dict:
+    ordenadas = sorted(latencias)
+    r = {"n": len(ordenadas), "p50_ms": _percentil(ordenadas, 0.5), "p95_ms": _percentil(ordenadas, 0.95),
+         "p99_ms": _percentil(ordenadas, 0.99)}
+    if duracion is not None:
+        r["rps"] = len(ordenadas) / duracion
+    return r
+
+
+async def _conducir(cliente: httpx.AsyncClient, s: Estado, escrituras: float, peticiones: int,
+                    concurrencia: int, calentamiento: int) -> dict:
+    pesos_l, ops_l = zip(*LECTURAS)
+    pesos_e, ops_e = zip(*ESCRITURAS)
+    latencias: dict[str, list[float]] = defaultdict(list)
+    estados: dict[str, Counter] = defaultdict(Counter)
+    errores = 0
+    restantes = calentamiento + peticiones
+
+    async def trabajador():
+        nonlocal restantes, errores
+        while restantes > 0:
+            restantes -= 1
+            medir = restantes < peticiones
+            if s.rnd.random() < escrituras:
+                op = s.rnd.choices(ops_e, pesos_e)[0]
+            else:
+                op = s.rnd.choices(ops_l, pesos_l)[0]
+            metodo, plantilla, url, cuerpo, al_responder = op(s)
+            ruta = f"{metodo} {plantilla}"
+            t0 = time.perf_counter()
+            try:
+                r = await cliente.request(metodo, url, json=cuerpo)
+            except httpx.HTTPError:
+                errores += medir
+                continue
+            dt = time.perf_counter() - t0
+            if al_responder:
+                al_responder(r)
+            if medir:
+                latencias[ruta].append(dt)
+                estados[ruta][r.status_code] += 1
+                errores += r.status_code >= 500
+
+    # El calentamiento corre con la misma concurrencia; el reloj cuenta desde el inicio
+    # y se descuenta la fracción de calentamiento en proporción a las peticiones
+    t0 = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    duracion = (time.perf_counter() - t0) * peticiones / (peticiones + calentamiento)
+
+    todas = [x for xs in latencias.values() for x in xs]
+    return {
+        "global": {**_resumen(todas, duracion), "errores": errores},
+        "rutas": {ruta: {**_resumen(xs), "estados": {str(k): v for k, v in sorted(estados[ruta].items())}}
+                  for ruta, xs in sorted(latencias.items())},
+    }
+
+
+async def _correr_asgi(url: str, s: Estado, args) -> dict:
+    os.environ["DATABASE_URL"] = url
+    from app.database import cerrar_motores, obtener_settings
+    from app.main import crear_app
+    obtener_settings.cache_clear()
+    await cerrar_motores()
+    app = crear_app()
+    transporte = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://carga", timeout=60) as cliente:
+            return await _conducir(cliente, s, MEZCLAS[args.mezcla], args.peticiones, args.concurrencia,
+                                   args.calentamiento)
+
+
+async def _correr_uvicorn(url: str, s: Estado, args) -> dict:
+    from bench.carga_async import _levantar
+    proc = _levantar(url, args.puerto)
+    try:
+        limites = httpx.Limits(max_connections=args.concurrencia)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.puerto}", limits=limites,
+                                     timeout=60) as cliente:
+            return await _conducir(cliente, s, MEZCLAS[args.mezcla], args.peticiones, args.concurrencia,
+                                   args.calentamiento)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _regresiones(actual: dict, base: dict, tolerancia: float) -> list[str]:
+    """Compara dos corridas del mismo modo: rps global, p95/p99 global y p95 por ruta."""
+    hallazgos = []
+    ga, gb = actual["global"], base["global"]
+    if ga["rps"] < gb["rps"] * (1 - tolerancia):
+        hallazgos.append(f"rps {gb['rps']:.0f} -> {ga['rps']:.0f}")
+    for q in ("p95_ms", "p99_ms"):
+        if ga[q] > gb[q] * (1 + tolerancia):
+            hallazgos.append(f"global {q} {gb[q]:.1f} -> {ga[q]:.1f}")
+    for ruta, ra in actual["rutas"].items():
+        rb = base["rutas"].get(ruta)
+        if rb and min(ra["n"], rb["n"]) >= MUESTRAS_MINIMAS and ra["p95_ms"] > rb["p95_ms"] * (1 + tolerancia):
+            hallazgos.append(f"{ruta} p95_ms {rb['p95_ms']:.1f} -> {ra['p95_ms']:.1f}")
+    return hallazgos
+
+
+def _imprimir(corrida: dict) -> None:
+    g = corrida["global"]
+    print(f"\n[{corrida['modo']} / {corrida['mezcla']}] {g['rps']:.0f} req/s  p50 {g['p50_ms']:.1f}  "
+          f"p95 {g['p95_ms']:.1f}  p99 {g['p99_ms']:.1f} ms  errores {g['errores']}")
+    print(f"  {'ruta':<46} {'n':>6} {'p50':>7} {'p95':>7} {'p99':>7}  estados")
+    for ruta, r in corrida["rutas"].items():
+        estados = " ".join(f"{k}:{v}" for k, v in r["estados"].items())
+        print(f"  {ruta:<46} {r['n']:6} {r['p50_ms']:7.1f} {r['p95_ms']:7.1f} {r['p99_ms']:7.1f}  {estados}")
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--modo", choices=("asgi", "uvicorn", "ambos"), default="asgi")
+    p.add_argument("--mezcla", choices=tuple(MEZCLAS), default="mixta")
+    p.add_argument("--empleados", type=int, default=10_000)
+    p.add_argument("--proyectos", type=int, default=None, help="por defecto empleados / 10")
+    p.add_argument("--peticiones", type=int, default=5000)
+    p.add_argument("--calentamiento", type=int, default=200)
+    p.add_argument("--concurrencia", type=int, default=32)
+    p.add_argument("--semilla", type=int, default=0)
+    p.add_argument("--async", dest="modo_async", action="store_true", help="usar sqlite+aiosqlite")
+    p.add_argument("--puerto", type=int, default=8766)
+    p.add_argument("--salida", default=None, help="JSON de resultados (por defecto en bench/resultados/)")
+    p.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    p.add_argument("--tolerancia", type=float, default=0.15, help="empeoramiento relativo admitido")
+    args = p.parse_args()
+
+    from bench.datos import preparar
+    tmp = tempfile.mkdtemp()
+    plantilla = os.path.join(tmp, "plantilla.db")
+    conteos = preparar(f"sqlite:///{plantilla}", empleados=args.empleados, proyectos=args.proyectos,
+                       semilla=args.semilla)
+    print(f"datos: {conteos}")
+
+    corridas = []
+    for modo in (("asgi", "uvicorn") if args.modo == "ambos" else (args.modo,)):
+        # Cada modo arranca de una copia de la misma base y con la misma semilla
+        archivo = os.path.join(tmp, f"{modo}.db")
+        shutil.copy(plantilla, archivo)
+        url = f"sqlite{'+aiosqlite' if args.modo_async else ''}:///{archivo}"
+        s = Estado(conteos["empleados"], conteos["proyectos"], random.Random(args.semilla))
+        correr = _correr_asgi if modo == "asgi" else _correr_uvicorn
+        corrida = {"modo": modo, "mezcla": args.mezcla, **asyncio.run(correr(url, s, args))}
+        corridas.append(corrida)
+        _imprimir(corrida)
+
+    resultado = {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+        "datos": conteos,
+        "entorno": {"python": platform.python_version(), "plataforma": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "corridas": corridas,
+    }
+    salida = args.salida or os.path.join(
+        "bench", "resultados", f"{datetime.now():%Y%m%d-%H%M%S}-{args.modo}-{args.mezcla}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\nresultados: {salida}")
+
+    if not args.comparar:
+        return 0
+    with open(args.comparar) as f:
+        base = {(c["modo"], c["mezcla"]): c for c in json.load(f)["corridas"]}
+    regresiones = 0
+    for corrida in corridas:
+        anterior = base.get((corrida["modo"], corrida["mezcla"]))
+        if anterior is None:
+            print(f"[{corrida['modo']} / {corrida['mezcla']}] sin corrida equivalente en {args.comparar}")
+            continue
+        hallazgos = _regresiones(corrida, anterior, args.tolerancia)
+        regresiones += len(hallazgos)
+        print(f"[{corrida['modo']} / {corrida['mezcla']}] " + ("REGRESIÓN" if hallazgos else "sin regresiones"))
+        for h in hallazgos:
+            print("   ", h)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Benchmark de carga: compara el modo sync (sqlite://) y el modo async
+(sqlite+aiosqlite://) levantando uvicorn con cada DATABASE_URL y lanzando
+peticiones concurrentes de lectura y escritura.
+
+Uso: python -m bench.carga_async [--concurrencia 200] [--peticiones 5000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+MODOS = {"sync": "sqlite:///{}", "async": "sqlite+aiosqlite:///{}"}
+
+
+def _levantar(url: str, puerto: int, entorno: dict | None = None) -> subprocess.Popen:
+    env = {**os.environ, **(entorno or {}), "DATABASE_URL": url}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(puerto), "--log-level", "warning"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{puerto}/", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("uvicorn no arrancó")
+
+
+async def _sembrar(cliente: httpx.AsyncClient, empleados: int, proyectos: int):
+    await cliente.post("/empleados/_lote", json=[{"cc": f"{10_000_000 + i}", "nombre": f"Empleado {i}"}
+                                                 for i in range(empleados)])
+    await cliente.post("/proyectos/_lote", json=[{"nombre": f"Proyecto {i}"} for i in range(proyectos)])
+    await cliente.post("/asignaciones/_lote", json=[{"empleado_id": e, "proyecto_id": 1 + (e * 7 + k) % proyectos}
+                                                    for e in range(1, empleados + 1) for k in range(2)])
+
+
+async def _carga(cliente: httpx.AsyncClient, peticiones: int, concurrencia: int, empleados: int, proyectos: int,
+                escrituras: float):
+    latencias: list[float] = []
+    errores = 0
+    sem = asyncio.Semaphore(concurrencia)
+
+    async def una(i: int):
+        nonlocal errores
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                if random.random() < escrituras:
+                    r = await cliente.patch(f"/empleados/{random.randint(1, empleados)}", json={"cargo": f"c{i}"})
+                elif i % 2:
+                    r = await cliente.get(f"/proyectos/{random.randint(1, proyectos)}/detalle")
+                else:
+                    r = await cliente.get(f"/empleados/{random.randint(1, empleados)}")
+            except httpx.HTTPError:
+                errores += 1
+                return
+            latencias.append(time.perf_counter() - t0)
+            if r.status_code >= 500:
+                errores += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(una(i) for i in range(peticiones)))
+    total = time.perf_counter() - t0
+    latencias.sort()
+    return {
+        "rps": peticiones / total,
+        "p50_ms": statistics.median(latencias) * 1000,
+        "p95_ms": latencias[int(len(latencias) * 0.95)] * 1000,
+        "errores": errores,
+    }
+
+
+async def medir(modo: str, args, entorno: dict | None = None) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = _levantar(MODOS[modo].format(os.path.join(tmp, "bench.db")), args.puerto, entorno)
+        try:
+            limites = httpx.Limits(max_connections=args.concurrencia)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.puerto}", limits=limites,
+                                         timeout=60) as cliente:
+                await _sembrar(cliente, args.empleados, args.proyectos)
+                return await _carga(cliente, args.peticiones, args.concurrencia, args.empleados, args.proyectos,
+                                    args.escrituras)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+def argumentos(descripcion: str) -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description=descripcion)
+    p.add_argument("--concurrencia", type=int, default=100)
+    p.add_argument("--peticiones", type=int, default=2000)
+    p.add_argument("--empleados", type=int, default=5000)
+    p.add_argument("--proyectos", type=int, default=500)
+    p.add_argument("--escrituras", type=float, default=0.1, help="fracción de peticiones PATCH")
+    p.add_argument("--puerto", type=int, default=8765)
+    return p
+
+
+def main():
+    args = argumentos(__doc__.strip().splitlines()[0]).parse_args()
+    for modo in MODOS:
+        r = asyncio.run(medir(modo, args))
+        print(f"{modo:>5}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f} ms  "
+              f"p95 {r['p95_ms']:7.1f} ms  errores {r['errores']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Generador de datos sintéticos para benchmarks: llena empleados, proyectos y
+asignaciones a escala configurable (10k–1M filas) respetando las reglas de
+crud: cc y nombres de proyecto únicos, gerentes existentes, como máximo
+MAX_PROYECTOS_POR_EMPLEADO asignaciones por empleado (num_proyectos igual a
+las filas reales), sin duplicados y sin gerentes asignados a su propio
+proyecto. Es determinista para una misma semilla.
+
+Inserta con Core (executemany por lotes), sin pasar por crud ni la API.
+
+Uso: python -m bench.datos --url sqlite:///carga.db [--empleados 100000]
+     [--proyectos N] [--media-asignaciones 2] [--semilla 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+NOMBRES = ("María", "José", "Ana", "Luis", "Carmen", "Juan", "Laura", "Carlos", "Lucía", "Andrés", "Sofía",
+           "Miguel", "Valentina", "Jorge", "Camila", "Pedro", "Isabel", "Diego", "Paula", "Javier", "Daniela",
+           "Fernando", "Natalia", "Ricardo", "Gabriela", "Sergio", "Mariana", "Alejandro", "Andrea", "Manuel",
+           "Elena", "Raúl", "Claudia", "Óscar", "Beatriz", "Hugo", "Adriana", "Felipe", "Silvia", "Tomás")
+APELLIDOS = ("García", "Rodríguez", "González", "Fernández", "López", "Martínez", "Sánchez", "Pérez", "Gómez",
+             "Martín", "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno", "Muñoz", "Álvarez", "Romero", "Alonso",
+             "Gutiérrez", "Navarro", "Torres", "Domínguez", "Vázquez", "Ramos", "Gil", "Ramírez", "Serrano",
+             "Blanco", "Molina", "Morales", "Suárez", "Ortega", "Delgado", "Castro", "Ortiz", "Rubio", "Marín",
+             "Sanz", "Núñez", "Iglesias", "Medina", "Garrido", "Cortés", "Castillo", "Santos", "Lozano", "Guerrero")
+CARGOS = ("desarrollador backend", "desarrolladora frontend", "analista de datos", "arquitecto de software",
+          "diseñadora UX", "soporte técnico", "ingeniero de calidad", "administrador de bases de datos",
+          "gerente de proyecto", "científica de datos", None)
+TEMAS = ("Migración", "Portal", "Plataforma", "Integración", "Automatización", "Auditoría", "Rediseño",
+         "Modernización", "Analítica", "Sistema")
+AREAS = ("nómina", "inventario", "facturación", "clientes", "logística", "compras", "tesorería",
+         "recursos humanos", "ventas", "seguridad")
+PALABRAS = ("servicio", "datos", "reportes", "usuarios", "procesos", "integración", "nube", "móvil", "pagos",
+            "indicadores", "contratos", "proveedores", "tablero", "flujo", "aprobaciones", "documentos")
+DESDE_HISTORIAL = datetime(2020, 1, 1)
+# Probabilidad de cada número de proyectos por empleado (0..5) con media ~2
+PESOS_ASIGNACIONES = (0.15, 0.2, 0.25, 0.2, 0.12, 0.08)
+
+
+def _en_lotes(filas, lote: int):
+    buf = []
+    for fila in filas:
+        buf.append(fila)
+        if len(buf) == lote:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def generar(conn, empleados: int, proyectos: int | None = None, media_asignaciones: float = 2.0,
+            semilla: int = 0, lote: int = 50_000) -> dict:
+    """
+    Inserta los datos en `conn` (tablas vacías, esquema migrado) y devuelve
+    los conteos. Los ids son 1..n, así los benchmarks pueden elegirlos al azar.
+    """
+    from sqlalchemy import insert
+    from app import models
+    from app.migraciones import abrir_historial
+
+    maximo = models.MAX_PROYECTOS_POR_EMPLEADO
+    proyectos = proyectos if proyectos is not None else max(1, empleados // 10)
+    rnd = random.Random(semilla)
+    estados_pr = list(models.EstadoProyecto)
+
+    # Gerentes: ~70% de los proyectos, elegidos entre los empleados
+    gerentes = [rnd.randint(1, empleados) if rnd.random() < 0.7 else None for _ in range(proyectos)]
+
+    # Cantidad de proyectos por empleado, escalando los pesos a la media pedida
+    escala = media_asignaciones / sum(k * p for k, p in enumerate(PESOS_ASIGNACIONES))
+    cantidades = [min(maximo, round(k * escala)) for k in
+                  rnd.choices(range(len(PESOS_ASIGNACIONES)), PESOS_ASIGNACIONES, k=empleados)]
+    cantidades = [min(k, proyectos) for k in cantidades]
+
+    def asignaciones():
+        for e, k in enumerate(cantidades, start=1):
+            if not k:
+                continue
+            elegidos = rnd.sample(range(1, proyectos + 1), k)
+            for p in elegidos:
+                if gerentes[p - 1] == e:
+                    cantidades[e - 1] -= 1
+                    continue
+                yield {"empleado_id": e, "proyecto_id": p}
+
+    # Las asignaciones se generan antes que los empleados para que
+    # num_proyectos refleje los descartes por gerente
+    filas_asg = list(asignaciones())
+
+    empleados_filas = (
+        {"id": i, "cc": str(10_000_000 + i), "cargo": rnd.choice(CARGOS),
+         "nombre": f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+         "estado": models.EstadoEmpleado.activo if rnd.random() < 0.9 else models.EstadoEmpleado.inactivo,
+         "num_proyectos": cantidades[i - 1]}
+        for i in range(1, empleados + 1)
+    )
+    for filas in _en_lotes(empleados_filas, lote):
+        conn.execute(insert(models.Empleado), filas)
+
+    dotacion = Counter(a["proyecto_id"] for a in filas_asg)
+    proyectos_filas = (
+        {"id": i, "nombre": f"{rnd.choice(TEMAS)} de {rnd.choice(AREAS)} {i}",
+         "descripcion": " ".join(rnd.choices(PALABRAS, k=rnd.randint(4, 10))).capitalize(),
+         "presupuesto": rnd.randrange(0, 5_000_000, 1000) if rnd.random() < 0.9 else None,
+         "estado": rnd.choice(estados_pr), "gerente_id": gerentes[i - 1], "num_empleados": dotacion[i]}
+        for i in range(1, proyectos + 1)
+    )
+    for filas in _en_lotes(proyectos_filas, lote):
+        conn.execute(insert(models.Proyecto), filas)
+
+    for filas in _en_lotes(filas_asg, lote):
+        conn.execute(insert(models.Asignacion), filas)
+    # Lo generado rige desde DESDE_HISTORIAL (intervalos abiertos)
+    abrir_historial(conn, DESDE_HISTORIAL)
+    return {"empleados": empleados, "proyectos": proyectos, "asignaciones": len(filas_asg)}
+
+
+def verificar(conn) -> list[str]:
+    """Comprueba las reglas de crud sobre los datos; devuelve las violaciones."""
+    from app import models
+    consultas = {
+        "num_proyectos distinto de las asignaciones reales": """
+            SELECT count(*) FROM empleados e
+            WHERE e.num_proyectos != (SELECT count(*) FROM asignaciones a WHERE a.empleado_id = e.id)""",
+        "num_empleados distinto de las asignaciones reales": """
+            SELECT count(*) FROM proyectos p
+            WHERE p.num_empleados != (SELECT count(*) FROM asignaciones a WHERE a.proyecto_id = p.id)""",
+        "empleados con más proyectos que el máximo": f"""
+            SELECT count(*) FROM empleados WHERE num_proyectos > {models.MAX_PROYECTOS_POR_EMPLEADO}""",
+        "gerentes asignados a su propio proyecto": """
+            SELECT count(*) FROM asignaciones a JOIN proyectos p ON p.id = a.proyecto_id
+            WHERE p.gerente_id = a.empleado_id""",
+        "gerentes inexistentes": """
+            SELECT count(*) FROM proyectos p
+            WHERE p.gerente_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM empleados e WHERE e.id = p.gerente_id)""",
+    }
+    return [f"{n}: {c}" for n, sql in consultas.items() if (c := conn.exec_driver_sql(sql).scalar())]
+
+
+def preparar(url: str, **opciones) -> dict:
+    """Migra la base de `url` (debe estar vacía) y la llena con generar()."""
+    from sqlalchemy import create_engine, func, select
+    from app import models
+    from app.migraciones import migrar
+
+    motor = create_engine(url)
+    try:
+        with motor.begin() as conn:
+            migrar(conn)
+            if conn.scalar(select(func.count()).select_from(models.Empleado)):
+                raise SystemExit(f"{url} ya tiene datos; el generador necesita una base vacía")
+            conteos = generar(conn, **opciones)
+            if motor.dialect.name == "sqlite":
+                conn.exec_driver_sql("ANALYZE")
+            return conteos
+    finally:
+        motor.dispose()
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--url", required=True, help="DATABASE_URL sync, p. ej. sqlite:///carga.db")
+    p.add_argument("--empleados", type=int, default=100_000)
+    p.add_argument("--proyectos", type=int, default=None, help="por defecto empleados / 10")
+    p.add_argument("--media-asignaciones", type=float, default=2.0)
+    p.add_argument("--semilla", type=int, default=0)
+    args = p.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", args.url)
+    t0 = time.perf_counter()
+    conteos = preparar(args.url, empleados=args.empleados, proyectos=args.proyectos,
+                       media_asignaciones=args.media_asignaciones, semilla=args.semilla)
+    print(f"{conteos} en {time.perf_counter() - t0:.1f} s")
+
+    from sqlalchemy import create_engine
+    motor = create_engine(args.url)
+    with motor.connect() as conn:
+        violaciones = verificar(conn)
+    motor.dispose()
+    print("reglas: OK" if not violaciones else "\n".join(violaciones))
+    return 1 if violaciones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
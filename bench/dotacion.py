@@ -0,0 +1,107 @@
+"""
+Mover un equipo de N personas entre dos proyectos: con la API previa son 2N
+peticiones (DELETE /asignaciones + POST /asignaciones por persona, cada una
+con su commit) y con POST /asignaciones/_dotacion una sola transacción.
+Mide peticiones, sentencias SQL y tiempo de cada forma dentro del proceso
+(TestClient) y por HTTP contra uvicorn, alternando el sentido del
+movimiento en cada ronda.
+
+Uso: python -m bench.dotacion [--equipo 200] [--rondas 5] [--sin-http]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+EMPLEADOS = 1000
+PROYECTOS = 4
+
+
+def _sembrar(c, equipo: int):
+    c.post("/empleados/_lote", json=[{"cc": f"{10_000_000 + i}", "nombre": f"Empleado {i}"} for i in range(EMPLEADOS)])
+    c.post("/proyectos/_lote", json=[{"nombre": f"Proyecto {i}"} for i in range(PROYECTOS)])
+    c.post("/asignaciones/_lote", json=[{"empleado_id": e, "proyecto_id": 1} for e in range(1, equipo + 1)])
+
+
+def _uno_por_uno(c, equipo: int, desde: int, hacia: int) -> int:
+    for e in range(1, equipo + 1):
+        c.request("DELETE", "/asignaciones", json={"empleado_id": e, "proyecto_id": desde}).raise_for_status()
+        c.post("/asignaciones", json={"empleado_id": e, "proyecto_id": hacia}).raise_for_status()
+    return 2 * equipo
+
+
+def _dotacion(c, equipo: int, desde: int, hacia: int) -> int:
+    c.post("/asignaciones/_dotacion", json={
+        "quitar": [{"empleado_id": e, "proyecto_id": desde} for e in range(1, equipo + 1)],
+        "agregar": [{"empleado_id": e, "proyecto_id": hacia} for e in range(1, equipo + 1)],
+    }).raise_for_status()
+    return 1
+
+
+def _medir(c, equipo: int, rondas: int, contar=None) -> dict:
+    """Alterna ambas formas moviendo el equipo 1 -> 2 -> 1 ...; devuelve medianas por forma."""
+    from contextlib import nullcontext
+    tiempos = {"uno por uno": [], "_dotacion": []}
+    peticiones, sentencias = {}, {}
+    actual = 1
+    for _ in range(rondas):
+        for nombre, fn in (("uno por uno", _uno_por_uno), ("_dotacion", _dotacion)):
+            hacia = 2 if actual == 1 else 1
+            with (contar() if contar else nullcontext([])) as s:
+                t0 = time.perf_counter()
+                peticiones[nombre] = fn(c, equipo, actual, hacia)
+                tiempos[nombre].append(time.perf_counter() - t0)
+            sentencias[nombre] = len(s)
+            actual = hacia
+    return {n: (peticiones[n], sentencias[n], statistics.median(t) * 1000) for n, t in tiempos.items()}
+
+
+def _imprimir(titulo: str, resultado: dict, con_sentencias: bool):
+    print(f"\n{titulo}")
+    print(f"{'forma':<14} {'peticiones':>10} {'sentencias':>11} {'ms':>9}")
+    for nombre, (peticiones, sentencias, ms) in resultado.items():
+        print(f"{nombre:<14} {peticiones:10} {sentencias if con_sentencias else '-':>11} {ms:9.1f}")
+    base, nuevo = resultado["uno por uno"][2], resultado["_dotacion"][2]
+    print(f"_dotacion: {base / nuevo:.1f}x más rápido")
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--equipo", type=int, default=200)
+    p.add_argument("--rondas", type=int, default=5)
+    p.add_argument("--puerto", type=int, default=8765)
+    p.add_argument("--sin-http", action="store_true", help="sólo la medición dentro del proceso")
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'dotacion.db')}"
+    os.environ["METRICAS_HABILITADAS"] = "false"
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database import contar_consultas
+
+    with TestClient(app) as c:
+        _sembrar(c, args.equipo)
+        _imprimir(f"Dentro del proceso (TestClient), equipo de {args.equipo}",
+                  _medir(c, args.equipo, args.rondas, contar_consultas), True)
+
+    if not args.sin_http:
+        import httpx
+        from bench.carga_async import _levantar
+        url = f"sqlite:///{os.path.join(tmp, 'dotacion_http.db')}"
+        proc = _levantar(url, args.puerto, {"METRICAS_HABILITADAS": "false"})
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{args.puerto}", timeout=60) as c:
+                _sembrar(c, args.equipo)
+                _imprimir(f"HTTP (uvicorn, localhost), equipo de {args.equipo}",
+                          _medir(c, args.equipo, args.rondas), False)
+        finally:
+            proc.terminate()
+            proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
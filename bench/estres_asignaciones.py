@@ -0,0 +1,105 @@
+"""
+Prueba de estrés de las reglas de asignación bajo concurrencia: muchos hilos
+asignan y desasignan al azar sobre pocos empleados y proyectos (máxima
+contención) y al final se verifica que ningún empleado supere
+MAX_PROYECTOS_POR_EMPLEADO, que no haya duplicados ni gerentes asignados a su
+propio proyecto y que num_proyectos y num_empleados coincidan con las filas
+reales.
+
+Uso: python -m bench.estres_asignaciones [--hilos 32] [--operaciones 200]
+Termina con código 1 si algún invariante no se cumple.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--hilos", type=int, default=32)
+    p.add_argument("--operaciones", type=int, default=200, help="operaciones por hilo")
+    p.add_argument("--empleados", type=int, default=5)
+    p.add_argument("--proyectos", type=int, default=12)
+    args = p.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'estres.db')}")
+    from fastapi import HTTPException
+    from sqlalchemy import select
+    from app import crud, models, schemas
+    from app.database import motores
+    from app.migraciones import migrar
+
+    engine, SessionLocal = motores().engine, motores().SessionLocal
+
+    with engine.begin() as conn:
+        migrar(conn)
+    with SessionLocal() as db:
+        crud.crear_empleados_lote(db, [(i, schemas.EmpleadoCrear(cc=f"{50_000 + i}", nombre=f"Empleado {i}"))
+                                       for i in range(args.empleados)])
+        crud.crear_proyectos_lote(db, [(i, schemas.ProyectoCrear(nombre=f"Proyecto {i}", gerente_id=1 if i == 0 else None))
+                                       for i in range(args.proyectos)])
+
+    resultados = Counter()
+    barrera = threading.Barrier(args.hilos)
+
+    def trabajador(semilla: int):
+        rnd = random.Random(semilla)
+        barrera.wait()
+        for _ in range(args.operaciones):
+            datos = schemas.AsignacionCrear(empleado_id=rnd.randint(1, args.empleados),
+                                            proyecto_id=rnd.randint(1, args.proyectos))
+            with SessionLocal() as db:
+                try:
+                    if rnd.random() < 0.7:
+                        crud.asignar_empleado(db, datos)
+                        db.commit()
+                        resultados["asignadas"] += 1
+                    else:
+                        crud.desasignar_empleado(db, datos)
+                        db.commit()
+                        resultados["desasignadas"] += 1
+                except HTTPException as e:
+                    resultados[f"http_{e.status_code}"] += 1
+                except Exception as e:  # p. ej. "database is locked" al agotar busy_timeout
+                    resultados[type(e).__name__] += 1
+
+    hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(args.hilos)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    fallos = []
+    with SessionLocal() as db:
+        filas = db.execute(select(models.Asignacion.empleado_id, models.Asignacion.proyecto_id)).all()
+        gerentes = dict(db.execute(select(models.Proyecto.id, models.Proyecto.gerente_id)).all())
+        contadores = dict(db.execute(select(models.Empleado.id, models.Empleado.num_proyectos)).all())
+        dotaciones = dict(db.execute(select(models.Proyecto.id, models.Proyecto.num_empleados)).all())
+    por_empleado = Counter(e for e, _ in filas)
+    por_proyecto = Counter(p for _, p in filas)
+    if len(set(filas)) != len(filas):
+        fallos.append("asignaciones duplicadas")
+    for e, n in por_empleado.items():
+        if n > crud.MAX_PROYECTOS_POR_EMPLEADO:
+            fallos.append(f"empleado {e} tiene {n} proyectos")
+    for e, n in contadores.items():
+        if n != por_empleado.get(e, 0):
+            fallos.append(f"empleado {e}: num_proyectos={n} pero tiene {por_empleado.get(e, 0)} filas")
+    for p, n in dotaciones.items():
+        if n != por_proyecto.get(p, 0):
+            fallos.append(f"proyecto {p}: num_empleados={n} pero tiene {por_proyecto.get(p, 0)} filas")
+    fallos += [f"gerente {e} asignado a su proyecto {p}" for e, p in filas if gerentes.get(p) == e]
+
+    print(dict(resultados))
+    print("invariantes:", "OK" if not fallos else "FALLAN")
+    for f in fallos:
+        print("  ", f)
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Exportación completa por GET /exportar/{tabla} frente a recorrer el listado
+JSON paginado (GET /empleados?limit=1000&after=...), que es como se
+exportaba antes. Siembra una base con bench.datos (con --empleados 500000
+las asignaciones y la dotación pasan el millón de filas), levanta uvicorn y
+descarga cada tabla en cada formato a disco. Reporta filas/s, MB/s y el
+pico de memoria residente del servidor durante la descarga, por encima de
+la que tenía antes de empezarla (muestreando /proc, sólo Linux).
+
+Uso: python -m bench.exportar [--empleados 500000] [--formatos csv,parquet,arrow]
+     [--url sqlite:///base_ya_sembrada.db]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for linea in f:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+class _Pico:
+    """Muestrea la memoria residente de `pid` cada 10 ms mientras está activo."""
+    def __init__(self, pid: int):
+        self.pid, self.pico = pid, 0.0
+        self._parar = threading.Event()
+
+    def __enter__(self):
+        self.base = self.pico = _rss_mb(self.pid)
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+        return self
+
+    def _muestrear(self):
+        while not self._parar.wait(0.01):
+            self.pico = max(self.pico, _rss_mb(self.pid))
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+
+
+def _descargar(c, ruta: str, params: dict, destino: str) -> int:
+    with c.stream("GET", ruta, params=params) as r, open(destino, "wb") as f:
+        r.raise_for_status()
+        for parte in r.iter_bytes():
+            f.write(parte)
+    return os.path.getsize(destino)
+
+
+def _paginar_json(c, destino: str) -> int:
+    """Exportación previa: todas las páginas de /empleados, escritas como JSON por página."""
+    after = None
+    with open(destino, "wb") as f:
+        while True:
+            r = c.get("/empleados", params={"limit": 1000, **({"after": after} if after else {})})
+            r.raise_for_status()
+            f.write(r.content + b"\n")
+            after = r.headers.get("X-Siguiente-Cursor")
+            if not after:
+                break
+    return os.path.getsize(destino)
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--empleados", type=int, default=500_000)
+    p.add_argument("--formatos", default="csv,parquet,arrow")
+    p.add_argument("--url", help="base ya sembrada con bench.datos (no se vuelve a generar)")
+    p.add_argument("--puerto", type=int, default=8766)
+    args = p.parse_args()
+
+    import httpx
+    from sqlalchemy import create_engine, func, select
+    from app import exportar, models
+    from bench.carga_async import _levantar
+    from bench.datos import preparar
+
+    tmp = tempfile.mkdtemp()
+    url = args.url or f"sqlite:///{os.path.join(tmp, 'exportar.db')}"
+    if not args.url:
+        t0 = time.perf_counter()
+        preparar(url, empleados=args.empleados)
+        print(f"base generada en {time.perf_counter() - t0:.0f} s")
+    motor = create_engine(url)
+    with motor.connect() as conn:
+        conteos = {t: conn.scalar(select(func.count()).select_from(m)) for t, m in
+                   (("empleados", models.Empleado), ("proyectos", models.Proyecto),
+                    ("asignaciones", models.Asignacion))}
+    motor.dispose()
+    conteos["dotacion"] = conteos["asignaciones"]
+    print(f"filas: {conteos}")
+
+    casos = [("json paginado", "empleados", _paginar_json)]
+    for formato in args.formatos.split(","):
+        for tabla in exportar.TABLAS:
+            casos.append((formato, tabla, lambda c, d, t=tabla, f=formato:
+                          _descargar(c, f"/exportar/{t}", {"formato": f}, d)))
+
+    proc = _levantar(url, args.puerto, {"METRICAS_HABILITADAS": "false"})
+    try:
+        print(f"\n{'formato':<14} {'tabla':<13} {'filas':>9} {'s':>7} {'filas/s':>10} {'MB':>7} {'MB/s':>7} "
+              f"{'+RSS MB':>8}")
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.puerto}", timeout=None) as c:
+            for formato, tabla, fn in casos:
+                destino = os.path.join(tmp, f"{tabla}.{formato.replace(' ', '_')}")
+                with _Pico(proc.pid) as memoria:
+                    t0 = time.perf_counter()
+                    tamano = fn(c, destino)
+                    segundos = time.perf_counter() - t0
+                filas = conteos[tabla]
+                print(f"{formato:<14} {tabla:<13} {filas:9} {segundos:7.2f} {filas / segundos:10,.0f} "
+                      f"{tamano / 1e6:7.1f} {tamano / 1e6 / segundos:7.1f} {memoria.pico - memoria.base:8.1f}")
+                os.remove(destino)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Costo del historial de asignaciones: genera una base con bench.datos y mide
+las lecturas actuales (GET de empleados de un proyecto y proyectos de un
+empleado), las consultas en un instante (?en=) y las escrituras que abren y
+cierran intervalos (POST/DELETE /asignaciones, gerente), primero con el
+historial recién abierto y después de agregarle --cerrados intervalos
+cerrados anteriores. Las lecturas actuales no tocan el historial y las
+escrituras cierran por el índice parcial de vigentes: ninguna debería
+crecer con él.
+
+Uso: python -m bench.historial [--empleados 20000] [--cerrados 1000000] [--muestras 300]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+INICIO = datetime(2015, 1, 1)
+
+
+def _cerrar_anteriores(url: str, cerrados: int, empleados: int, proyectos: int, lote: int = 50_000):
+    """Intervalos cerrados entre INICIO y DESDE_HISTORIAL de asignaciones ya dadas de baja."""
+    from sqlalchemy import create_engine, insert
+    from app import models
+    from bench.datos import DESDE_HISTORIAL, _en_lotes
+
+    rnd = random.Random(1)
+    rango = (DESDE_HISTORIAL - INICIO).total_seconds()
+
+    def intervalo():
+        desde = INICIO + timedelta(seconds=rnd.uniform(0, rango))
+        return desde, min(DESDE_HISTORIAL, desde + timedelta(days=rnd.uniform(1, 400)))
+
+    def asignaciones():
+        for i in range(cerrados):
+            desde, hasta = intervalo()
+            yield {"asignacion_id": 10_000_000 + i, "empleado_id": rnd.randint(1, empleados),
+                   "proyecto_id": rnd.randint(1, proyectos), "desde": desde, "hasta": hasta}
+
+    def gerentes():
+        for _ in range(cerrados // 20):
+            desde, hasta = intervalo()
+            yield {"proyecto_id": rnd.randint(1, proyectos), "empleado_id": rnd.randint(1, empleados),
+                   "desde": desde, "hasta": hasta}
+
+    motor = create_engine(url)
+    try:
+        with motor.begin() as conn:
+            for modelo, filas in ((models.HistorialAsignacion, asignaciones()), (models.HistorialGerente, gerentes())):
+                for trozo in _en_lotes(filas, lote):
+                    conn.execute(insert(modelo), trozo)
+            conn.exec_driver_sql("ANALYZE")
+    finally:
+        motor.dispose()
+
+
+def _medir(c, empleados: int, proyectos: int, muestras: int, etapa: int) -> dict:
+    """Mediana y p95 (ms) de cada operación."""
+    from bench.datos import DESDE_HISTORIAL
+    rnd = random.Random(2)
+    rango = (DESDE_HISTORIAL - INICIO).total_seconds()
+
+    def instante():
+        return (INICIO + timedelta(seconds=rnd.uniform(0, rango))).isoformat()
+
+    # Empleados nuevos sin asignaciones, para asignar y desasignar sin chocar con el máximo
+    libres = [c.post("/empleados", json={"cc": f"{90_000_000 + etapa * muestras + i}",
+                                         "nombre": f"Libre {i}"}).json()["id"] for i in range(muestras)]
+    operaciones = {
+        "GET empleados de proyecto": lambda i: c.get(f"/proyectos/{rnd.randint(1, proyectos)}/empleados"),
+        "GET proyectos de empleado": lambda i: c.get(f"/empleados/{rnd.randint(1, empleados)}/proyectos"),
+        "GET empleados de proyecto ?en=": lambda i: c.get(f"/proyectos/{rnd.randint(1, proyectos)}/empleados",
+                                                         params={"en": instante()}),
+        "GET proyectos de empleado ?en=": lambda i: c.get(f"/empleados/{rnd.randint(1, empleados)}/proyectos",
+                                                         params={"en": instante()}),
+        "POST /asignaciones": lambda i: c.post("/asignaciones", json={"empleado_id": libres[i],
+                                                                     "proyecto_id": 1 + i % proyectos}),
+        "DELETE /asignaciones": lambda i: c.request("DELETE", "/asignaciones",
+                                                    json={"empleado_id": libres[i], "proyecto_id": 1 + i % proyectos}),
+        "POST gerente": lambda i: c.post(f"/proyectos/{1 + i % proyectos}/gerente/{libres[i]}"),
+        "DELETE gerente": lambda i: c.delete(f"/proyectos/{1 + i % proyectos}/gerente"),
+    }
+    tiempos = {nombre: [] for nombre in operaciones}
+    for i in range(muestras):
+        for nombre, fn in operaciones.items():
+            t0 = time.perf_counter()
+            fn(i).raise_for_status()
+            tiempos[nombre].append((time.perf_counter() - t0) * 1000)
+    return {n: (statistics.median(t), statistics.quantiles(t, n=20)[-1]) for n, t in tiempos.items()}
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--empleados", type=int, default=20_000)
+    p.add_argument("--cerrados", type=int, default=1_000_000)
+    p.add_argument("--muestras", type=int, default=300)
+    args = p.parse_args()
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'historial.db')}"
+    os.environ["DATABASE_URL"] = url
+    os.environ["CACHE_HABILITADA"] = "false"
+    os.environ["METRICAS_HABILITADAS"] = "false"
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from bench.datos import preparar
+
+    conteos = preparar(url, empleados=args.empleados)
+    proyectos = conteos["proyectos"]
+    print(f"base: {conteos}")
+
+    resultados = {}
+    for n, etapa in enumerate(("historial vigente", f"+{args.cerrados:,} cerrados")):
+        if n:
+            t0 = time.perf_counter()
+            _cerrar_anteriores(url, args.cerrados, args.empleados, proyectos)
+            print(f"{args.cerrados:,} intervalos cerrados en {time.perf_counter() - t0:.1f} s")
+        with TestClient(app) as c:
+            resultados[etapa] = _medir(c, args.empleados, proyectos, args.muestras, n)
+
+    etapas = list(resultados)
+    print(f"\n{'operación (ms)':<32}" + "".join(f"{e + ' p50':>26}{'p95':>8}" for e in etapas))
+    for nombre in resultados[etapas[0]]:
+        print(f"{nombre:<32}" + "".join(f"{resultados[e][nombre][0]:26.2f}{resultados[e][nombre][1]:8.2f}"
+                                        for e in etapas))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Verifica con EXPLAIN QUERY PLAN que cada consulta de crud usa un índice.
+Crea una base SQLite sintética con las migraciones, ejecuta las funciones
+de crud capturando el SQL que emiten y falla (código 1) si algún plan
+recorre una tabla completa ("SCAN tabla" sin índice). Los reportes
+agregan toda la tabla por diseño y se listan en AGREGADOS.
+
+Uso: python -m bench.indices_consultas [--empleados 20000]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+
+# Funciones cuyo recorrido completo es inherente (agregados sobre toda la
+# tabla; la compactación periódica recorre el registro de cambios)
+AGREGADOS = {"reporte dotacion", "reporte capacidad", "reporte presupuesto", "reporte gerentes", "compactar cambios"}
+
+# Una subconsulta materializada (anon_N) es un resultado acotado, no una tabla
+_SCAN_SIN_INDICE = re.compile(r"^SCAN (?!anon_\d)(\w+)(?: AS \w+)?$")
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--empleados", type=int, default=20_000)
+    p.add_argument("--proyectos", type=int, default=1_000)
+    args = p.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'indices.db')}"
+    os.environ["CACHE_HABILITADA"] = "false"
+    os.environ["METRICAS_HABILITADAS"] = "false"
+    from sqlalchemy import event, insert
+    from app import cambios, crud, models, schemas
+    from app.database import motores
+    from app.migraciones import abrir_historial, migrar
+
+    engine, SessionLocal = motores().engine, motores().SessionLocal
+
+    n_emp, n_pr = args.empleados, args.proyectos
+    with engine.begin() as conn:
+        migrar(conn)
+        conn.execute(insert(models.Empleado), [
+            {"id": i, "cc": str(10_000_000 + i), "nombre": f"Empleado {i}",
+             "estado": models.EstadoEmpleado.activo if i % 7 else models.EstadoEmpleado.inactivo,
+             "num_proyectos": 2 if i % 5 < 2 else 0}
+            for i in range(1, n_emp + 1)
+        ])
+        conn.execute(insert(models.Proyecto), [
+            {"id": i, "nombre": f"Proyecto {i}", "presupuesto": (i * 37) % 1000 * 1000,
+             "estado": list(models.EstadoProyecto)[i % 5], "gerente_id": i if i % 3 == 0 else None}
+            for i in range(1, n_pr + 1)
+        ])
+        conn.execute(insert(models.Asignacion), [
+            {"empleado_id": e, "proyecto_id": (e * 7 + k) % n_pr + 1}
+            for e in range(1, n_emp + 1) if e % 5 < 2 for k in range(2)
+        ])
+        abrir_historial(conn, datetime(2020, 1, 1))
+        conn.exec_driver_sql("ANALYZE")
+
+    cursor = crud.codificar_cursor(10)
+    libre = 3  # i % 5 >= 2: sin asignaciones
+    casos = [
+        ("listar_empleados", lambda db: crud.listar_empleados(db, after=cursor)),
+        ("listar_empleados estado", lambda db: crud.listar_empleados(db, estado_empleado="inactivo", after=cursor)),
+        ("listar_proyectos estado", lambda db: crud.listar_proyectos(db, estado="en_curso", after=cursor)),
+        ("listar_proyectos presupuesto", lambda db: crud.listar_proyectos(db, presupuesto_min=10_000, presupuesto_max=20_000)),
+        ("listar_empleados especialidad", lambda db: crud.listar_empleados(db, especialidad="dev", after=cursor)),
+        ("buscar_empleados", lambda db: crud.buscar_empleados(db, "empleado 12")),
+        ("buscar_empleados estado", lambda db: crud.buscar_empleados(db, "empleado", estado_empleado="activo")),
+        ("buscar_proyectos", lambda db: crud.buscar_proyectos(db, "proyecto 5")),
+        ("obtener_empleado", lambda db: crud.obtener_empleado(db, 5)),
+        ("obtener_proyecto", lambda db: crud.obtener_proyecto(db, 5)),
+        ("detalle_proyecto", lambda db: crud.detalle_proyecto(db, 3)),
+        ("empleados_de_proyecto", lambda db: crud.empleados_de_proyecto(db, 3)),
+        ("proyectos_de_empleado", lambda db: crud.proyectos_de_empleado(db, 1)),
+        ("proyectos_de_empleado_en", lambda db: crud.proyectos_de_empleado_en(db, 1, datetime(2021, 1, 1))),
+        ("empleados_de_proyecto_en", lambda db: crud.empleados_de_proyecto_en(db, 3, datetime(2021, 1, 1))),
+        ("empleados_sin_proyecto", lambda db: crud.empleados_sin_proyecto(db, "activo", after=cursor)),
+        ("empleados_con_proyecto", lambda db: crud.empleados_con_proyecto(db, "activo", after=cursor)),
+        ("claves empleados", lambda db: crud._claves_empleados(db, [1, 2, 3])),
+        ("claves proyectos", lambda db: crud._claves_proyectos(db, [1, 2, 3])),
+        ("asignar_empleado", lambda db: crud.asignar_empleado(db, schemas.AsignacionCrear(empleado_id=libre, proyecto_id=1))),
+        ("desasignar_empleado", lambda db: crud.desasignar_empleado(db, schemas.AsignacionCrear(empleado_id=libre, proyecto_id=1))),
+        ("fijar_gerente", lambda db: crud.fijar_gerente(db, 2, 1)),
+        ("quitar_gerente", lambda db: crud.quitar_gerente(db, 3)),
+        ("eliminar_proyecto", lambda db: crud.eliminar_proyecto(db, n_pr)),
+        ("crear_empleado", lambda db: crud.crear_empleado(db, schemas.EmpleadoCrear(cc="99999999999", nombre="Nuevo"))),
+        ("listar_cambios", lambda db: crud.listar_cambios(db, 1)),
+        ("ultimo_cambio", lambda db: crud.ultimo_cambio(db)),
+        ("compactar cambios", lambda db: cambios.compactar(db, 0, 0)),
+        *((f"reporte {r}", lambda db, r=r: crud.reporte(db, r)) for r in ("dotacion", "capacidad", "presupuesto", "gerentes")),
+    ]
+
+    fallas = 0
+    for nombre, fn in casos:
+        capturadas: list[tuple[str, object]] = []
+
+        def _capturar(conn, cur, statement, parameters, context, executemany):
+            capturadas.append((statement, parameters[0] if executemany else parameters))
+
+        event.listen(engine, "before_cursor_execute", _capturar)
+        try:
+            with SessionLocal() as db:
+                fn(db)
+                db.commit()
+        finally:
+            event.remove(engine, "before_cursor_execute", _capturar)
+
+        problemas, lineas = [], []
+        with engine.connect() as conn:
+            for sql, params in capturadas:
+                if not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+                    continue
+                plan = [fila[-1] for fila in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all()]
+                lineas.extend(plan)
+                problemas.extend(paso for paso in plan if _SCAN_SIN_INDICE.match(paso))
+        permitido = nombre in AGREGADOS
+        estado = "ok" if not problemas else ("agregado" if permitido else "FALLA")
+        fallas += estado == "FALLA"
+        print(f"{nombre:<30} {estado}")
+        for paso in lineas:
+            print("    ", paso)
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Benchmark de /empleados/_sin_proyecto y /_con_proyecto sobre una base SQLite
+sintética (por defecto 500k empleados, 40% con asignaciones): muestra el plan
+de consulta (EXPLAIN QUERY PLAN) de NOT EXISTS / EXISTS y compara tiempos de
+una página con la forma anterior NOT IN (SELECT DISTINCT ...) sin paginar.
+
+Uso: python -m bench.membresia_empleados [--empleados 500000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--empleados", type=int, default=500_000)
+    p.add_argument("--proyectos", type=int, default=2_000)
+    args = p.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'membresia.db')}"
+    from sqlalchemy import insert, select, text
+    from app import crud, models
+    from app.database import motores
+    from app.migraciones import migrar
+
+    engine, SessionLocal = motores().engine, motores().SessionLocal
+
+    with engine.begin() as conn:
+        migrar(conn)
+        conn.execute(insert(models.Empleado), [
+            {"id": i, "cc": str(10_000_000 + i), "nombre": f"Empleado {i}",
+             "estado": models.EstadoEmpleado.activo if i % 7 else models.EstadoEmpleado.inactivo,
+             "num_proyectos": 2 if i % 5 < 2 else 0}
+            for i in range(1, args.empleados + 1)
+        ])
+        conn.execute(insert(models.Proyecto), [{"id": i, "nombre": f"Proyecto {i}"} for i in range(1, args.proyectos + 1)])
+        conn.execute(insert(models.Asignacion), [
+            {"empleado_id": e, "proyecto_id": (e * 7 + k) % args.proyectos + 1}
+            for e in range(1, args.empleados + 1) if e % 5 < 2 for k in range(2)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+
+    def plan(db, query):
+        sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+        return [fila[-1] for fila in db.execute(text("EXPLAIN QUERY PLAN " + sql)).all()]
+
+    def medir(fn, repeticiones=5):
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            fn()
+        return (time.perf_counter() - t0) / repeticiones * 1000
+
+    with SessionLocal() as db:
+        for nombre, con in (("_sin_proyecto", False), ("_con_proyecto", True)):
+            for estado in (None, models.EstadoEmpleado.inactivo):
+                query = crud._consulta_membresia(con, estado).order_by(models.Empleado.id).limit(101)
+                print(f"\n{nombre} estado={estado.value if estado else '-'}")
+                for paso in plan(db, query):
+                    print("   plan:", paso)
+                fn = crud.empleados_con_proyecto if con else crud.empleados_sin_proyecto
+                _, cursor = fn(db, estado, 100)
+                print(f"   primera página: {medir(lambda: fn(db, estado, 100)):8.2f} ms")
+                print(f"   página siguiente: {medir(lambda: fn(db, estado, 100, cursor)):8.2f} ms")
+
+        anterior = select(models.Empleado).where(
+            models.Empleado.id.not_in(select(models.Asignacion.empleado_id).distinct())
+        ).order_by(models.Empleado.id)
+        print(f"\nNOT IN sin paginar (forma anterior): {medir(lambda: db.scalars(anterior).all(), 1):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
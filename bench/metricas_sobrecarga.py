@@ -0,0 +1,125 @@
+"""
+Sobrecarga de la instrumentación (app/metricas.py): mide el tiempo por
+petición con METRICAS_HABILITADAS=true y =false en procesos separados sobre
+la misma base, con la caché desactivada para que cada petición consulte la
+base y pase por los hooks del motor. Alterna las corridas y reporta medianas.
+Como el ruido del TestClient es del orden de la sobrecarga, mide además el
+costo directo: el middleware sobre una app ASGI vacía y los hooks del motor
+sobre `SELECT 1` en SQLite en memoria.
+
+Uso: python -m bench.metricas_sobrecarga [--peticiones 2000] [--rondas 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RUTAS = ["/", "/empleados/2", "/empleados?limit=100", "/proyectos/1/detalle"]
+
+_SEMBRAR = """
+from fastapi.testclient import TestClient
+from app.main import app
+with TestClient(app) as c:
+    c.post("/empleados/_lote", json=[{"cc": f"{10_000 + i}", "nombre": f"Empleado {i}"} for i in range(200)])
+    c.post("/proyectos/_lote", json=[{"nombre": f"Proyecto {i}", "gerente_id": 1} for i in range(5)])
+    c.post("/asignaciones/_lote", json=[{"empleado_id": e, "proyecto_id": 1} for e in range(2, 40)])
+"""
+
+_MEDIR = """
+import json, sys, time
+from fastapi.testclient import TestClient
+from app.main import app
+n = int(sys.argv[1])
+rutas = json.loads(sys.argv[2])
+resultado = {}
+with TestClient(app) as c:
+    for ruta in rutas:
+        for _ in range(100):
+            c.get(ruta)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            c.get(ruta)
+        resultado[ruta] = (time.perf_counter() - t0) / n * 1e6
+print(json.dumps(resultado))
+"""
+
+
+def _correr(codigo: str, entorno: dict, *argumentos: str) -> dict | None:
+    salida = subprocess.run([sys.executable, "-c", codigo, *argumentos], env=entorno, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    return json.loads(salida.splitlines()[-1]) if salida else None
+
+
+def _costo_directo(n: int) -> None:
+    import asyncio
+    import time
+    from sqlalchemy import create_engine, text
+    from app import database, metricas
+
+    async def vacia(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def nada(mensaje):
+        pass
+
+    async def recorrer(app):
+        scope = {"type": "http", "method": "GET", "path": "/"}
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await app(scope, None, nada)
+        return (time.perf_counter() - t0) / n * 1e6
+
+    database.obtener_settings.cache_clear()
+    os.environ["METRICAS_HABILITADAS"] = "true"
+    s = database.obtener_settings()
+    sin, con = asyncio.run(recorrer(vacia)), asyncio.run(recorrer(metricas.MiddlewareMetricas(vacia)))
+    print(f"middleware (app vacía):  {sin:6.2f} -> {con:6.2f} µs  (+{con - sin:.2f} µs/petición)")
+
+    def consultas(motor):
+        with motor.connect() as conn:
+            sentencia = text("SELECT 1")
+            t0 = time.perf_counter()
+            for _ in range(n):
+                conn.execute(sentencia)
+            return (time.perf_counter() - t0) / n * 1e6
+
+    sin = consultas(create_engine("sqlite://"))
+    motor = create_engine("sqlite://")
+    database.instalar_perfilado(motor, s)
+    con = consultas(motor)
+    print(f"hooks (SELECT 1):        {sin:6.2f} -> {con:6.2f} µs  (+{con - sin:.2f} µs/consulta)")
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--peticiones", type=int, default=2000, help="peticiones por ruta y corrida")
+    p.add_argument("--rondas", type=int, default=3)
+    args = p.parse_args()
+
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'metricas.db')}"
+    base = {**os.environ, "DATABASE_URL": url, "CACHE_HABILITADA": "false",
+            "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))}
+    _correr(_SEMBRAR, base)
+
+    tiempos = {"false": [], "true": []}
+    for _ in range(args.rondas):
+        for habilitadas in tiempos:
+            entorno = {**base, "METRICAS_HABILITADAS": habilitadas}
+            tiempos[habilitadas].append(_correr(_MEDIR, entorno, str(args.peticiones), json.dumps(RUTAS)))
+
+    print(f"{'ruta':<24} {'sin métricas':>13} {'con métricas':>13} {'Δ µs':>7} {'Δ %':>6}   (µs/petición, mediana)")
+    for ruta in RUTAS:
+        sin = statistics.median(r[ruta] for r in tiempos["false"])
+        con = statistics.median(r[ruta] for r in tiempos["true"])
+        print(f"{ruta:<24} {sin:13.0f} {con:13.0f} {con - sin:7.1f} {(con - sin) / sin * 100:6.1f}")
+    print()
+    _costo_directo(args.peticiones * 20)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
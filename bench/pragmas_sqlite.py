@@ -0,0 +1,28 @@
+"""
+Benchmark de los PRAGMAs de SQLite (WAL, synchronous=NORMAL, busy_timeout,
+cache_size, mmap_size, foreign_keys): mide la misma mezcla de lecturas y
+escrituras con SQLITE_PRAGMAS=false (journal rollback, sync FULL) y con la
+configuración por defecto, en ambos modos (sync y async).
+
+Uso: python -m bench.pragmas_sqlite [--escrituras 0.3]
+"""
+import asyncio
+
+from .carga_async import MODOS, medir, argumentos
+
+PERFILES = {"sin pragmas": {"SQLITE_PRAGMAS": "false"}, "con pragmas": {"SQLITE_PRAGMAS": "true"}}
+
+
+def main():
+    p = argumentos(__doc__.strip().splitlines()[0])
+    p.set_defaults(escrituras=0.3)
+    args = p.parse_args()
+    for modo in MODOS:
+        for perfil, entorno in PERFILES.items():
+            r = asyncio.run(medir(modo, args, entorno))
+            print(f"{modo:>5} {perfil:<12}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f} ms  "
+                  f"p95 {r['p95_ms']:7.1f} ms  errores {r['errores']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Verifica el número de sentencias SQL por endpoint contra un presupuesto fijo.
+Termina con código 1 si algún endpoint lo excede (apto para CI).
+
+Uso: python -m bench.presupuesto_consultas
+"""
+import os
+import sys
+import tempfile
+
+# (método, ruta, cuerpo, presupuesto de sentencias SQL). Las escrituras incluyen
+# el INSERT en el registro de cambios (app/cambios.py) y las de asignaciones y
+# gerentes, la apertura o el cierre de sus intervalos en el historial.
+PRESUPUESTOS = [
+    ("GET", "/empleados", None, 1),
+    ("GET", "/empleados/2", None, 1),
+    ("GET", "/empleados/2/proyectos", None, 1),
+    ("GET", "/proyectos", None, 1),
+    ("GET", "/proyectos/1", None, 1),
+    ("GET", "/proyectos/1/empleados", None, 1),
+    ("GET", "/proyectos/1/detalle", None, 1),
+    ("POST", "/empleados", {"cc": "99999", "nombre": "Nuevo"}, 3),
+    ("PATCH", "/empleados/3", {"cargo": "dev"}, 4),
+    ("POST", "/asignaciones", {"empleado_id": 8, "proyecto_id": 1}, 5),
+    ("DELETE", "/asignaciones", {"empleado_id": 8, "proyecto_id": 1}, 5),
+    ("POST", "/asignaciones/_dotacion", {"quitar": [{"empleado_id": e, "proyecto_id": 1} for e in (2, 3)],
+                                         "agregar": [{"empleado_id": e, "proyecto_id": 3} for e in (2, 3)]}, 10),
+    ("POST", "/proyectos/2/gerente/4", None, 11),
+]
+
+# Lecturas repetidas con If-None-Match del ETag recibido: 304 con a lo sumo
+# la consulta de versión (0 si la entrada está en caché)
+PRESUPUESTO_304 = 1
+
+# Borrar y volver a crear: el registro nuevo no puede heredar el ETag del
+# borrado (id nuevo gracias a AUTOINCREMENT), ni con If-None-Match ni con If-Match
+RECREAR = [
+    ("/empleados", lambda i: {"cc": f"{88_000 + i}", "nombre": f"Recreado {i}"}),
+    ("/proyectos", lambda i: {"nombre": f"Recreado {i}"}),
+]
+
+# Escrituras que versionan a otras entidades (empleados y proyectos de las
+# asignaciones que cambian): la ficha en caché debe servir el ETag nuevo, o el
+# If-Match siguiente daría 412. Los reportes en caché deben coincidir con los
+# recalculados.
+REPORTES = ("dotacion", "capacidad", "presupuesto", "gerentes")
+VERSIONAN = [
+    ("POST", "/asignaciones", {"empleado_id": 9, "proyecto_id": 3}, ["/empleados/9", "/proyectos/3"]),
+    ("DELETE", "/asignaciones", {"empleado_id": 9, "proyecto_id": 3}, ["/empleados/9", "/proyectos/3"]),
+    ("POST", "/proyectos/1/gerente/5", None, ["/empleados/5"]),
+    ("DELETE", "/empleados/6", None, ["/proyectos/1", "/proyectos/2"]),
+    ("DELETE", "/proyectos/3", None, ["/empleados/2"]),
+]
+
+
+def _sembrar(c):
+    c.post("/empleados/_lote", json=[{"cc": f"{10_000 + i}", "nombre": f"Empleado {i}"} for i in range(10)])
+    c.post("/proyectos/_lote", json=[{"nombre": f"Proyecto {i}", "gerente_id": 1} for i in range(3)])
+    c.post("/asignaciones/_lote", json=[{"empleado_id": e, "proyecto_id": p} for e in range(2, 8) for p in (1, 2)])
+
+
+def main() -> int:
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'presupuesto.db')}"
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app import cache
+    from app.database import contar_consultas
+
+    excedidos = 0
+    with TestClient(app) as c:
+        _sembrar(c)
+        for metodo, ruta, cuerpo, presupuesto in PRESUPUESTOS:
+            with contar_consultas() as sentencias:
+                r = c.request(metodo, ruta, json=cuerpo)
+            estado = "ok" if len(sentencias) <= presupuesto else "EXCEDIDO"
+            excedidos += estado != "ok"
+            print(f"{metodo:<6} {ruta:<28} {r.status_code}  {len(sentencias):>2}/{presupuesto:<2} {estado}")
+            if estado != "ok":
+                for s in sentencias:
+                    print("        ", " ".join(s.split())[:150])
+        for metodo, ruta, _, _ in PRESUPUESTOS:
+            if metodo != "GET":
+                continue
+            etag = c.get(ruta).headers["ETag"]
+            with contar_consultas() as sentencias:
+                r = c.get(ruta, headers={"If-None-Match": etag})
+            estado = "ok" if r.status_code == 304 and len(sentencias) <= PRESUPUESTO_304 else "EXCEDIDO"
+            excedidos += estado != "ok"
+            print(f"{'GET':<6} {ruta + ' (304)':<28} {r.status_code}  {len(sentencias):>2}/{PRESUPUESTO_304:<2} {estado}")
+        for base, cuerpo in RECREAR:
+            ruta = f"{base}/{c.post(base, json=cuerpo(0)).json()['id']}"
+            etag = c.get(ruta).headers["ETag"]
+            c.delete(ruta)
+            nuevo = f"{base}/{c.post(base, json=cuerpo(1)).json()['id']}"
+            leido = c.get(nuevo, headers={"If-None-Match": etag}).status_code
+            escrito = c.delete(nuevo, headers={"If-Match": etag}).status_code
+            estado = "ok" if nuevo != ruta and leido == 200 and escrito == 412 else "REUTILIZADO"
+            excedidos += estado != "ok"
+            print(f"{'DELETE':<6} {ruta + ' y POST':<28} {leido} {escrito}  {nuevo:<12} {estado}")
+        for metodo, ruta, cuerpo, fichas in VERSIONAN:
+            for ficha in [*fichas, *(f"/reportes/{r}" for r in REPORTES)]:
+                c.get(ficha)
+            c.request(metodo, ruta, json=cuerpo).raise_for_status()
+            servidos = {r: c.get(f"/reportes/{r}").content for r in REPORTES}
+            cache.backend().limpiar()
+            viejos = [r for r in REPORTES if c.get(f"/reportes/{r}").content != servidos[r]]
+            estado = "ok" if not viejos else f"REPORTE VIEJO: {', '.join(viejos)}"
+            excedidos += estado != "ok"
+            print(f"{metodo:<6} {ruta:<28} {'/reportes/*':<14} {'':<10} {'':<3} {estado}")
+            for ficha in fichas:
+                etag = c.get(ficha).headers["ETag"]
+                cambio = {"cargo": "dev"} if ficha.startswith("/empleados") else {"descripcion": "otra"}
+                escrito = c.patch(ficha, json=cambio, headers={"If-Match": etag}).status_code
+                estado = "ok" if escrito == 200 else "ETAG VIEJO"
+                excedidos += estado != "ok"
+                print(f"{metodo:<6} {ruta:<28} {ficha:<14} {etag:<10} {escrito} {estado}")
+    return 1 if excedidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Réplicas de lectura con SQLite: el primario y dos archivos réplica que un
+hilo actualiza copiando el primario (API de backup de sqlite3) cada
+--retraso segundos, como una replicación asíncrona. Mide dónde caen las
+lecturas y cuántas ven un estado anterior a la escritura que el mismo
+cliente acaba de confirmar, sin y con el token X-Consistencia. Con
+--solo-lectura la única réplica es el archivo del primario abierto en sólo
+lectura (sin retraso).
+
+Uso: python -m bench.replicas [--rondas 200] [--retraso 0.2] [--solo-lectura]
+"""
+import argparse
+import collections
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+
+def _copiar(origen: str, destinos: list[str]):
+    fuente = sqlite3.connect(origen)
+    try:
+        for destino in destinos:
+            copia = sqlite3.connect(destino)
+            try:
+                fuente.backup(copia)
+            finally:
+                copia.close()
+    finally:
+        fuente.close()
+
+
+def _replicar(origen: str, destinos: list[str], retraso: float, parar: threading.Event):
+    while not parar.wait(retraso):
+        _copiar(origen, destinos)
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--rondas", type=int, default=200)
+    p.add_argument("--retraso", type=float, default=0.2)
+    p.add_argument("--solo-lectura", action="store_true")
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    primario = os.path.join(tmp, "primario.db")
+    replicas = [] if args.solo_lectura else [os.path.join(tmp, f"replica{i}.db") for i in (1, 2)]
+    os.environ["DATABASE_URL"] = f"sqlite:///{primario}"
+    os.environ["DATABASE_REPLICAS"] = (f"sqlite:///file:{primario}?mode=ro&uri=true" if args.solo_lectura
+                                       else ",".join(f"sqlite:///{r}" for r in replicas))
+    os.environ["METRICAS_HABILITADAS"] = "false"
+    os.environ["CAMBIOS_COMPACTAR_CADA_SEGUNDOS"] = "0"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app.database import CABECERA_CONSISTENCIA, motores
+    from app.main import app
+
+    with TestClient(app) as c:
+        c.post("/empleados/_lote", json=[{"cc": f"{10_000_000 + i}", "nombre": f"Empleado {i}"} for i in range(20)])
+        parar = threading.Event()
+        if replicas:
+            _copiar(primario, replicas)
+            threading.Thread(target=_replicar, args=(primario, replicas, args.retraso, parar), daemon=True).start()
+
+        m = motores()
+        sentencias = collections.Counter()
+        for nombre, motor in (("primario", m.engine), *((f"réplica {i}", r.engine)
+                                                         for i, r in enumerate(m.replicas, 1))):
+            event.listen(motor, "before_cursor_execute",
+                         lambda *a, n=nombre: sentencias.__setitem__(n, sentencias[n] + 1))
+
+        resultados = {}
+        try:
+            for con_token in (False, True):
+                viejas = 0
+                sentencias.clear()
+                for i in range(args.rondas):
+                    e = 1 + i % 20
+                    cargo = f"cargo {con_token} {i}"
+                    r = c.patch(f"/empleados/{e}", json={"cargo": cargo})
+                    r.raise_for_status()
+                    cabeceras = {CABECERA_CONSISTENCIA: r.headers[CABECERA_CONSISTENCIA]} if con_token else {}
+                    leido = c.get(f"/empleados/{e}", headers=cabeceras).json()["cargo"]
+                    viejas += leido != cargo
+                resultados["con token" if con_token else "sin token"] = (viejas, dict(sentencias))
+        finally:
+            parar.set()
+
+    print(f"{args.rondas} rondas de PATCH + GET del mismo empleado; réplicas: "
+          f"{'primario en sólo lectura' if args.solo_lectura else f'2 copias, retraso {args.retraso} s'}")
+    print(f"\n{'lecturas':<10} {'viejas':>7}  sentencias por motor")
+    for nombre, (viejas, por_motor) in resultados.items():
+        print(f"{nombre:<10} {viejas:7}  {', '.join(f'{k}: {v}' for k, v in sorted(por_motor.items()))}")
+    return 0 if not resultados["con token"][0] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
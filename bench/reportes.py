@@ -0,0 +1,86 @@
+"""
+Costo de GET /reportes/*: genera una base con bench.datos (con --empleados
+500000 las asignaciones pasan el millón) y mide cada reporte en frío, justo
+después de escrituras que lo invalidan (alta o baja de una asignación y
+PATCH del presupuesto de su proyecto), y en caliente, servido desde la
+caché. El frío no recorre asignaciones (lee los contadores num_empleados y
+num_proyectos), así que depende del número de proyectos y empleados, no del
+de asignaciones.
+
+Uso: python -m bench.reportes [--empleados 500000] [--muestras 20]
+     [--url sqlite:///base_ya_sembrada.db]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPORTES = ("dotacion", "capacidad", "presupuesto", "gerentes")
+
+
+def _ms(fn) -> float:
+    t0 = time.perf_counter()
+    fn().raise_for_status()
+    return (time.perf_counter() - t0) * 1000
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--empleados", type=int, default=500_000)
+    p.add_argument("--muestras", type=int, default=20)
+    p.add_argument("--url", help="base ya sembrada con bench.datos (no se vuelve a generar)")
+    args = p.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'reportes.db')}"
+    os.environ["DATABASE_URL"] = url
+    os.environ["METRICAS_HABILITADAS"] = "false"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine, func, select
+    from app import models
+    from app.main import app
+    from bench.datos import preparar
+
+    if not args.url:
+        t0 = time.perf_counter()
+        preparar(url, empleados=args.empleados)
+        print(f"base generada en {time.perf_counter() - t0:.0f} s")
+    motor = create_engine(url)
+    with motor.connect() as conn:
+        conteos = {t: conn.scalar(select(func.count()).select_from(m)) for t, m in
+                   (("empleados", models.Empleado), ("proyectos", models.Proyecto),
+                    ("asignaciones", models.Asignacion))}
+        # Un empleado sin asignaciones y un proyecto sin gerente para alternar alta y baja
+        libre = conn.scalar(select(models.Empleado.id).where(models.Empleado.num_proyectos == 0).limit(1))
+        proyecto = conn.scalar(select(models.Proyecto.id).where(models.Proyecto.gerente_id.is_(None)).limit(1))
+    motor.dispose()
+    print(f"filas: {conteos}")
+
+    asignacion = {"empleado_id": libre, "proyecto_id": proyecto}
+    frio, caliente, tamanos = {r: [] for r in REPORTES}, {r: [] for r in REPORTES}, {}
+    with TestClient(app) as c:
+        for i in range(args.muestras):
+            for j, r in enumerate(REPORTES):
+                # Alta o baja de la asignación y cambio de presupuesto del proyecto:
+                # entre las dos invalidan los cuatro reportes
+                n = i * len(REPORTES) + j
+                if n % 2:
+                    c.request("DELETE", "/asignaciones", json=asignacion).raise_for_status()
+                else:
+                    c.post("/asignaciones", json=asignacion).raise_for_status()
+                c.patch(f"/proyectos/{proyecto}", json={"presupuesto": 1000 * n}).raise_for_status()
+                frio[r].append(_ms(lambda: c.get(f"/reportes/{r}")))
+                caliente[r].append(_ms(lambda: c.get(f"/reportes/{r}")))
+                tamanos[r] = len(c.get(f"/reportes/{r}").content)
+
+    print(f"\n{'reporte':<12} {'KB':>7} {'frío p50':>9} {'p95':>7} {'caliente p50':>13} {'p95':>7}  (ms)")
+    for r in REPORTES:
+        p95 = lambda t: statistics.quantiles(t, n=20)[-1]
+        print(f"{r:<12} {tamanos[r] / 1024:7.0f} {statistics.median(frio[r]):9.1f} {p95(frio[r]):7.1f} "
+              f"{statistics.median(caliente[r]):13.2f} {p95(caliente[r]):7.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
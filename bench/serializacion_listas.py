@@ -0,0 +1,95 @@
+"""
+Microbenchmark de serialización de los listados (filas/segundo).
+
+Por cada endpoint de listado compara, sobre la misma página de la misma base:
+- antes: objetos ORM -> response_model de FastAPI (validación
+  from_attributes + serialize_response) -> JSONResponse.
+- después: tuplas de columnas (crud.COLUMNAS_*) -> respuestas.lista_json
+  (TypeAdapter + bytes de pydantic-core).
+y mide también la petición HTTP completa (TestClient) con el camino actual.
+
+Uso: python -m bench.serializacion_listas [--filas 1000] [--repeticiones 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--filas", type=int, default=1000, help="tamaño de página (máx. crud.LIMITE_MAXIMO)")
+    p.add_argument("--repeticiones", type=int, default=50)
+    args = p.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serializacion.db')}"
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.testclient import TestClient
+    from fastapi.utils import create_model_field
+    from sqlalchemy import insert, select
+    from app import crud, models, respuestas, schemas
+    from app.database import motores
+    from app.main import app
+
+    n = args.filas
+    with TestClient(app) as c:
+        with motores().engine.begin() as conn:
+            conn.execute(insert(models.Empleado), [
+                {"id": i, "cc": str(10_000_000 + i), "nombre": f"Empleado {i}", "cargo": "dev" if i % 2 else None}
+                for i in range(1, 2 * n + 1)
+            ])
+            conn.execute(insert(models.Proyecto), [
+                {"id": i, "nombre": f"Proyecto {i}", "descripcion": "Descripción de prueba", "presupuesto": i * 100}
+                for i in range(1, n + 1)
+            ])
+            conn.execute(insert(models.Asignacion), [{"empleado_id": e, "proyecto_id": 1} for e in range(1, n + 1)])
+            conn.execute(models.Empleado.__table__.update().where(models.Empleado.id <= n).values(num_proyectos=1))
+
+        casos = [
+            ("/empleados", models.Empleado, schemas.EmpleadoSalida,
+             lambda db: crud.listar_empleados(db, limit=n)[0]),
+            ("/proyectos", models.Proyecto, schemas.ProyectoSalida,
+             lambda db: crud.listar_proyectos(db, limit=n)[0]),
+            ("/empleados/_sin_proyecto", models.Empleado, schemas.EmpleadoSalida,
+             lambda db: crud.empleados_sin_proyecto(db, limit=n)[0]),
+            ("/empleados/_con_proyecto", models.Empleado, schemas.EmpleadoSalida,
+             lambda db: crud.empleados_con_proyecto(db, limit=n)[0]),
+        ]
+
+        def medir(fn) -> float:
+            fn()
+            t0 = time.perf_counter()
+            for _ in range(args.repeticiones):
+                filas = fn()
+            return filas * args.repeticiones / (time.perf_counter() - t0)
+
+        print(f"{'endpoint':<26} {'antes':>12} {'después':>12} {'x':>6} {'HTTP':>12}   (filas/s)")
+        for ruta, modelo, esquema, filas_rapidas in casos:
+            campo = create_model_field(name="respuesta", type_=list[esquema], mode="serialization")
+            with motores().SessionLocal() as db:
+                ids = [f.id for f in filas_rapidas(db)]
+                consulta_orm = select(modelo).where(modelo.id.in_(ids)).order_by(modelo.id)
+
+                def antes():
+                    objs = db.scalars(consulta_orm).all()
+                    contenido = asyncio.run(serialize_response(field=campo, response_content=objs))
+                    JSONResponse(contenido).body
+                    db.expunge_all()
+                    return len(objs)
+
+                def despues():
+                    filas = filas_rapidas(db)
+                    respuestas.lista_json(filas, esquema).body
+                    return len(filas)
+
+                r_antes, r_despues = medir(antes), medir(despues)
+            r_http = medir(lambda: len(c.get(ruta, params={"limit": n}).json()))
+            print(f"{ruta:<26} {r_antes:12,.0f} {r_despues:12,.0f} {r_despues / r_antes:6.1f} {r_http:12,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
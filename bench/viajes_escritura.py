@@ -0,0 +1,88 @@
+"""
+Viajes a la base por endpoint de escritura: sentencias SQL, COMMIT y
+checkouts de conexión por petición (mediana de --rondas), junto a los de la
+versión anterior, en la que crud confirmaba y recargaba la fila escrita
+(db.commit(); db.refresh(obj)) en cada escritura.
+
+Uso: python -m bench.viajes_escritura [--rondas 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Antes de la unidad de trabajo (get_db): (sentencias, commits, checkouts),
+# medidos con este mismo script sobre la versión con commit + refresh en crud
+ANTES = {
+    "POST /empleados": (4, 1, 2),
+    "PATCH /empleados/{id}": (5, 1, 2),
+    "POST /proyectos": (3, 1, 2),
+    "PATCH /proyectos/{id}": (5, 1, 2),
+    "POST /asignaciones": (4, 1, 1),
+    "DELETE /asignaciones": (4, 1, 1),
+    "POST /proyectos/{id}/gerente/{e}": (7, 1, 2),
+    "DELETE /proyectos/{id}/gerente": (5, 1, 2),
+}
+
+# Cada ronda deja la base como la encontró (salvo las altas)
+ESCRITURAS = [
+    ("POST /empleados", lambda c, i: c.post("/empleados", json={"cc": f"{50_000 + i}", "nombre": f"Nuevo {i}"})),
+    ("PATCH /empleados/{id}", lambda c, i: c.patch("/empleados/3", json={"cargo": f"cargo {i}"})),
+    ("POST /proyectos", lambda c, i: c.post("/proyectos", json={"nombre": f"Nuevo {i}"})),
+    ("PATCH /proyectos/{id}", lambda c, i: c.patch("/proyectos/2", json={"descripcion": f"descripción {i}"})),
+    ("POST /asignaciones", lambda c, i: c.post("/asignaciones", json={"empleado_id": 8, "proyecto_id": 1})),
+    ("DELETE /asignaciones", lambda c, i: c.request("DELETE", "/asignaciones",
+                                                    json={"empleado_id": 8, "proyecto_id": 1})),
+    ("POST /proyectos/{id}/gerente/{e}", lambda c, i: c.post("/proyectos/2/gerente/9")),
+    ("DELETE /proyectos/{id}/gerente", lambda c, i: c.delete("/proyectos/2/gerente")),
+]
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--rondas", type=int, default=50)
+    args = p.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'viajes.db')}"
+    os.environ["METRICAS_HABILITADAS"] = "false"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app.database import motores
+    from app.main import app
+
+    with TestClient(app) as c:
+        c.post("/empleados/_lote", json=[{"cc": f"{10_000 + i}", "nombre": f"Empleado {i}"} for i in range(10)])
+        c.post("/proyectos/_lote", json=[{"nombre": f"Proyecto {i}"} for i in range(3)])
+
+        motor = motores().engine
+        conteo = {"sentencias": 0, "commits": 0, "checkouts": 0}
+
+        def contar(clave):
+            return lambda *a, **k: conteo.__setitem__(clave, conteo[clave] + 1)
+        event.listen(motor, "before_cursor_execute", contar("sentencias"))
+        event.listen(motor, "commit", contar("commits"))
+        event.listen(motor.pool, "checkout", contar("checkouts"))
+
+        medidas = {nombre: [] for nombre, _ in ESCRITURAS}
+        for i in range(args.rondas):
+            for nombre, escribir in ESCRITURAS:
+                conteo.update(dict.fromkeys(conteo, 0))
+                t0 = time.perf_counter()
+                escribir(c, i).raise_for_status()
+                medidas[nombre].append((conteo["sentencias"], conteo["commits"], conteo["checkouts"],
+                                        time.perf_counter() - t0))
+
+    print(f"{'endpoint':<34} {'sentencias':>10} {'antes':>6} {'commits':>8} {'antes':>6} "
+          f"{'checkouts':>10} {'antes':>6} {'ms':>7}")
+    for nombre, filas in medidas.items():
+        sentencias, commits, checkouts, segundos = (statistics.median(col) for col in zip(*filas))
+        antes_s, antes_c, antes_k = ANTES[nombre]
+        print(f"{nombre:<34} {sentencias:10.0f} {antes_s:6} {commits:8.0f} {antes_c:6} "
+              f"{checkouts:10.0f} {antes_k:6} {segundos * 1000:7.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())